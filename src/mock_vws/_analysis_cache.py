@@ -0,0 +1,170 @@
+"""
+A persistent cache of results computed from images, so that the same images
+are not analyzed again in later runs.
+"""
+
+from __future__ import annotations
+
+import functools
+import sqlite3
+import threading
+from typing import TYPE_CHECKING, TypeVar
+
+from mock_vws._image_digests import get_image_digest
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+_T = TypeVar("_T")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    algorithm TEXT NOT NULL,
+    image_digest TEXT NOT NULL,
+    result BLOB NOT NULL,
+    PRIMARY KEY (algorithm, image_digest)
+);
+"""
+
+
+class AnalysisCache:
+    """
+    A cache of results computed from images, in a SQLite file.
+
+    Results are keyed by the name and version of the algorithm which computed
+    them, and by the digest of the image.
+    Change an algorithm's version whenever its results change, so that old
+    results are not used.
+
+    When the stored results are larger than the maximum size, the results
+    which were stored first are removed.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int = 4 * 1024 * 1024 * 1024,
+    ) -> None:
+        """
+        Args:
+            directory: The directory to keep the cache in. This is created if
+                it does not exist.
+            max_bytes: The maximum total size of the stored results.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        self._max_bytes = max_bytes
+        # Results may be computed on many threads, so one connection is shared
+        # and used by one thread at a time.
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            database=directory / "analysis_cache.sqlite3",
+            check_same_thread=False,
+        )
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.executescript(_SCHEMA)
+            self._size_bytes = self._get_stored_size_bytes()
+
+    def _get_stored_size_bytes(self) -> int:
+        """
+        Get the total size of the stored results.
+
+        The caller must hold the lock.
+        """
+        (size_bytes,) = self._connection.execute(
+            "SELECT COALESCE(SUM(LENGTH(result)), 0) FROM results",
+        ).fetchone()
+        return int(size_bytes)
+
+    def _evict(self) -> None:
+        """
+        Remove the results which were stored first until the stored results
+        are no larger than the maximum size.
+
+        The caller must hold the lock.
+        """
+        # Other processes may share the file, so the stored size is read
+        # again rather than trusting the size seen by this process.
+        self._size_bytes = self._get_stored_size_bytes()
+        excess_bytes = self._size_bytes - self._max_bytes
+        if excess_bytes <= 0:
+            return
+
+        rows = self._connection.execute(
+            "SELECT rowid, LENGTH(result) FROM results ORDER BY rowid",
+        ).fetchall()
+        last_evicted_rowid = None
+        for rowid, size_bytes in rows:
+            last_evicted_rowid = rowid
+            excess_bytes -= size_bytes
+            if excess_bytes <= 0:
+                break
+
+        self._connection.execute(
+            "DELETE FROM results WHERE rowid <= ?",
+            (last_evicted_rowid,),
+        )
+        self._size_bytes = self._get_stored_size_bytes()
+
+    def get(
+        self,
+        algorithm: str,
+        image_content: bytes,
+        compute: Callable[[bytes], _T],
+        encode: Callable[[_T], bytes],
+        decode: Callable[[bytes], _T],
+    ) -> _T:
+        """
+        Get the result of an algorithm for an image, computing and storing it
+        if it is not stored.
+
+        Args:
+            algorithm: The name and version of the algorithm.
+            image_content: The image's content.
+            compute: A function which computes the result from the image's
+                content.
+            encode: A function which converts a result to bytes to store.
+            decode: A function which converts stored bytes to a result.
+
+        Returns:
+            The result.
+        """
+        image_digest = get_image_digest(image_content=image_content)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT result FROM results "
+                "WHERE algorithm = ? AND image_digest = ?",
+                (algorithm, image_digest),
+            ).fetchone()
+        if row is not None:
+            stored_result: bytes = row[0]
+            return decode(stored_result)
+
+        result = compute(image_content)
+        encoded_result = encode(result)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results "
+                "(algorithm, image_digest, result) VALUES (?, ?, ?)",
+                (algorithm, image_digest, encoded_result),
+            )
+            self._size_bytes += len(encoded_result)
+            if self._size_bytes > self._max_bytes:
+                self._evict()
+        return result
+
+
+# Each cache keeps a connection open, so only caches for a few directories
+# are kept, and the connections of others are closed when they are no longer
+# used.
+@functools.lru_cache(maxsize=8)
+def get_analysis_cache(directory: Path) -> AnalysisCache:
+    """
+    Get the analysis cache in a directory, shared by everything which uses
+    that directory.
+
+    Args:
+        directory: The directory to keep the cache in.
+    """
+    return AnalysisCache(directory=directory)
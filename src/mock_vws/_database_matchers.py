@@ -9,11 +9,33 @@ from typing import TYPE_CHECKING
 from vws_auth_tools import authorization_header
 
 if TYPE_CHECKING:
-    from collections.abc import Iterable
+    from collections.abc import Iterable, Mapping
 
     from mock_vws.database import VuforiaDatabase
 
 
+def get_access_key(request_headers: Mapping[str, str]) -> str | None:
+    """
+    Get the access key given in a request's ``Authorization`` header.
+
+    The header is in the format ``VWS <access key>:<signature>``.
+
+    Args:
+        request_headers: The headers sent with the request.
+
+    Returns:
+        The access key, or ``None`` if the header is not given or is not in
+        the expected format.
+    """
+    header = request_headers.get("Authorization", "")
+    try:
+        first_part, _ = header.split(":")
+        _, access_key = first_part.split(" ")
+    except ValueError:
+        return None
+    return access_key
+
+
 def get_database_matching_client_keys(
     request_headers: dict[str, str],
     request_body: bytes | None,
@@ -42,8 +64,14 @@ def get_database_matching_client_keys(
     auth_header = request_headers.get("Authorization")
     content = request_body or b""
     date = request_headers.get("Date", "")
+    access_key = get_access_key(request_headers=request_headers)
 
     for database in databases:
+        # The access key is given in plain text in the header, so we only
+        # compute the signature for a database with a matching access key.
+        if database.client_access_key != access_key:
+            continue
+
         expected_authorization_header = authorization_header(
             access_key=database.client_access_key,
             secret_key=database.client_secret_key,
@@ -87,8 +115,14 @@ def get_database_matching_server_keys(
     auth_header = request_headers.get("Authorization")
     content = request_body or b""
     date = request_headers.get("Date", "")
+    access_key = get_access_key(request_headers=request_headers)
 
     for database in databases:
+        # The access key is given in plain text in the header, so we only
+        # compute the signature for a database with a matching access key.
+        if database.server_access_key != access_key:
+            continue
+
         expected_authorization_header = authorization_header(
             access_key=database.server_access_key,
             secret_key=database.server_secret_key,
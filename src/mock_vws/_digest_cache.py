@@ -0,0 +1,125 @@
+"""
+A size-bounded cache of results computed from images, keyed by the images'
+digests.
+"""
+
+from __future__ import annotations
+
+import collections
+import sys
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+_T = TypeVar("_T")
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    """
+    Statistics for a cache.
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    size_bytes: int
+
+
+class DigestCache(Generic[_T]):
+    """
+    A least-recently-used cache of results computed from images.
+
+    Entries are keyed by the digest of an image, so the cache does not keep
+    images in memory.
+    Callers give the digest, so that when they already have it, for example
+    from ``Target.image_digest``, looking up an entry does not hash the image.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        get_size: Callable[[_T], int] = sys.getsizeof,
+    ) -> None:
+        """
+        Args:
+            max_bytes: The maximum number of bytes which the cache's keys and
+                values may use. The least recently used entries are removed
+                to keep within this.
+            get_size: A function which returns the number of bytes which a
+                value uses. This is needed for values such as tensors, whose
+                data is not counted by ``sys.getsizeof``.
+        """
+        self._max_bytes = max_bytes
+        self._get_size = get_size
+        self._lock = threading.Lock()
+        self._entries: collections.OrderedDict[str, tuple[_T, int]] = (
+            collections.OrderedDict()
+        )
+        self._size_bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        """
+        Statistics for this cache.
+        """
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size_bytes=self._size_bytes,
+            )
+
+    def get(
+        self,
+        digest: str,
+        image_content: bytes,
+        compute: Callable[[bytes], _T],
+    ) -> _T:
+        """
+        Get the result for an image, computing it if it is not cached.
+
+        Args:
+            digest: The digest of the image's content, as given by
+                ``get_image_digest``.
+            image_content: The image's content. This is only used if the
+                result is computed.
+            compute: A function which computes the result from the image's
+                content.
+
+        Returns:
+            The result.
+        """
+        with self._lock:
+            if digest in self._entries:
+                self._hits += 1
+                self._entries.move_to_end(key=digest)
+                value, _ = self._entries[digest]
+                return value
+            self._misses += 1
+
+        # The result is computed without the lock, so that other images can be
+        # looked up meanwhile. If two threads compute the same result, the
+        # second one replaces the first.
+        value = compute(image_content)
+        entry_size = sys.getsizeof(digest) + self._get_size(value)
+        with self._lock:
+            if digest in self._entries:
+                _, previous_size = self._entries.pop(digest)
+                self._size_bytes -= previous_size
+            if entry_size > self._max_bytes:
+                return value
+            self._entries[digest] = (value, entry_size)
+            self._size_bytes += entry_size
+            while self._size_bytes > self._max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size_bytes -= evicted_size
+                self._evictions += 1
+        return value
@@ -0,0 +1,193 @@
+"""
+A log of changes to the databases in the target manager, for keeping copies
+of the databases up to date.
+"""
+
+from __future__ import annotations
+
+import collections
+import datetime
+import heapq
+import itertools
+import threading
+from typing import Any
+
+# The target manager gives the sequence number of the change made by a
+# request in this response header.
+SEQUENCE_NUMBER_HEADER = "X-Change-Sequence-Number"
+
+
+class ChangeLog:
+    """
+    A bounded, thread-safe log of changes, each with a sequence number.
+
+    Readers can wait for changes after a sequence number which they have
+    seen.
+    """
+
+    def __init__(self, max_changes: int = 10000) -> None:
+        """
+        Args:
+            max_changes: The number of recent changes to keep. Readers which
+                are further behind than this must load all databases again.
+        """
+        self._condition = threading.Condition()
+        self._changes: collections.deque[dict[str, Any]] = collections.deque(
+            maxlen=max_changes,
+        )
+        self._sequence_number = 0
+        # A heap of times at which targets' tracking ratings become available,
+        # with the targets' database names and IDs.
+        # This is only kept once there is a reader, as only readers pop from
+        # it.
+        self._pending_ratings: list[tuple[datetime.datetime, str, str]] = []
+        self._schedules_ratings = False
+
+    @property
+    def sequence_number(self) -> int:
+        """
+        The sequence number of the latest change.
+        """
+        with self._condition:
+            return self._sequence_number
+
+    def record(self, change: dict[str, Any]) -> int:
+        """
+        Add a change to the log and wake readers which are waiting.
+
+        Args:
+            change: A description of the change which can be dumped as JSON.
+
+        Returns:
+            The sequence number given to the change.
+        """
+        with self._condition:
+            self._sequence_number += 1
+            self._changes.append(
+                {"sequence_number": self._sequence_number, **change},
+            )
+            self._condition.notify_all()
+            return self._sequence_number
+
+    def changes_after(
+        self,
+        sequence_number: int,
+    ) -> list[dict[str, Any]] | None:
+        """
+        Get the changes after the given sequence number.
+
+        Args:
+            sequence_number: The sequence number of the latest change which
+                the reader has seen.
+
+        Returns:
+            The changes in order, or ``None`` if some of them are no longer
+            kept.
+        """
+        with self._condition:
+            if sequence_number > self._sequence_number:
+                return None
+            if sequence_number == self._sequence_number:
+                return []
+            if (
+                not self._changes
+                or self._changes[0]["sequence_number"] > sequence_number + 1
+            ):
+                return None
+            first_index = (
+                sequence_number + 1 - self._changes[0]["sequence_number"]
+            )
+            return list(itertools.islice(self._changes, first_index, None))
+
+    def wait(self, sequence_number: int, timeout_seconds: float) -> None:
+        """
+        Wait until there is a change after the given sequence number, or
+        until the timeout passes.
+
+        Args:
+            sequence_number: The sequence number of the latest change which
+                the reader has seen.
+            timeout_seconds: The longest time to wait.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                predicate=lambda: self._sequence_number != sequence_number,
+                timeout=timeout_seconds,
+            )
+
+    def start_scheduling_ratings(self) -> bool:
+        """
+        Start keeping track of when targets' tracking ratings become
+        available.
+
+        Until this is called, :meth:`schedule_rating` does nothing, so that
+        pending ratings do not build up when there are no readers.
+
+        Returns:
+            Whether this is the first call. If it is, the caller must
+            schedule the ratings of existing targets.
+        """
+        with self._condition:
+            if self._schedules_ratings:
+                return False
+            self._schedules_ratings = True
+            return True
+
+    def schedule_rating(
+        self,
+        due: datetime.datetime,
+        database_name: str,
+        target_id: str,
+    ) -> None:
+        """
+        Record that a target's tracking rating will become available.
+
+        A target's tracking rating changes with time rather than with a
+        request, so it must be logged as a change when it becomes available.
+        This does nothing until :meth:`start_scheduling_ratings` is called.
+
+        Args:
+            due: The time at which the rating becomes available.
+            database_name: The name of the target's database.
+            target_id: The target's ID.
+        """
+        with self._condition:
+            if not self._schedules_ratings:
+                return
+            heapq.heappush(
+                self._pending_ratings,
+                (due, database_name, target_id),
+            )
+
+    def pop_due_ratings(
+        self,
+        now: datetime.datetime,
+    ) -> list[tuple[str, str]]:
+        """
+        Get the targets whose tracking ratings have become available since
+        this was last called.
+
+        Args:
+            now: The current time.
+
+        Returns:
+            The database names and IDs of the targets.
+        """
+        due_ratings: list[tuple[str, str]] = []
+        with self._condition:
+            while self._pending_ratings and self._pending_ratings[0][0] < now:
+                _, database_name, target_id = heapq.heappop(
+                    self._pending_ratings,
+                )
+                due_ratings.append((database_name, target_id))
+        return due_ratings
+
+    def next_rating_due(self) -> datetime.datetime | None:
+        """
+        The next time at which a target's tracking rating becomes available,
+        if any are pending.
+        """
+        with self._condition:
+            if not self._pending_ratings:
+                return None
+            return self._pending_ratings[0][0]
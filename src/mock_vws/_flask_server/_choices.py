@@ -0,0 +1,95 @@
+"""
+Choices of image matchers and target raters for the Flask apps' settings.
+"""
+
+import functools
+from enum import StrEnum, auto
+from pathlib import Path
+
+from mock_vws.image_matchers import (
+    ExactMatcher,
+    ImageMatcher,
+    StructuralSimilarityMatcher,
+)
+from mock_vws.target_raters import (
+    BrisqueTargetTrackingRater,
+    HardcodedTargetTrackingRater,
+    RandomTargetTrackingRater,
+    TargetTrackingRater,
+)
+
+
+class ImageMatcherChoice(StrEnum):
+    """Image matcher choices."""
+
+    EXACT = auto()
+    STRUCTURAL_SIMILARITY = auto()
+
+    def to_image_matcher(
+        self,
+        analysis_cache_directory: Path | None,
+    ) -> ImageMatcher:
+        """
+        Get the image matcher.
+
+        Args:
+            analysis_cache_directory: A directory to keep preprocessed images
+                in, so that they are not preprocessed again in later runs.
+        """
+        ssim_matcher = StructuralSimilarityMatcher(
+            analysis_cache_directory=analysis_cache_directory,
+        )
+        matcher = {
+            ImageMatcherChoice.EXACT: ExactMatcher(),
+            ImageMatcherChoice.STRUCTURAL_SIMILARITY: ssim_matcher,
+        }[self]
+        assert isinstance(matcher, ImageMatcher)
+        return matcher
+
+
+@functools.cache
+def _get_brisque_target_tracking_rater(
+    cache_max_bytes: int,
+    analysis_cache_directory: Path | None,
+) -> BrisqueTargetTrackingRater:
+    """
+    Get a BRISQUE target rater, shared by everything with the same cache
+    settings, so that ratings are cached across requests.
+    """
+    return BrisqueTargetTrackingRater(
+        cache_max_bytes=cache_max_bytes,
+        analysis_cache_directory=analysis_cache_directory,
+    )
+
+
+class TargetRaterChoice(StrEnum):
+    """Target rater choices."""
+
+    BRISQUE = auto()
+    PERFECT = auto()
+    RANDOM = auto()
+
+    def to_target_rater(
+        self,
+        brisque_cache_max_bytes: int,
+        analysis_cache_directory: Path | None,
+    ) -> TargetTrackingRater:
+        """
+        Get the target rater.
+
+        Args:
+            brisque_cache_max_bytes: The maximum number of bytes to use for
+                caching BRISQUE ratings in memory.
+            analysis_cache_directory: A directory to keep BRISQUE ratings in,
+                so that they are not computed again in later runs.
+        """
+        rater = {
+            TargetRaterChoice.BRISQUE: _get_brisque_target_tracking_rater(
+                cache_max_bytes=brisque_cache_max_bytes,
+                analysis_cache_directory=analysis_cache_directory,
+            ),
+            TargetRaterChoice.PERFECT: HardcodedTargetTrackingRater(rating=5),
+            TargetRaterChoice.RANDOM: RandomTargetTrackingRater(),
+        }[self]
+        assert isinstance(rater, TargetTrackingRater)
+        return rater
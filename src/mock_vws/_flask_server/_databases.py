@@ -0,0 +1,177 @@
+"""
+Helpers for getting databases from the target manager back-end.
+"""
+
+from __future__ import annotations
+
+import collections
+import functools
+import threading
+from dataclasses import dataclass
+from http import HTTPStatus
+from typing import TYPE_CHECKING
+
+from mock_vws.database import DatabaseDict, VuforiaDatabase
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from mock_vws._flask_server._target_manager_client import (
+        TargetManagerClient,
+    )
+
+
+@dataclass(frozen=True)
+class _CachedDatabases:
+    """
+    Databases loaded from a target manager response, with the response's
+    entity tag.
+    """
+
+    etag: str
+    databases: set[VuforiaDatabase]
+
+
+def get_image(
+    target_manager_client: TargetManagerClient,
+    image_digest: str,
+    known_databases: Iterable[VuforiaDatabase] = (),
+) -> bytes:
+    """
+    Get an image by its digest, from databases which are already loaded or
+    from the target manager back-end.
+
+    Images in loaded databases are used rather than downloaded again, so when
+    databases are loaded again after a change, only new images are
+    downloaded.
+
+    Args:
+        target_manager_client: A client for the target manager.
+        image_digest: The digest of the image's content.
+        known_databases: Loaded databases which may have the image.
+
+    Raises:
+        requests.HTTPError: The target manager does not have the image.
+
+    Returns:
+        The image's content.
+    """
+    for database in known_databases:
+        try:
+            return database.targets.get_image(image_digest=image_digest)
+        except KeyError:
+            continue
+
+    response = target_manager_client.request(
+        method="GET",
+        path=f"/blobs/{image_digest}",
+    )
+    response.raise_for_status()
+    return response.content
+
+
+def load_database(
+    target_manager_client: TargetManagerClient,
+    database_dict: DatabaseDict,
+    known_databases: Iterable[VuforiaDatabase] = (),
+) -> VuforiaDatabase:
+    """
+    Load a database from a dictionary from the target manager back-end,
+    getting any images which are not included.
+
+    Args:
+        target_manager_client: A client for the target manager.
+        database_dict: The dictionary to load.
+        known_databases: Loaded databases which may have the images of the
+            database's targets.
+    """
+    return VuforiaDatabase.from_dict(
+        database_dict=database_dict,
+        get_image=functools.partial(
+            get_image,
+            target_manager_client,
+            known_databases=tuple(known_databases),
+        ),
+    )
+
+
+# Loaded databases, keyed by the target manager URL and the query parameters
+# used to get them.
+# The keys include access keys given in requests, so the least recently used
+# entries are removed to keep this from growing without bound.
+_DATABASES_CACHE: collections.OrderedDict[
+    tuple[str, str, str],
+    _CachedDatabases,
+] = collections.OrderedDict()
+_DATABASES_CACHE_MAX_SIZE = 256
+_DATABASES_CACHE_LOCK = threading.Lock()
+
+
+def get_databases(
+    target_manager_client: TargetManagerClient,
+    access_key_name: str,
+    access_key: str,
+) -> set[VuforiaDatabase]:
+    """
+    Get the databases with the given access key from the target manager
+    back-end.
+
+    Loaded databases are kept and revalidated with ``If-None-Match``, so
+    when nothing has changed they are not downloaded and loaded again.
+    Images are not included in the response, but are fetched by digest, and
+    images which are in the previously loaded databases are not downloaded
+    again.
+
+    Args:
+        target_manager_client: A client for the target manager.
+        access_key_name: The name of the access key, either
+            ``server_access_key`` or ``client_access_key``.
+        access_key: The access key.
+
+    Returns:
+        The databases with the given access key. These must not be modified.
+    """
+    cache_key = (target_manager_client.base_url, access_key_name, access_key)
+    with _DATABASES_CACHE_LOCK:
+        cached = _DATABASES_CACHE.get(cache_key)
+        if cached is not None:
+            _DATABASES_CACHE.move_to_end(key=cache_key)
+    headers: dict[str, str] = {}
+    if cached is not None:
+        headers["If-None-Match"] = cached.etag
+
+    response = target_manager_client.request(
+        method="GET",
+        path="/databases",
+        params={access_key_name: access_key, "include_images": "false"},
+        headers=headers,
+    )
+
+    if cached is not None and response.status_code == HTTPStatus.NOT_MODIFIED:
+        return cached.databases
+
+    databases = {
+        load_database(
+            target_manager_client=target_manager_client,
+            database_dict=database_dict,
+            known_databases=() if cached is None else cached.databases,
+        )
+        for database_dict in response.json()
+    }
+
+    etag = response.headers.get("ETag")
+    with _DATABASES_CACHE_LOCK:
+        # Requests with unknown access keys give no databases, and these are
+        # not kept so that unknown keys do not fill the cache.
+        if etag is None or not databases:
+            _DATABASES_CACHE.pop(cache_key, None)
+            return databases
+
+        _DATABASES_CACHE[cache_key] = _CachedDatabases(
+            etag=etag,
+            databases=databases,
+        )
+        _DATABASES_CACHE.move_to_end(key=cache_key)
+        while len(_DATABASES_CACHE) > _DATABASES_CACHE_MAX_SIZE:
+            _DATABASES_CACHE.popitem(last=False)
+    return databases
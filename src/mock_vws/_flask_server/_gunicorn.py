@@ -0,0 +1,54 @@
+"""
+A Gunicorn application which serves a Flask app.
+
+This is imported only when serving, as Gunicorn is an optional dependency
+which does not run on Windows.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from gunicorn.app.base import (  # type: ignore[import-untyped]
+    BaseApplication,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from flask import Flask
+
+
+class GunicornApplication(BaseApplication):  # type: ignore[misc]
+    """
+    A Gunicorn application which serves a Flask app.
+    """
+
+    def __init__(
+        self,
+        create_app: Callable[[], Flask],
+        options: dict[str, str | int | list[str]],
+    ) -> None:
+        """
+        Args:
+            create_app: A callable which creates the Flask app to serve.
+                This is called in each worker process, and the worker does
+                not accept connections until it returns.
+            options: Gunicorn settings.
+        """
+        self._create_app = create_app
+        self._options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        """
+        Set the Gunicorn settings.
+        """
+        for key, value in self._options.items():
+            self.cfg.set(key, value)
+
+    def load(self) -> Flask:
+        """
+        Create the WSGI application to serve.
+        """
+        return self._create_app()
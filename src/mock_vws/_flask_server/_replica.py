@@ -0,0 +1,228 @@
+"""
+An in-memory copy of the target manager's databases, kept up to date from
+the target manager's change feed.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any
+
+import requests
+
+from mock_vws._flask_server._databases import get_image, load_database
+from mock_vws.database import VuforiaDatabase
+from mock_vws.target import Target
+
+if TYPE_CHECKING:
+    from mock_vws._flask_server._target_manager_client import (
+        TargetManagerClient,
+    )
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class DatabaseReplica:
+    """
+    A copy of the target manager's databases.
+
+    Call :meth:`sync` to apply changes from the target manager, or
+    :meth:`start` to apply changes in a background thread as they happen.
+    """
+
+    def __init__(self, target_manager_client: TargetManagerClient) -> None:
+        """
+        Args:
+            target_manager_client: A client for the target manager.
+        """
+        self._target_manager_client = target_manager_client
+        self._condition = threading.Condition()
+        self._instance_id: str | None = None
+        self._sequence_number: int | None = None
+        self._databases: dict[str, VuforiaDatabase] = {}
+
+    def get_databases(
+        self,
+        access_key_name: str,
+        access_key: str,
+    ) -> set[VuforiaDatabase] | None:
+        """
+        Get the databases with the given access key.
+
+        Args:
+            access_key_name: The name of the access key, either
+                ``server_access_key`` or ``client_access_key``.
+            access_key: The access key.
+
+        Returns:
+            The databases with the given access key, or ``None`` if the
+            replica has not loaded the databases yet. These must not be
+            modified.
+        """
+        with self._condition:
+            if self._sequence_number is None:
+                return None
+            databases = list(self._databases.values())
+        return {
+            database
+            for database in databases
+            if getattr(database, access_key_name) == access_key
+        }
+
+    def wait_for(self, sequence_number: int, timeout_seconds: float) -> bool:
+        """
+        Wait until the replica includes the change with the given sequence
+        number.
+
+        Args:
+            sequence_number: The sequence number of a change.
+            timeout_seconds: The longest time to wait.
+
+        Returns:
+            Whether the replica includes the change.
+        """
+        with self._condition:
+            return self._condition.wait_for(
+                predicate=lambda: (
+                    self._sequence_number is not None
+                    and self._sequence_number >= sequence_number
+                ),
+                timeout=timeout_seconds,
+            )
+
+    def sync(self, timeout_seconds: float) -> None:
+        """
+        Apply changes from the target manager, waiting for a change if there
+        are none yet.
+
+        Args:
+            timeout_seconds: The longest time for the target manager to wait
+                for a change.
+        """
+        params: dict[str, Any] = {"timeout_seconds": timeout_seconds}
+        if self._sequence_number is not None:
+            params["after"] = self._sequence_number
+            params["instance_id"] = self._instance_id
+
+        request_leeway_seconds = 30
+        response = self._target_manager_client.request(
+            method="GET",
+            path="/changes",
+            params=params,
+            timeout_seconds=timeout_seconds + request_leeway_seconds,
+        )
+        response.raise_for_status()
+        body = response.json()
+
+        if "databases" in body:
+            databases = {
+                database_dict["database_name"]: load_database(
+                    target_manager_client=self._target_manager_client,
+                    database_dict=database_dict,
+                    known_databases=self._databases.values(),
+                )
+                for database_dict in body["databases"]
+            }
+        else:
+            databases = _apply_changes(
+                target_manager_client=self._target_manager_client,
+                databases=self._databases,
+                changes=body["changes"],
+            )
+
+        with self._condition:
+            self._databases = databases
+            self._instance_id = body["instance_id"]
+            self._sequence_number = body["sequence_number"]
+            self._condition.notify_all()
+
+    def run(self) -> None:
+        """
+        Apply changes from the target manager forever.
+        """
+        poll_timeout_seconds = 30
+        retry_delay_seconds = 1
+        while True:
+            try:
+                self.sync(timeout_seconds=poll_timeout_seconds)
+            except (requests.RequestException, ValueError, KeyError):
+                _LOGGER.exception(msg="Failed to get database changes.")
+                # A change may not be possible to apply, for example if its
+                # image has since been replaced, so load all databases again.
+                with self._condition:
+                    self._instance_id = None
+                    self._sequence_number = None
+                time.sleep(retry_delay_seconds)
+
+    def start(self) -> None:
+        """
+        Apply changes from the target manager in a background thread.
+        """
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+
+
+def _apply_changes(
+    target_manager_client: TargetManagerClient,
+    databases: dict[str, VuforiaDatabase],
+    changes: list[dict[str, Any]],
+) -> dict[str, VuforiaDatabase]:
+    """
+    Apply changes from the target manager's change feed to databases.
+
+    The given dictionary may be in use, so databases are added and removed in
+    a new dictionary.
+    Target stores are safe to change while they are in use, so changes to
+    targets are applied to the databases in place, without copying them.
+
+    Args:
+        target_manager_client: A client for the target manager, to get images
+            from.
+        databases: The databases, by name.
+        changes: The changes to apply, in order.
+
+    Returns:
+        The changed databases, by name.
+    """
+    new_databases = dict(databases)
+    for change in changes:
+        database_name = change["database_name"]
+        if change["type"] == "database_created":
+            new_databases[database_name] = load_database(
+                target_manager_client=target_manager_client,
+                database_dict=change["database"],
+                known_databases=new_databases.values(),
+            )
+        elif change["type"] == "database_deleted":
+            new_databases.pop(database_name, None)
+        elif change["type"] == "target_changed":
+            database = new_databases[database_name]
+            # Most changes keep the target's image, so it is taken from the
+            # database rather than downloaded again.
+            target = Target.from_dict(
+                target_dict=change["target"],
+                get_image=functools.partial(
+                    get_image,
+                    target_manager_client,
+                    known_databases=(database,),
+                ),
+            )
+            database.targets.add(value=target)
+    return new_databases
+
+
+@functools.cache
+def get_replica(target_manager_client: TargetManagerClient) -> DatabaseReplica:
+    """
+    Get a replica of the given target manager's databases which is kept up to
+    date in a background thread.
+
+    Args:
+        target_manager_client: A client for the target manager.
+    """
+    replica = DatabaseReplica(target_manager_client=target_manager_client)
+    replica.start()
+    return replica
@@ -0,0 +1,16 @@
+"""
+Settings for serving the Flask applications with a WSGI server.
+"""
+
+from pydantic_settings import BaseSettings
+
+
+class ServerSettings(BaseSettings):
+    """
+    Settings for the WSGI server which serves a Flask app with
+    ``mock-vws serve``.
+    """
+
+    server_threads: int = 8
+    server_keepalive_seconds: int = 5
+    server_backlog: int = 2048
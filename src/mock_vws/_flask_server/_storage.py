@@ -0,0 +1,439 @@
+"""
+Storage backends which keep the target manager's databases between restarts.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import sqlite3
+import threading
+from typing import TYPE_CHECKING, Protocol, runtime_checkable
+from zoneinfo import ZoneInfo
+
+from mock_vws._target_store import TargetStore
+from mock_vws.database import VuforiaDatabase
+from mock_vws.states import States
+from mock_vws.target import Target
+from mock_vws.target_raters import HardcodedTargetTrackingRater
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from mock_vws.target_raters import TargetTrackingRater
+
+
+@runtime_checkable
+class StorageBackend(Protocol):
+    """
+    Protocol for storage which the target manager writes changes through to.
+    """
+
+    def load_databases(
+        self,
+        target_tracking_rater: TargetTrackingRater,
+    ) -> list[VuforiaDatabase]:
+        """
+        Load all stored databases, with their targets.
+
+        Args:
+            target_tracking_rater: The rater for targets which do not have a
+                stored tracking rating.
+        """
+        # We disable a pylint warning here because the ellipsis is required
+        # for pyright to recognize this as a protocol.
+        ...  # pylint: disable=unnecessary-ellipsis
+
+    def save_database(self, database: VuforiaDatabase) -> None:
+        """
+        Store a new database, without its targets.
+
+        Args:
+            database: The database to store.
+        """
+        # We disable a pylint warning here because the ellipsis is required
+        # for pyright to recognize this as a protocol.
+        ...  # pylint: disable=unnecessary-ellipsis
+
+    def delete_database(self, database_name: str) -> None:
+        """
+        Remove a database and its targets.
+
+        Args:
+            database_name: The name of the database to remove.
+        """
+        # We disable a pylint warning here because the ellipsis is required
+        # for pyright to recognize this as a protocol.
+        ...  # pylint: disable=unnecessary-ellipsis
+
+    def save_target(self, database_name: str, target: Target) -> None:
+        """
+        Store a new target or a new version of a target.
+
+        This does not rate the target.
+
+        Args:
+            database_name: The name of the target's database.
+            target: The target to store.
+        """
+        # We disable a pylint warning here because the ellipsis is required
+        # for pyright to recognize this as a protocol.
+        ...  # pylint: disable=unnecessary-ellipsis
+
+    def save_tracking_rating(
+        self,
+        database_name: str,
+        target_id: str,
+        image_digest: str,
+        tracking_rating: int,
+    ) -> None:
+        """
+        Store the tracking rating of a target's image, once it has been
+        computed.
+
+        Args:
+            database_name: The name of the target's database.
+            target_id: The ID of the target.
+            image_digest: The digest of the image which was rated.
+            tracking_rating: The tracking rating of the image.
+        """
+        # We disable a pylint warning here because the ellipsis is required
+        # for pyright to recognize this as a protocol.
+        ...  # pylint: disable=unnecessary-ellipsis
+
+
+class InMemoryStorageBackend:
+    """
+    A storage backend which stores nothing, so that all state is lost when
+    the target manager stops.
+    """
+
+    def load_databases(
+        self,
+        target_tracking_rater: TargetTrackingRater,
+    ) -> list[VuforiaDatabase]:
+        """
+        There are no stored databases.
+        """
+        del target_tracking_rater
+        return []
+
+    def save_database(self, database: VuforiaDatabase) -> None:
+        """
+        Do not store the database.
+        """
+
+    def delete_database(self, database_name: str) -> None:
+        """
+        There is nothing to remove.
+        """
+
+    def save_target(self, database_name: str, target: Target) -> None:
+        """
+        Do not store the target.
+        """
+
+    def save_tracking_rating(
+        self,
+        database_name: str,
+        target_id: str,
+        image_digest: str,
+        tracking_rating: int,
+    ) -> None:
+        """
+        Do not store the tracking rating.
+        """
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS databases (
+    database_name TEXT PRIMARY KEY,
+    server_access_key TEXT NOT NULL UNIQUE,
+    server_secret_key TEXT NOT NULL UNIQUE,
+    client_access_key TEXT NOT NULL UNIQUE,
+    client_secret_key TEXT NOT NULL UNIQUE,
+    state_name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS blobs (
+    image_digest TEXT PRIMARY KEY,
+    content BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS targets (
+    database_name TEXT NOT NULL
+        REFERENCES databases (database_name) ON DELETE CASCADE,
+    target_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    -- The width is stored as JSON, so that a width given as an integer is
+    -- loaded as an integer.
+    width TEXT NOT NULL,
+    image_digest TEXT NOT NULL REFERENCES blobs (image_digest),
+    active_flag INTEGER NOT NULL,
+    processing_time_seconds REAL NOT NULL,
+    application_metadata TEXT,
+    last_modified_date TEXT NOT NULL,
+    delete_date TEXT,
+    upload_date TEXT NOT NULL,
+    tracking_rating INTEGER,
+    PRIMARY KEY (database_name, target_id)
+);
+
+CREATE INDEX IF NOT EXISTS targets_by_image_digest
+    ON targets (image_digest);
+"""
+
+
+class SQLiteStorageBackend:
+    """
+    A storage backend which keeps databases, targets and images in a SQLite
+    file.
+
+    Each image is stored once, keyed by its digest.
+    A target's tracking rating is stored once it has been computed, and
+    targets whose rating was not stored are rated again when they are loaded.
+    """
+
+    def __init__(self, path: Path) -> None:
+        """
+        Args:
+            path: The path to the SQLite file. This is created if it does not
+                exist.
+        """
+        # The target manager may handle requests on many threads, so one
+        # connection is shared and used by one thread at a time.
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            database=path,
+            check_same_thread=False,
+        )
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA foreign_keys = ON")
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.executescript(_SCHEMA)
+
+    def load_databases(
+        self,
+        target_tracking_rater: TargetTrackingRater,
+    ) -> list[VuforiaDatabase]:
+        """
+        Load all stored databases, with their targets.
+
+        Args:
+            target_tracking_rater: The rater for targets which do not have a
+                stored tracking rating.
+        """
+        timezone = ZoneInfo("GMT")
+        with self._lock:
+            database_rows = self._connection.execute(
+                "SELECT database_name, server_access_key, server_secret_key, "
+                "client_access_key, client_secret_key, state_name "
+                "FROM databases",
+            ).fetchall()
+            target_rows = self._connection.execute(
+                "SELECT targets.database_name, target_id, name, width, "
+                "content, active_flag, processing_time_seconds, "
+                "application_metadata, last_modified_date, delete_date, "
+                "upload_date, tracking_rating "
+                "FROM targets JOIN blobs USING (image_digest)",
+            ).fetchall()
+
+        targets_by_database_name: dict[str, list[Target]] = {}
+        for (
+            database_name,
+            target_id,
+            name,
+            width,
+            image_value,
+            active_flag,
+            processing_time_seconds,
+            application_metadata,
+            last_modified_date,
+            delete_date,
+            upload_date,
+            tracking_rating,
+        ) in target_rows:
+            target = Target(
+                target_id=target_id,
+                name=name,
+                width=json.loads(width),
+                image_value=image_value,
+                active_flag=bool(active_flag),
+                processing_time_seconds=processing_time_seconds,
+                application_metadata=application_metadata,
+                last_modified_date=datetime.datetime.fromisoformat(
+                    last_modified_date,
+                ).replace(tzinfo=timezone),
+                delete_date=(
+                    None
+                    if delete_date is None
+                    else datetime.datetime.fromisoformat(delete_date).replace(
+                        tzinfo=timezone,
+                    )
+                ),
+                upload_date=datetime.datetime.fromisoformat(
+                    upload_date,
+                ).replace(tzinfo=timezone),
+                target_tracking_rater=(
+                    target_tracking_rater
+                    if tracking_rating is None
+                    else HardcodedTargetTrackingRater(rating=tracking_rating)
+                ),
+            )
+            targets_by_database_name.setdefault(database_name, []).append(
+                target,
+            )
+
+        return [
+            VuforiaDatabase(
+                database_name=database_name,
+                server_access_key=server_access_key,
+                server_secret_key=server_secret_key,
+                client_access_key=client_access_key,
+                client_secret_key=client_secret_key,
+                state=States[state_name],
+                targets=TargetStore(
+                    targets=targets_by_database_name.get(database_name, []),
+                ),
+            )
+            for (
+                database_name,
+                server_access_key,
+                server_secret_key,
+                client_access_key,
+                client_secret_key,
+                state_name,
+            ) in database_rows
+        ]
+
+    def save_database(self, database: VuforiaDatabase) -> None:
+        """
+        Store a new database, without its targets.
+
+        Args:
+            database: The database to store.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO databases VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    database.database_name,
+                    database.server_access_key,
+                    database.server_secret_key,
+                    database.client_access_key,
+                    database.client_secret_key,
+                    database.state.name,
+                ),
+            )
+
+    def delete_database(self, database_name: str) -> None:
+        """
+        Remove a database and its targets, and any images which no other
+        target uses.
+
+        Args:
+            database_name: The name of the database to remove.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM databases WHERE database_name = ?",
+                (database_name,),
+            )
+            self._connection.execute(
+                "DELETE FROM blobs WHERE image_digest NOT IN "
+                "(SELECT image_digest FROM targets)",
+            )
+
+    def save_target(self, database_name: str, target: Target) -> None:
+        """
+        Store a new target or a new version of a target.
+
+        This does not rate the target, as rating can be slow.
+        If the target's image has not changed, its stored tracking rating is
+        kept.
+
+        Args:
+            database_name: The name of the target's database.
+            target: The target to store.
+        """
+        image_digest = target.image_digest
+        delete_date = None
+        if target.delete_date is not None:
+            delete_date = target.delete_date.isoformat()
+
+        with self._lock, self._connection:
+            previous_row = self._connection.execute(
+                "SELECT image_digest FROM targets "
+                "WHERE database_name = ? AND target_id = ?",
+                (database_name, target.target_id),
+            ).fetchone()
+            self._connection.execute(
+                "INSERT OR IGNORE INTO blobs VALUES (?, ?)",
+                (image_digest, target.image_value),
+            )
+            self._connection.execute(
+                "INSERT INTO targets VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL) "
+                "ON CONFLICT (database_name, target_id) DO UPDATE SET "
+                "name = excluded.name, "
+                "width = excluded.width, "
+                "image_digest = excluded.image_digest, "
+                "active_flag = excluded.active_flag, "
+                "processing_time_seconds = excluded.processing_time_seconds, "
+                "application_metadata = excluded.application_metadata, "
+                "last_modified_date = excluded.last_modified_date, "
+                "delete_date = excluded.delete_date, "
+                "upload_date = excluded.upload_date, "
+                "tracking_rating = CASE "
+                "WHEN targets.image_digest = excluded.image_digest "
+                "THEN targets.tracking_rating END",
+                (
+                    database_name,
+                    target.target_id,
+                    target.name,
+                    json.dumps(target.width),
+                    image_digest,
+                    target.active_flag,
+                    target.processing_time_seconds,
+                    target.application_metadata,
+                    target.last_modified_date.isoformat(),
+                    delete_date,
+                    target.upload_date.isoformat(),
+                ),
+            )
+            if previous_row is not None and previous_row[0] != image_digest:
+                # The target's image has been replaced, so the old image may
+                # no longer be used.
+                self._connection.execute(
+                    "DELETE FROM blobs WHERE image_digest = ? AND NOT EXISTS "
+                    "(SELECT 1 FROM targets WHERE image_digest = ?)",
+                    (previous_row[0], previous_row[0]),
+                )
+
+    def save_tracking_rating(
+        self,
+        database_name: str,
+        target_id: str,
+        image_digest: str,
+        tracking_rating: int,
+    ) -> None:
+        """
+        Store the tracking rating of a target's image, once it has been
+        computed.
+
+        The rating is not stored if the target's image has since been
+        replaced.
+
+        Args:
+            database_name: The name of the target's database.
+            target_id: The ID of the target.
+            image_digest: The digest of the image which was rated.
+            tracking_rating: The tracking rating of the image.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE targets SET tracking_rating = ? "
+                "WHERE database_name = ? AND target_id = ? "
+                "AND image_digest = ?",
+                (tracking_rating, database_name, target_id, image_digest),
+            )
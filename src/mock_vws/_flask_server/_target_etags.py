@@ -0,0 +1,54 @@
+"""
+Entity tags for versions of targets, for changing targets in the target
+manager only if they have not been changed by another request.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import TYPE_CHECKING
+
+from werkzeug.http import quote_etag
+
+if TYPE_CHECKING:
+    from mock_vws.target import Target
+
+
+def get_target_etag(target: Target) -> str:
+    """
+    Get an entity tag for a version of a target.
+
+    The target manager and the apps which use it can each get the entity tag
+    from their own copy of the target.
+
+    Args:
+        target: The target.
+
+    Returns:
+        A quoted entity tag which changes whenever the target is changed.
+    """
+    # The tracking rating changes with time rather than with a change to the
+    # target, so it is not part of the version.
+    # The fields are read directly, rather than from the target's dictionary,
+    # so that getting an entity tag does not rate the target.
+    delete_date = None
+    if target.delete_date is not None:
+        delete_date = target.delete_date.isoformat()
+    versioned_fields = {
+        "name": target.name,
+        "width": target.width,
+        "image_digest": target.image_digest,
+        "active_flag": target.active_flag,
+        "processing_time_seconds": target.processing_time_seconds,
+        "application_metadata": target.application_metadata,
+        "target_id": target.target_id,
+        "last_modified_date": target.last_modified_date.isoformat(),
+        "delete_date_optional": delete_date,
+        "upload_date": target.upload_date.isoformat(),
+    }
+    digest = hashlib.blake2b(
+        json.dumps(obj=versioned_fields, sort_keys=True).encode(),
+        digest_size=16,
+    ).hexdigest()
+    return quote_etag(etag=digest)
@@ -0,0 +1,268 @@
+"""
+A client for the target manager's HTTP API, for the VWS and VWQ Flask apps.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import socket
+import threading
+import time
+import urllib.parse
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import requests
+from pydantic_settings import BaseSettings
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.util.retry import Retry
+
+_LOGGER = logging.getLogger(__name__)
+
+# Requests to a target manager on a Unix domain socket use this scheme,
+# with the percent-encoded socket path as the host.
+_UNIX_SOCKET_SCHEME = "http+unix"
+
+
+class TargetManagerClientSettings(BaseSettings):
+    """
+    Settings for the connection from a Flask app to the target manager.
+    """
+
+    target_manager_base_url: str
+    target_manager_pool_size: int = 32
+    target_manager_timeout_seconds: float = 30
+    target_manager_max_retries: int = 3
+    target_manager_unix_socket_path: Path | None = None
+
+
+class _UnixSocketConnection(HTTPConnection):
+    """
+    An HTTP connection over a Unix domain socket.
+    """
+
+    def _new_conn(self) -> socket.socket:
+        """
+        Connect to the socket whose percent-encoded path is the host.
+        """
+        sock = socket.socket(family=socket.AF_UNIX, type=socket.SOCK_STREAM)
+        if isinstance(self.timeout, int | float):
+            sock.settimeout(self.timeout)
+        sock.connect(urllib.parse.unquote(string=self.host))
+        return sock
+
+
+class _UnixSocketConnectionPool(HTTPConnectionPool):
+    """
+    A pool of HTTP connections over a Unix domain socket.
+    """
+
+    ConnectionCls = _UnixSocketConnection
+
+
+class _UnixSocketAdapter(HTTPAdapter):
+    """
+    A transport adapter for URLs with the Unix domain socket scheme.
+    """
+
+    def __init__(self, pool_maxsize: int, max_retries: Retry) -> None:
+        """
+        Args:
+            pool_maxsize: The number of connections to keep open.
+            max_retries: The retry policy.
+        """
+        super().__init__(pool_maxsize=pool_maxsize, max_retries=max_retries)
+        self.poolmanager.pool_classes_by_scheme = {
+            _UNIX_SOCKET_SCHEME: _UnixSocketConnectionPool,
+        }
+        self.poolmanager.key_fn_by_scheme = {
+            _UNIX_SOCKET_SCHEME: self.poolmanager.key_fn_by_scheme["http"],
+        }
+
+
+@dataclass(frozen=True)
+class CallStats:
+    """
+    Latency statistics for calls to the target manager with one HTTP method.
+    """
+
+    count: int
+    total_seconds: float
+    max_seconds: float
+
+
+class TargetManagerClient:
+    """
+    A client for the target manager which reuses connections.
+
+    Requests which fail to connect, or which get a ``502``, ``503`` or
+    ``504`` response, are retried with backoff.
+    Requests which are not idempotent are retried only if they were not
+    sent.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 32,
+        timeout_seconds: float = 30,
+        max_retries: int = 3,
+        unix_socket_path: Path | None = None,
+    ) -> None:
+        """
+        Args:
+            base_url: The base URL of the target manager.
+            pool_size: The number of connections to keep open, which should
+                be at least the number of threads making requests.
+            timeout_seconds: The default timeout for each request.
+            max_retries: The number of times to retry a failed request.
+            unix_socket_path: The path to a Unix domain socket which the
+                target manager listens on. If this is given, requests are
+                sent to this socket rather than to the base URL's host.
+        """
+        self.base_url = base_url
+        self._timeout_seconds = timeout_seconds
+        self._session = requests.Session()
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=0.1,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False,
+        )
+        if unix_socket_path is None:
+            self._request_base_url = base_url
+            adapter = HTTPAdapter(
+                pool_maxsize=pool_size,
+                max_retries=retry,
+            )
+            self._session.mount(prefix="http://", adapter=adapter)
+            self._session.mount(prefix="https://", adapter=adapter)
+        else:
+            encoded_path = urllib.parse.quote(
+                string=str(unix_socket_path),
+                safe="",
+            )
+            self._request_base_url = (
+                f"{_UNIX_SOCKET_SCHEME}://{encoded_path}"
+                + urllib.parse.urlsplit(url=base_url).path
+            )
+            self._session.mount(
+                prefix=f"{_UNIX_SOCKET_SCHEME}://",
+                adapter=_UnixSocketAdapter(
+                    pool_maxsize=pool_size,
+                    max_retries=retry,
+                ),
+            )
+
+        self._stats_lock = threading.Lock()
+        self._call_stats: dict[str, CallStats] = {}
+
+    @property
+    def call_stats(self) -> dict[str, CallStats]:
+        """
+        Latency statistics for calls made by this client, by HTTP method.
+        """
+        with self._stats_lock:
+            return dict(self._call_stats)
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        params: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+        json: object = None,
+        timeout_seconds: float | None = None,
+    ) -> requests.Response:
+        """
+        Make a request to the target manager.
+
+        Args:
+            method: The HTTP method.
+            path: The path to request, relative to the base URL.
+            params: Query parameters.
+            headers: Request headers.
+            json: A request body to send as JSON.
+            timeout_seconds: The timeout for this request, if it is not the
+                client's default.
+
+        Returns:
+            The response.
+        """
+        if timeout_seconds is None:
+            timeout_seconds = self._timeout_seconds
+
+        start = time.perf_counter()
+        response = self._session.request(
+            method=method,
+            url=self._request_base_url + path,
+            params=params,
+            headers=headers,
+            json=json,
+            timeout=timeout_seconds,
+        )
+        elapsed_seconds = time.perf_counter() - start
+
+        _LOGGER.debug(
+            "Target manager %s %s returned %d in %.1f ms.",
+            method,
+            path,
+            response.status_code,
+            elapsed_seconds * 1000,
+        )
+        with self._stats_lock:
+            previous = self._call_stats.get(
+                method,
+                CallStats(count=0, total_seconds=0, max_seconds=0),
+            )
+            self._call_stats[method] = CallStats(
+                count=previous.count + 1,
+                total_seconds=previous.total_seconds + elapsed_seconds,
+                max_seconds=max(previous.max_seconds, elapsed_seconds),
+            )
+        return response
+
+
+@functools.cache
+def _get_target_manager_client(
+    base_url: str,
+    pool_size: int,
+    timeout_seconds: float,
+    max_retries: int,
+    unix_socket_path: Path | None,
+) -> TargetManagerClient:
+    """
+    Get a client for the target manager, shared by everything with the same
+    options, so that connections are reused.
+    """
+    return TargetManagerClient(
+        base_url=base_url,
+        pool_size=pool_size,
+        timeout_seconds=timeout_seconds,
+        max_retries=max_retries,
+        unix_socket_path=unix_socket_path,
+    )
+
+
+def get_target_manager_client(
+    settings: TargetManagerClientSettings,
+) -> TargetManagerClient:
+    """
+    Get a client for the target manager with the given settings.
+
+    Clients are shared, so that connections are reused.
+
+    Args:
+        settings: Settings for the connection to the target manager.
+    """
+    return _get_target_manager_client(
+        base_url=settings.target_manager_base_url,
+        pool_size=settings.target_manager_pool_size,
+        timeout_seconds=settings.target_manager_timeout_seconds,
+        max_retries=settings.target_manager_max_retries,
+        unix_socket_path=settings.target_manager_unix_socket_path,
+    )
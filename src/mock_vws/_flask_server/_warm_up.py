@@ -0,0 +1,57 @@
+"""
+Warm-up for the image matchers and target raters which the Flask apps use.
+"""
+
+from __future__ import annotations
+
+import io
+from typing import TYPE_CHECKING
+
+from PIL import Image
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from mock_vws.image_matchers import ImageMatcher
+    from mock_vws.target_raters import TargetTrackingRater
+
+
+def _get_warm_up_image_content() -> bytes:
+    """
+    Get the content of a small noisy PNG image.
+
+    The image is noisy so that raters do the same work as for a real target
+    image, rather than giving up on a blank image.
+    """
+    size = (64, 64)
+    sigma = 64
+    image = Image.effect_noise(size=size, sigma=sigma).convert(mode="RGB")
+    image_buffer = io.BytesIO()
+    image.save(fp=image_buffer, format="PNG")
+    return image_buffer.getvalue()
+
+
+def warm_up(
+    image_matchers: Iterable[ImageMatcher],
+    target_tracking_raters: Iterable[TargetTrackingRater],
+) -> None:
+    """
+    Use each image matcher and target rater once.
+
+    The first use of some matchers and raters is slow, for example while
+    ``torch`` and ``piq`` load their kernels.
+    Doing this before an app serves requests keeps that time out of the first
+    requests.
+
+    Args:
+        image_matchers: The image matchers to use.
+        target_tracking_raters: The target raters to use.
+    """
+    image_content = _get_warm_up_image_content()
+    for image_matcher in image_matchers:
+        image_matcher(
+            first_image_content=image_content,
+            second_image_content=image_content,
+        )
+    for target_tracking_rater in target_tracking_raters:
+        target_tracking_rater(image_content=image_content)
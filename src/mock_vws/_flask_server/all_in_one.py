@@ -0,0 +1,299 @@
+"""
+A fake implementation of the Vuforia Web Services API, the Vuforia Web Query
+API and the target manager in one Flask application.
+
+The VWS and VWQ routes use the same implementation as
+:class:`mock_vws.MockVWS`, with the target manager's databases, so requests
+do not go through the target manager's HTTP API.
+"""
+
+import functools
+import re
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from pathlib import Path
+from typing import Self
+
+from flask import Blueprint, Flask, Response, current_app, request
+
+from mock_vws._flask_server._choices import (
+    ImageMatcherChoice,
+    TargetRaterChoice,
+)
+from mock_vws._flask_server._server_settings import ServerSettings
+from mock_vws._flask_server._warm_up import warm_up
+from mock_vws._flask_server.target_manager import (
+    TARGET_MANAGER,
+    TARGET_MANAGER_FLASK_APP,
+)
+from mock_vws._requests_mock_server.mock_web_query_api import (
+    MockVuforiaWebQueryAPI,
+)
+from mock_vws._requests_mock_server.mock_web_services_api import (
+    MockVuforiaWebServicesAPI,
+)
+from mock_vws._target_processing import TargetProcessor
+from mock_vws.image_matchers import (
+    ImageMatcher,
+    PerceptualHashPrefilterMatcher,
+)
+from mock_vws.target_raters import TargetTrackingRater
+
+_BLUEPRINT = Blueprint(name="all_in_one", import_name=__name__)
+
+
+class AllInOneSettings(ServerSettings):
+    """Settings for the all-in-one Flask app."""
+
+    all_in_one_host: str = ""
+    processing_time_seconds: float = 2
+    duplicates_image_matcher: (
+        ImageMatcherChoice
+    ) = ImageMatcherChoice.STRUCTURAL_SIMILARITY
+    query_image_matcher: ImageMatcherChoice = (
+        ImageMatcherChoice.STRUCTURAL_SIMILARITY
+    )
+    query_perceptual_hash_prefilter: bool = False
+    target_rater: TargetRaterChoice = TargetRaterChoice.BRISQUE
+    brisque_cache_max_bytes: int = 1024 * 1024
+    analysis_cache_directory: Path | None = None
+
+
+@dataclass(frozen=True)
+class _AppState:
+    """
+    Settings and long-lived objects for an all-in-one Flask app.
+    """
+
+    settings: AllInOneSettings
+    duplicates_image_matcher: ImageMatcher
+    query_image_matcher: ImageMatcher
+    target_tracking_rater: TargetTrackingRater
+    services_api: MockVuforiaWebServicesAPI
+    query_api: MockVuforiaWebQueryAPI
+
+    @classmethod
+    def from_settings(cls, settings: AllInOneSettings) -> Self:
+        """
+        Create the objects which the given settings choose.
+
+        Args:
+            settings: Settings for the app.
+        """
+        analysis_cache_directory = settings.analysis_cache_directory
+        duplicates_image_matcher = (
+            settings.duplicates_image_matcher.to_image_matcher(
+                analysis_cache_directory=analysis_cache_directory,
+            )
+        )
+        query_image_matcher = settings.query_image_matcher.to_image_matcher(
+            analysis_cache_directory=analysis_cache_directory,
+        )
+        if settings.query_perceptual_hash_prefilter:
+            query_image_matcher = PerceptualHashPrefilterMatcher(
+                matcher=query_image_matcher,
+            )
+        target_tracking_rater = settings.target_rater.to_target_rater(
+            brisque_cache_max_bytes=settings.brisque_cache_max_bytes,
+            analysis_cache_directory=analysis_cache_directory,
+        )
+
+        return cls(
+            settings=settings,
+            duplicates_image_matcher=duplicates_image_matcher,
+            query_image_matcher=query_image_matcher,
+            target_tracking_rater=target_tracking_rater,
+            services_api=MockVuforiaWebServicesAPI(
+                target_manager=TARGET_MANAGER,
+                processing_time_seconds=settings.processing_time_seconds,
+                duplicate_match_checker=duplicates_image_matcher,
+                target_tracking_rater=target_tracking_rater,
+                target_processor=TargetProcessor(
+                    image_matchers=[
+                        duplicates_image_matcher,
+                        query_image_matcher,
+                    ],
+                ),
+                analysis_cache_directory=analysis_cache_directory,
+            ),
+            query_api=MockVuforiaWebQueryAPI(
+                target_manager=TARGET_MANAGER,
+                query_match_checker=query_image_matcher,
+            ),
+        )
+
+
+def _get_app_state() -> _AppState:
+    """
+    Get the settings and long-lived objects for the current app.
+
+    Apps made with :func:`create_app` have these from when they were made.
+    For :data:`ALL_IN_ONE_FLASK_APP`, settings are read from environment
+    variables for each request, so that they can be changed while the app is
+    in use.
+    """
+    app_state = current_app.extensions.get(_BLUEPRINT.name)
+    if isinstance(app_state, _AppState):
+        return app_state
+    settings = AllInOneSettings.model_validate(obj={})
+    return _get_app_state_for_settings(
+        settings_json=settings.model_dump_json(),
+    )
+
+
+# Only the latest settings are kept, as settings rarely change while the app
+# is in use, and each app state holds image caches.
+@functools.lru_cache(maxsize=1)
+def _get_app_state_for_settings(settings_json: str) -> _AppState:
+    """
+    Get the settings and long-lived objects for the given settings, shared by
+    all requests made with those settings, so that image matchers and the
+    target processor are not created for each request.
+
+    Args:
+        settings_json: The settings, as JSON.
+    """
+    settings = AllInOneSettings.model_validate_json(json_data=settings_json)
+    return _AppState.from_settings(settings=settings)
+
+
+@dataclass(frozen=True)
+class _Request:
+    """
+    The parts of a request which the mock API implementations use.
+    """
+
+    headers: dict[str, str]
+    body: bytes
+    method: str
+    path: str
+
+
+@dataclass
+class _Context:
+    """
+    The parts of a response which the mock API implementations set.
+    """
+
+    status_code: int = HTTPStatus.OK
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+@_BLUEPRINT.before_app_request
+def set_terminate_wsgi_input() -> None:
+    """
+    We set ``wsgi.input_terminated`` to ``True`` when going through
+    ``requests`` in our tests, so that requests have the given
+    ``Content-Length`` headers and the given data in ``request.headers`` and
+    ``request.data``.
+
+    See the VWS Flask application for details.
+    """
+    try:
+        set_terminate_wsgi_input_true = (
+            current_app.config["VWS_MOCK_TERMINATE_WSGI_INPUT"] is True
+        )
+    except KeyError:
+        set_terminate_wsgi_input_true = False
+
+    if set_terminate_wsgi_input_true:
+        request.environ["wsgi.input_terminated"] = True
+
+
+@_BLUEPRINT.route(
+    "/<path:_>",
+    methods=["GET", "POST", "PUT", "DELETE"],
+)
+def mock_api(_: str) -> Response:
+    """
+    Handle a request to the VWS or VWQ API.
+    """
+    app_state = _get_app_state()
+    for api in (app_state.services_api, app_state.query_api):
+        for api_route in api.routes:
+            if request.method in api_route.http_methods and re.fullmatch(
+                pattern=api_route.path_pattern,
+                string=request.path,
+            ):
+                context = _Context()
+                response_text = getattr(api, api_route.route_name)(
+                    _Request(
+                        headers=dict(request.headers),
+                        body=request.data,
+                        method=request.method,
+                        path=request.path,
+                    ),
+                    context,
+                )
+                return Response(
+                    response=response_text,
+                    status=context.status_code,
+                    headers=context.headers,
+                )
+
+    return Response(response="", status=HTTPStatus.NOT_FOUND)
+
+
+def _create_flask_app() -> Flask:
+    """
+    Create a Flask app with the all-in-one routes.
+    """
+    flask_app = Flask(import_name=__name__)
+    flask_app.config["PROPAGATE_EXCEPTIONS"] = True
+
+    # Only the target manager routes for managing databases are served.
+    # The other target manager routes are for separate VWS and VWQ
+    # applications, and they do not see changes made through the VWS routes
+    # of this app.
+    for endpoint in (
+        "target_manager.create_database",
+        "target_manager.delete_database",
+    ):
+        for rule in TARGET_MANAGER_FLASK_APP.url_map.iter_rules(
+            endpoint=endpoint,
+        ):
+            flask_app.add_url_rule(
+                rule=rule.rule,
+                endpoint=endpoint,
+                view_func=TARGET_MANAGER_FLASK_APP.view_functions[endpoint],
+                methods=rule.methods,
+            )
+
+    flask_app.register_blueprint(blueprint=_BLUEPRINT)
+    return flask_app
+
+
+def create_app(settings: AllInOneSettings) -> Flask:
+    """
+    Create an all-in-one Flask app with fixed settings.
+
+    The image matchers and target rater are created once and used for every
+    request, and they are warmed up before this returns, so that the app is
+    ready to serve requests quickly.
+
+    Args:
+        settings: Settings for the app.
+
+    Returns:
+        The Flask app.
+    """
+    app_state = _AppState.from_settings(settings=settings)
+    warm_up(
+        image_matchers=[
+            app_state.duplicates_image_matcher,
+            app_state.query_image_matcher,
+        ],
+        target_tracking_raters=[app_state.target_tracking_rater],
+    )
+    flask_app = _create_flask_app()
+    flask_app.extensions[_BLUEPRINT.name] = app_state
+    return flask_app
+
+
+# This app reads settings from environment variables for each request.
+ALL_IN_ONE_FLASK_APP = _create_flask_app()
+
+
+if __name__ == "__main__":  # pragma: no cover
+    SETTINGS = AllInOneSettings.model_validate(obj={})
+    create_app(settings=SETTINGS).run(host=SETTINGS.all_in_one_host)
@@ -0,0 +1,143 @@
+"""
+Serve the mock Flask applications with a production WSGI server.
+
+For example::
+
+    mock-vws serve vws
+"""
+
+from __future__ import annotations
+
+import argparse
+import functools
+from typing import TYPE_CHECKING
+
+from mock_vws._flask_server import all_in_one, target_manager, vwq, vws
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+    from pathlib import Path
+
+    from flask import Flask
+
+    from mock_vws._flask_server._server_settings import ServerSettings
+
+_PORT = 5000
+
+
+def _serve(
+    create_app: Callable[[], Flask],
+    host: str,
+    workers: int,
+    settings: ServerSettings,
+    unix_socket_path: Path | None = None,
+) -> None:
+    """
+    Serve a Flask app until the process is stopped.
+
+    Args:
+        create_app: A callable which creates the Flask app to serve.
+        host: The host to listen on. If this is empty, only local
+            connections are accepted, as with ``Flask.run``.
+        workers: The number of worker processes.
+        settings: Settings for the server.
+        unix_socket_path: A Unix domain socket to also listen on, if any.
+
+    Raises:
+        SystemExit: Gunicorn is not installed.
+    """
+    # Gunicorn is an optional dependency, as it is not needed to use the mock
+    # in tests and it does not run on Windows.
+    try:
+        # pylint: disable-next=import-outside-toplevel
+        from mock_vws._flask_server._gunicorn import GunicornApplication
+    except ImportError as exc:
+        message = (
+            "Serving a mock application requires Gunicorn. "
+            'Install it with "pip install vws-python-mock[server]".'
+        )
+        raise SystemExit(message) from exc
+
+    binds = [f"{host or '127.0.0.1'}:{_PORT}"]
+    if unix_socket_path is not None:
+        binds.append(f"unix:{unix_socket_path}")
+    options: dict[str, str | int | list[str]] = {
+        "bind": binds,
+        "workers": workers,
+        "worker_class": "gthread",
+        "threads": settings.server_threads,
+        "keepalive": settings.server_keepalive_seconds,
+        "backlog": settings.server_backlog,
+    }
+    GunicornApplication(create_app=create_app, options=options).run()
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    """
+    Run the ``mock-vws`` command.
+
+    Settings are read from environment variables once, when the command
+    starts.
+    The target manager and all-in-one apps keep their state in memory, so
+    they are always served by one worker process.
+
+    Args:
+        argv: The command line arguments. Defaults to ``sys.argv[1:]``.
+    """
+    parser = argparse.ArgumentParser(prog="mock-vws")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser(
+        name="serve",
+        help="Serve a mock application with a production WSGI server.",
+    )
+    serve_parser.add_argument(
+        "application",
+        choices=["vws", "vwq", "target-manager", "all-in-one"],
+    )
+    args = parser.parse_args(args=argv)
+
+    if args.application == "vws":
+        vws_settings = vws.VWSSettings.model_validate(obj={})
+        _serve(
+            create_app=functools.partial(vws.create_app, vws_settings),
+            host=vws_settings.vws_host,
+            workers=vws_settings.server_workers,
+            settings=vws_settings,
+        )
+    elif args.application == "vwq":
+        vwq_settings = vwq.VWQSettings.model_validate(obj={})
+        _serve(
+            create_app=functools.partial(vwq.create_app, vwq_settings),
+            host=vwq_settings.vwq_host,
+            workers=vwq_settings.server_workers,
+            settings=vwq_settings,
+        )
+    elif args.application == "target-manager":
+        target_manager_settings = (
+            target_manager.TargetManagerSettings.model_validate(obj={})
+        )
+        _serve(
+            create_app=functools.partial(
+                target_manager.create_app,
+                target_manager_settings,
+            ),
+            host=target_manager_settings.target_manager_host,
+            workers=1,
+            settings=target_manager_settings,
+            unix_socket_path=(
+                target_manager_settings.target_manager_unix_socket_path
+            ),
+        )
+    else:
+        all_in_one_settings = all_in_one.AllInOneSettings.model_validate(
+            obj={},
+        )
+        _serve(
+            create_app=functools.partial(
+                all_in_one.create_app,
+                all_in_one_settings,
+            ),
+            host=all_in_one_settings.all_in_one_host,
+            workers=1,
+            settings=all_in_one_settings,
+        )
@@ -5,56 +5,397 @@ Storage layer for the mock Vuforia Flask application.
 import base64
 import dataclasses
 import datetime
+import functools
+import hashlib
+import itertools
 import json
+import threading
+import uuid
+from dataclasses import dataclass
 from enum import StrEnum, auto
 from http import HTTPStatus
+from pathlib import Path
+from typing import Self
 from zoneinfo import ZoneInfo
 
-from flask import Flask, Response, request
-from pydantic_settings import BaseSettings
+from flask import Blueprint, Flask, Response, current_app, request
+from werkzeug.http import quote_etag
 
+from mock_vws._flask_server._change_log import (
+    SEQUENCE_NUMBER_HEADER,
+    ChangeLog,
+)
+from mock_vws._flask_server._choices import TargetRaterChoice
+from mock_vws._flask_server._server_settings import ServerSettings
+from mock_vws._flask_server._storage import (
+    InMemoryStorageBackend,
+    SQLiteStorageBackend,
+    StorageBackend,
+)
+from mock_vws._flask_server._target_etags import get_target_etag
+from mock_vws._flask_server._warm_up import warm_up
+from mock_vws._image_digests import get_image_digest
+from mock_vws._target_processing import TargetProcessor
 from mock_vws.database import VuforiaDatabase
 from mock_vws.states import States
 from mock_vws.target import Target
 from mock_vws.target_manager import TargetManager
-from mock_vws.target_raters import (
-    BrisqueTargetTrackingRater,
-    HardcodedTargetTrackingRater,
-    RandomTargetTrackingRater,
-    TargetTrackingRater,
-)
+from mock_vws.target_raters import TargetTrackingRater
 
-TARGET_MANAGER_FLASK_APP = Flask(__name__)
+_BLUEPRINT = Blueprint(name="target_manager", import_name=__name__)
 
 TARGET_MANAGER = TargetManager()
 
+CHANGE_LOG = ChangeLog()
+
+# Each change to a database gives it a new generation from this counter.
+# Generations are unique within this process, and entity tags include an ID
+# for this process, so an entity tag always refers to one version of the
+# databases.
+_GENERATIONS = itertools.count()
+_INSTANCE_ID = uuid.uuid4().hex
+_DATABASE_GENERATIONS: dict[str, int] = {}
+
+# Changes to targets are made one at a time, so that checking a target's
+# version or whether a name is in use, and then changing the target, cannot
+# be interleaved with another change.
+_TARGET_WRITE_LOCK = threading.Lock()
+
+# New and updated targets are rated in the background while they are
+# processing, so that reading them later is fast.
+_TARGET_PROCESSOR = TargetProcessor()
+
+
+def _bump_generation(database_name: str) -> None:
+    """
+    Record that a database has changed.
+    """
+    _DATABASE_GENERATIONS[database_name] = next(_GENERATIONS)
+
+
+def _get_etag(
+    databases: list[VuforiaDatabase],
+    *,
+    include_images: bool = True,
+) -> str:
+    """
+    Get an entity tag for the given versions of the given databases, with or
+    without images.
+    """
+    # A database which has just been added may not have a generation yet.
+    # Its entity tag changes once it has one, so a response cached with
+    # this entity tag is not reused.
+    generations = sorted(
+        (
+            database.database_name,
+            _DATABASE_GENERATIONS.get(database.database_name, -1),
+        )
+        for database in databases
+    )
+    digest = hashlib.blake2b(
+        json.dumps(obj=[_INSTANCE_ID, include_images, generations]).encode(),
+        digest_size=16,
+    ).hexdigest()
+    return quote_etag(etag=digest)
+
+
+def _get_image(image_digest: str) -> bytes:
+    """
+    Get an image which is used by a target in any database.
+
+    Raises:
+        KeyError: No target has an image with the given digest.
+    """
+    for database in TARGET_MANAGER.databases:
+        try:
+            return database.targets.get_image(image_digest=image_digest)
+        except KeyError:
+            continue
+    raise KeyError(image_digest)
+
+
+def _deduplicate_image(image_content: bytes) -> bytes:
+    """
+    Return a stored image with the same content as the given image if there
+    is one, so that each image is kept in memory once.
+    """
+    image_digest = get_image_digest(image_content=image_content)
+    try:
+        return _get_image(image_digest=image_digest)
+    except KeyError:
+        return image_content
+
+
+def _get_rating_due(target: Target) -> datetime.datetime:
+    """
+    Get the time at which a target's tracking rating becomes available.
+    """
+    return target.upload_date + datetime.timedelta(
+        seconds=target.processing_time_seconds / 2,
+    )
+
+
+def _record_target_change(
+    database_name: str,
+    target: Target,
+    *,
+    rate: bool = False,
+) -> int:
+    """
+    Add a change to the change log for a new version of a target.
+
+    Args:
+        database_name: The name of the target's database.
+        target: The new version of the target.
+        rate: Whether to compute the target's tracking rating if it is
+            available and has not been computed yet. This can be slow, so it
+            is not done while :data:`_TARGET_WRITE_LOCK` is held. If the
+            rating is not given, a change is scheduled for when it is
+            available.
+
+    Returns:
+        The sequence number of the change.
+    """
+    target_dict = target.to_dict(include_image=False, rate=rate)
+    if not rate and target_dict["tracking_rating"] == -1:
+        CHANGE_LOG.schedule_rating(
+            due=_get_rating_due(target=target),
+            database_name=database_name,
+            target_id=target.target_id,
+        )
+    return CHANGE_LOG.record(
+        change={
+            "type": "target_changed",
+            "database_name": database_name,
+            "target": target_dict,
+        },
+    )
+
+
+def _schedule_ratings() -> None:
+    """
+    Schedule changes for the tracking ratings of existing targets which are
+    not available yet, the first time this is called.
 
-class _TargetRaterChoice(StrEnum):
-    """Target rater choices."""
+    Ratings are not scheduled until something reads changes, so that they do
+    not build up when no databases are replicated.
+    """
+    if not CHANGE_LOG.start_scheduling_ratings():
+        return
+    gmt = ZoneInfo("GMT")
+    now = datetime.datetime.now(tz=gmt)
+    for database in TARGET_MANAGER.databases:
+        for target in database.targets:
+            rating_due = _get_rating_due(target=target)
+            # Ratings which are already available are given to readers when
+            # they load the databases.
+            if rating_due > now:
+                CHANGE_LOG.schedule_rating(
+                    due=rating_due,
+                    database_name=database.database_name,
+                    target_id=target.target_id,
+                )
+
+
+def _record_due_ratings() -> None:
+    """
+    Add changes to the change log for targets whose tracking ratings have
+    become available.
+    """
+    gmt = ZoneInfo("GMT")
+    now = datetime.datetime.now(tz=gmt)
+    databases_by_name = {
+        database.database_name: database
+        for database in TARGET_MANAGER.databases
+    }
+    for database_name, target_id in CHANGE_LOG.pop_due_ratings(now=now):
+        try:
+            database = databases_by_name[database_name]
+            target = database.get_target(target_id=target_id)
+        except (KeyError, ValueError):
+            continue
+        _record_target_change(
+            database_name=database_name,
+            target=target,
+            rate=True,
+        )
 
-    BRISQUE = auto()
-    PERFECT = auto()
-    RANDOM = auto()
 
-    def to_target_rater(self) -> TargetTrackingRater:
-        """Get the target rater."""
-        rater = {
-            _TargetRaterChoice.BRISQUE: BrisqueTargetTrackingRater(),
-            _TargetRaterChoice.PERFECT: HardcodedTargetTrackingRater(rating=5),
-            _TargetRaterChoice.RANDOM: RandomTargetTrackingRater(),
-        }[self]
-        assert isinstance(rater, TargetTrackingRater)
-        return rater
+class _StorageBackendChoice(StrEnum):
+    """Storage backend choices."""
 
+    MEMORY = auto()
+    SQLITE = auto()
 
-class TargetManagerSettings(BaseSettings):
+
+class TargetManagerSettings(ServerSettings):
     """Settings for the Target Manager Flask app."""
 
+    # Each VWS and VWQ worker process which replicates databases holds a
+    # thread waiting for changes, so more threads are used than for other
+    # apps, leaving threads free for other requests.
+    server_threads: int = 64
     target_manager_host: str = ""
-    target_rater: _TargetRaterChoice = _TargetRaterChoice.BRISQUE
+    target_rater: TargetRaterChoice = TargetRaterChoice.BRISQUE
+    brisque_cache_max_bytes: int = 1024 * 1024
+    analysis_cache_directory: Path | None = None
+    storage_backend: _StorageBackendChoice = _StorageBackendChoice.MEMORY
+    sqlite_database_path: Path = Path("target_manager.sqlite3")
+    target_manager_unix_socket_path: Path | None = None
+
 
+# All apps in a process share :data:`TARGET_MANAGER`, so stored databases are
+# loaded into it once, by the first app state which is made.
+_STORAGE_BACKEND_LOCK = threading.Lock()
+_STORAGE_BACKENDS: list[StorageBackend] = []
+
+
+def _get_storage_backend(
+    settings: TargetManagerSettings,
+    target_tracking_rater: TargetTrackingRater,
+) -> StorageBackend:
+    """
+    Get the storage backend chosen in the settings, and the first time this
+    is called, add the databases which it has stored to
+    :data:`TARGET_MANAGER`.
 
-@TARGET_MANAGER_FLASK_APP.route(
+    This holds a lock while loading, so that requests which are handled at
+    the same time do not load the databases twice.
+    """
+    with _STORAGE_BACKEND_LOCK:
+        if _STORAGE_BACKENDS:
+            return _STORAGE_BACKENDS[0]
+
+        storage_backend: StorageBackend
+        if settings.storage_backend == _StorageBackendChoice.SQLITE:
+            storage_backend = SQLiteStorageBackend(
+                path=settings.sqlite_database_path,
+            )
+        else:
+            storage_backend = InMemoryStorageBackend()
+
+        for database in storage_backend.load_databases(
+            target_tracking_rater=target_tracking_rater,
+        ):
+            TARGET_MANAGER.add_database(database=database)
+            _bump_generation(database_name=database.database_name)
+            for target in database.targets:
+                # Targets without a stored rating are given the app's rater,
+                # so they are rated in the background and their ratings are
+                # stored.
+                if target.target_tracking_rater is target_tracking_rater:
+                    _TARGET_PROCESSOR.submit(
+                        target=target,
+                        on_processed=functools.partial(
+                            _save_tracking_rating,
+                            storage_backend,
+                            database.database_name,
+                        ),
+                    )
+
+        _STORAGE_BACKENDS.append(storage_backend)
+        return storage_backend
+
+
+def _save_tracking_rating(
+    storage_backend: StorageBackend,
+    database_name: str,
+    target: Target,
+) -> None:
+    """
+    Store the tracking rating of a target which has been processed.
+    """
+    storage_backend.save_tracking_rating(
+        database_name=database_name,
+        target_id=target.target_id,
+        image_digest=target.image_digest,
+        tracking_rating=target.post_processing_tracking_rating,
+    )
+
+
+@dataclass(frozen=True)
+class _AppState:
+    """
+    Settings and long-lived objects for a target manager Flask app.
+    """
+
+    settings: TargetManagerSettings
+    target_tracking_rater: TargetTrackingRater
+    storage_backend: StorageBackend
+
+    @classmethod
+    def from_settings(cls, settings: TargetManagerSettings) -> Self:
+        """
+        Create the objects which the given settings choose, loading any
+        databases which the chosen storage backend has stored.
+
+        Args:
+            settings: Settings for the app.
+        """
+        target_tracking_rater = settings.target_rater.to_target_rater(
+            brisque_cache_max_bytes=settings.brisque_cache_max_bytes,
+            analysis_cache_directory=settings.analysis_cache_directory,
+        )
+        return cls(
+            settings=settings,
+            target_tracking_rater=target_tracking_rater,
+            storage_backend=_get_storage_backend(
+                settings=settings,
+                target_tracking_rater=target_tracking_rater,
+            ),
+        )
+
+    def submit_for_processing(
+        self,
+        database_name: str,
+        target: Target,
+    ) -> None:
+        """
+        Process a new or updated target in the background, and store its
+        tracking rating once it has been computed.
+
+        Args:
+            database_name: The name of the target's database.
+            target: The target to process.
+        """
+        _TARGET_PROCESSOR.submit(
+            target=target,
+            on_processed=functools.partial(
+                _save_tracking_rating,
+                self.storage_backend,
+                database_name,
+            ),
+        )
+
+
+def _get_app_state() -> _AppState:
+    """
+    Get the settings and long-lived objects for the current app.
+
+    Apps made with :func:`create_app` have these from when they were made.
+    For :data:`TARGET_MANAGER_FLASK_APP`, settings are read from environment
+    variables for each request, so that they can be changed while the app is
+    in use.
+    The storage backend settings are the exception, as all apps in a process
+    share :data:`TARGET_MANAGER`, which is loaded from the storage backend
+    chosen for the first request.
+    """
+    app_state = current_app.extensions.get(_BLUEPRINT.name)
+    if isinstance(app_state, _AppState):
+        return app_state
+    settings = TargetManagerSettings.model_validate(obj={})
+    return _AppState.from_settings(settings=settings)
+
+
+@_BLUEPRINT.before_app_request
+def load_stored_databases() -> None:
+    """
+    Load databases from the storage backend before the first request.
+    """
+    _get_app_state()
+
+
+@_BLUEPRINT.route(
     "/databases/<string:database_name>",
     methods=["DELETE"],
 )
@@ -73,23 +414,122 @@ def delete_database(database_name: str) -> Response:
     except ValueError:
         return Response(response="", status=HTTPStatus.NOT_FOUND)
 
-    TARGET_MANAGER.remove_database(database=matching_database)
-    return Response(response="", status=HTTPStatus.OK)
+    try:
+        TARGET_MANAGER.remove_database(database=matching_database)
+    except KeyError:
+        # Another request has deleted the database.
+        return Response(response="", status=HTTPStatus.NOT_FOUND)
+    _get_app_state().storage_backend.delete_database(
+        database_name=database_name,
+    )
+    _DATABASE_GENERATIONS.pop(database_name, None)
+    sequence_number = CHANGE_LOG.record(
+        change={"type": "database_deleted", "database_name": database_name},
+    )
+    return Response(
+        response="",
+        status=HTTPStatus.OK,
+        headers={SEQUENCE_NUMBER_HEADER: str(sequence_number)},
+    )
 
 
-@TARGET_MANAGER_FLASK_APP.route("/databases", methods=["GET"])
+def _get_databases_with_access_keys(
+    server_access_key: str | None,
+    client_access_key: str | None,
+) -> list[VuforiaDatabase]:
+    """
+    Get the databases with the given access keys.
+
+    Databases are looked up by access key, so that each request for one
+    database does not check every database.
+
+    Args:
+        server_access_key: The server access key to match, or ``None`` to
+            match any server access key.
+        client_access_key: The client access key to match, or ``None`` to
+            match any client access key.
+    """
+    if server_access_key is None and client_access_key is None:
+        return list(TARGET_MANAGER.databases)
+
+    try:
+        if server_access_key is not None:
+            database = TARGET_MANAGER.get_database_by_server_access_key(
+                server_access_key=server_access_key,
+            )
+        else:
+            assert client_access_key is not None
+            database = TARGET_MANAGER.get_database_by_client_access_key(
+                client_access_key=client_access_key,
+            )
+    except KeyError:
+        return []
+
+    if client_access_key not in {None, database.client_access_key}:
+        return []
+    return [database]
+
+
+@_BLUEPRINT.route("/databases", methods=["GET"])
 def get_databases() -> Response:
     """
-    Return a list of all databases.
+    Return a list of all databases, or of the databases with given keys.
+
+    The response has an entity tag which changes whenever the returned
+    databases change, unless a target's tracking rating is still pending.
+    A pending tracking rating changes with time rather than with a request,
+    so the response cannot be reused.
+
+    :query server_access_key: (Optional) Only return the database with this
+      server access key.
+    :query client_access_key: (Optional) Only return the database with this
+      client access key.
+    :query include_images: (Optional) Whether to include the targets' images.
+      If this is ``false``, images can be fetched from ``/blobs/<digest>``
+      using each target's ``image_digest``. This defaults to ``true``.
+
+    :reqheader If-None-Match: (Optional) An entity tag from a previous
+      response.
+
+    :resheader ETag: The entity tag for the returned databases.
+
+    :status 200: The databases are returned.
+    :status 304: The databases have not changed since the response with the
+      entity tag given in ``If-None-Match``.
     """
-    databases = [database.to_dict() for database in TARGET_MANAGER.databases]
+    server_access_key = request.args.get("server_access_key")
+    client_access_key = request.args.get("client_access_key")
+    include_images = request.args.get("include_images", "true") != "false"
+    databases = _get_databases_with_access_keys(
+        server_access_key=server_access_key,
+        client_access_key=client_access_key,
+    )
+    etag = _get_etag(databases=databases, include_images=include_images)
+    if request.if_none_match.contains_raw(etag=etag):
+        return Response(
+            response="",
+            status=HTTPStatus.NOT_MODIFIED,
+            headers={"ETag": etag},
+        )
+
+    database_dicts = [
+        database.to_dict(include_images=include_images)
+        for database in databases
+    ]
+    rating_pending = any(
+        target_dict["tracking_rating"] == -1
+        for database_dict in database_dicts
+        for target_dict in database_dict["targets"]
+    )
+    headers = {} if rating_pending else {"ETag": etag}
     return Response(
-        response=json.dumps(obj=databases),
+        response=json.dumps(obj=database_dicts),
         status=HTTPStatus.OK,
+        headers=headers,
     )
 
 
-@TARGET_MANAGER_FLASK_APP.route("/databases", methods=["POST"])
+@_BLUEPRINT.route("/databases", methods=["POST"])
 def create_database() -> Response:
     """
     Create a new database.
@@ -118,6 +558,8 @@ def create_database() -> Response:
       "PROJECT_INACTIVE".
     :reqjsonarr targets: The targets in the database.
 
+    :resheader ETag: The entity tag for the database.
+
     :status 201: The database has been successfully created.
     """
     random_database = VuforiaDatabase()
@@ -165,19 +607,64 @@ def create_database() -> Response:
             status=HTTPStatus.CONFLICT,
         )
 
+    _get_app_state().storage_backend.save_database(database=database)
+    _bump_generation(database_name=database.database_name)
+    sequence_number = CHANGE_LOG.record(
+        change={
+            "type": "database_created",
+            "database_name": database.database_name,
+            "database": database.to_dict(include_images=False),
+        },
+    )
     return Response(
         response=json.dumps(database.to_dict()),
         status=HTTPStatus.CREATED,
+        headers={
+            "ETag": _get_etag(databases=[database]),
+            SEQUENCE_NUMBER_HEADER: str(sequence_number),
+        },
+    )
+
+
+def _conflict_response(status: HTTPStatus, message: str) -> Response:
+    """
+    Get the response for a request to change a target which conflicts with
+    the target's current state.
+
+    The response has the sequence number of the latest change, so that a
+    client which reads from a replica can wait for the replica to include
+    the state which caused the conflict.
+    """
+    return Response(
+        response=message,
+        status=status,
+        headers={SEQUENCE_NUMBER_HEADER: str(CHANGE_LOG.sequence_number)},
+    )
+
+
+def _name_in_use(database: VuforiaDatabase, name: str, target_id: str) -> bool:
+    """
+    Whether a target other than the one with the given ID, which has not been
+    deleted, has the given name.
+    """
+    return any(
+        other.target_id != target_id
+        for other in database.targets.not_deleted_with_name(name=name)
     )
 
 
-@TARGET_MANAGER_FLASK_APP.route(
+@_BLUEPRINT.route(
     "/databases/<string:database_name>/targets",
     methods=["POST"],
 )
 def create_target(database_name: str) -> Response:
     """
     Create a new target in a given database.
+
+    :resheader ETag: The entity tag for the new target.
+
+    :status 201: The target has been created.
+    :status 409: A target which has not been deleted has the given name.
     """
     (database,) = (
         database
@@ -186,9 +673,10 @@ def create_target(database_name: str) -> Response:
     )
     request_json = json.loads(request.data)
     image_base64 = request_json["image_base64"]
-    image_bytes = base64.b64decode(s=image_base64)
-    settings = TargetManagerSettings.model_validate(obj={})
-    target_tracking_rater = settings.target_rater.to_target_rater()
+    image_bytes = _deduplicate_image(
+        image_content=base64.b64decode(s=image_base64),
+    )
+    app_state = _get_app_state()
 
     target = Target(
         name=request_json["name"],
@@ -198,91 +686,377 @@ def create_target(database_name: str) -> Response:
         processing_time_seconds=request_json["processing_time_seconds"],
         application_metadata=request_json["application_metadata"],
         target_id=request_json["target_id"],
-        target_tracking_rater=target_tracking_rater,
+        target_tracking_rater=app_state.target_tracking_rater,
+        analysis_cache_directory=app_state.settings.analysis_cache_directory,
+    )
+    with _TARGET_WRITE_LOCK:
+        if _name_in_use(
+            database=database,
+            name=target.name,
+            target_id=target.target_id,
+        ):
+            return _conflict_response(
+                status=HTTPStatus.CONFLICT,
+                message="A target with the given name already exists.",
+            )
+        database.targets.add(target)
+        app_state.storage_backend.save_target(
+            database_name=database_name,
+            target=target,
+        )
+        _bump_generation(database_name=database_name)
+        sequence_number = _record_target_change(
+            database_name=database_name,
+            target=target,
+        )
+
+    app_state.submit_for_processing(
+        database_name=database_name,
+        target=target,
     )
-    database.targets.add(target)
 
     return Response(
         response=json.dumps(target.to_dict()),
         status=HTTPStatus.CREATED,
+        headers={
+            "ETag": get_target_etag(target=target),
+            SEQUENCE_NUMBER_HEADER: str(sequence_number),
+        },
     )
 
 
-@TARGET_MANAGER_FLASK_APP.route(
+@_BLUEPRINT.route(
     "/databases/<string:database_name>/targets/<string:target_id>",
     methods=["DELETE"],
 )
 def delete_target(database_name: str, target_id: str) -> Response:
     """
     Delete a target.
+
+    :reqheader If-Match: (Optional) The entity tag of the version of the
+      target which the client expects to delete.
+
+    :resheader ETag: The entity tag for the deleted target.
+
+    :status 200: The target has been deleted.
+    :status 412: The target has changed since the version with the entity tag
+      given in ``If-Match``.
     """
     (database,) = (
         database
         for database in TARGET_MANAGER.databases
         if database.database_name == database_name
     )
-    target = database.get_target(target_id=target_id)
-    now = datetime.datetime.now(tz=target.upload_date.tzinfo)
-    new_target = dataclasses.replace(target, delete_date=now)
-    database.targets.remove(target)
-    database.targets.add(new_target)
+    app_state = _get_app_state()
+    with _TARGET_WRITE_LOCK:
+        target = database.get_target(target_id=target_id)
+        if request.if_match and not request.if_match.contains_raw(
+            etag=get_target_etag(target=target),
+        ):
+            return _conflict_response(
+                status=HTTPStatus.PRECONDITION_FAILED,
+                message="The target has been changed by another request.",
+            )
+
+        now = datetime.datetime.now(tz=target.upload_date.tzinfo)
+        new_target = dataclasses.replace(target, delete_date=now)
+        new_target.reuse_analysis(previous=target)
+        database.targets.replace(old=target, new=new_target)
+        app_state.storage_backend.save_target(
+            database_name=database_name,
+            target=new_target,
+        )
+        _bump_generation(database_name=database_name)
+        sequence_number = _record_target_change(
+            database_name=database_name,
+            target=new_target,
+        )
+
     return Response(
         response=json.dumps(new_target.to_dict()),
         status=HTTPStatus.OK,
+        headers={
+            "ETag": get_target_etag(target=new_target),
+            SEQUENCE_NUMBER_HEADER: str(sequence_number),
+        },
     )
 
 
-@TARGET_MANAGER_FLASK_APP.route(
+@_BLUEPRINT.route(
     "/databases/<string:database_name>/targets/<string:target_id>",
     methods=["PUT"],
 )
 def update_target(database_name: str, target_id: str) -> Response:
     """
     Update a target.
+
+    :reqheader If-Match: (Optional) The entity tag of the version of the
+      target which the client expects to update.
+
+    :resheader ETag: The entity tag for the updated target.
+
+    :status 200: The target has been updated.
+    :status 409: Another target which has not been deleted has the given
+      name.
+    :status 412: The target has changed since the version with the entity tag
+      given in ``If-Match``.
     """
     (database,) = (
         database
         for database in TARGET_MANAGER.databases
         if database.database_name == database_name
     )
-    target = database.get_target(target_id=target_id)
-
     request_json = json.loads(request.data)
-    width = request_json.get("width", target.width)
-    name = request_json.get("name", target.name)
-    active_flag = request_json.get("active_flag", target.active_flag)
-    application_metadata = request_json.get(
-        "application_metadata",
-        target.application_metadata,
+    new_image_value = None
+    if "image" in request_json:
+        new_image_value = _deduplicate_image(
+            image_content=base64.b64decode(s=request_json["image"]),
+        )
+
+    app_state = _get_app_state()
+    with _TARGET_WRITE_LOCK:
+        target = database.get_target(target_id=target_id)
+        if request.if_match and not request.if_match.contains_raw(
+            etag=get_target_etag(target=target),
+        ):
+            return _conflict_response(
+                status=HTTPStatus.PRECONDITION_FAILED,
+                message="The target has been changed by another request.",
+            )
+
+        name = request_json.get("name", target.name)
+        if _name_in_use(database=database, name=name, target_id=target_id):
+            return _conflict_response(
+                status=HTTPStatus.CONFLICT,
+                message="A target with the given name already exists.",
+            )
+
+        gmt = ZoneInfo("GMT")
+        new_target = dataclasses.replace(
+            target,
+            name=name,
+            width=request_json.get("width", target.width),
+            active_flag=request_json.get("active_flag", target.active_flag),
+            application_metadata=request_json.get(
+                "application_metadata",
+                target.application_metadata,
+            ),
+            image_value=(
+                target.image_value
+                if new_image_value is None
+                else new_image_value
+            ),
+            last_modified_date=datetime.datetime.now(tz=gmt),
+        )
+        new_target.reuse_analysis(previous=target)
+        database.targets.replace(old=target, new=new_target)
+        app_state.storage_backend.save_target(
+            database_name=database_name,
+            target=new_target,
+        )
+        _bump_generation(database_name=database_name)
+        sequence_number = _record_target_change(
+            database_name=database_name,
+            target=new_target,
+        )
+
+    app_state.submit_for_processing(
+        database_name=database_name,
+        target=new_target,
+    )
+    return Response(
+        response=json.dumps(new_target.to_dict()),
+        status=HTTPStatus.OK,
+        headers={
+            "ETag": get_target_etag(target=new_target),
+            SEQUENCE_NUMBER_HEADER: str(sequence_number),
+        },
     )
 
-    image_value = target.image_value
-    request_json = json.loads(request.data)
-    if "image" in request_json:
-        image_value = base64.b64decode(s=request_json["image"])
 
-    gmt = ZoneInfo("GMT")
-    last_modified_date = datetime.datetime.now(tz=gmt)
+@_BLUEPRINT.route(
+    "/blobs/<string:image_digest>",
+    methods=["GET"],
+)
+def get_blob(image_digest: str) -> Response:
+    """
+    Return the image with the given digest.
+
+    An image's digest is given as the ``image_digest`` of targets which have
+    that image.
+    The content for a digest never changes, so responses can be cached
+    forever.
+
+    :resheader Content-Type: application/octet-stream
+    :resheader Cache-Control: public, max-age=31536000, immutable
 
-    new_target = dataclasses.replace(
-        target,
-        name=name,
-        width=width,
-        active_flag=active_flag,
-        application_metadata=application_metadata,
-        image_value=image_value,
-        last_modified_date=last_modified_date,
+    :status 200: The image is returned.
+    :status 404: No target has an image with the given digest.
+    """
+    try:
+        image_content = _get_image(image_digest=image_digest)
+    except KeyError:
+        return Response(response="", status=HTTPStatus.NOT_FOUND)
+
+    return Response(
+        response=image_content,
+        status=HTTPStatus.OK,
+        headers={
+            "Content-Type": "application/octet-stream",
+            "Cache-Control": "public, max-age=31536000, immutable",
+            "ETag": quote_etag(etag=image_digest),
+        },
     )
 
-    database.targets.remove(target)
-    database.targets.add(new_target)
 
+@_BLUEPRINT.route("/target-processing", methods=["GET"])
+def get_target_processing() -> Response:
+    """
+    Return statistics about the background processing of new and updated
+    targets.
+
+    :resjson integer queue_depth: The number of targets which are waiting to
+      be processed or which are being processed.
+
+    :status 200: The statistics are returned.
+    """
+    body = {"queue_depth": _TARGET_PROCESSOR.queue_depth}
     return Response(
-        response=json.dumps(new_target.to_dict()),
+        response=json.dumps(obj=body),
         status=HTTPStatus.OK,
+        headers={"Content-Type": "application/json"},
     )
 
 
+@_BLUEPRINT.route("/changes", methods=["GET"])
+def get_changes() -> Response:
+    """
+    Return changes to databases and targets, waiting for a change if there
+    are none yet.
+
+    This can be used to keep a copy of the databases up to date without
+    loading all databases again.
+    If the changes after the given sequence number are not available, for
+    example because the target manager has restarted, all databases are
+    returned instead.
+
+    :resheader Content-Type: application/json
+
+    :query after: (Optional) The sequence number of the latest change which
+      has been seen. If this is not given, all databases are returned.
+    :query instance_id: (Optional) The instance ID given in the response
+      which included the latest change which has been seen.
+    :query timeout_seconds: (Optional) The longest time to wait for a change.
+      This defaults to 0.
+
+    :resjson string instance_id: The ID of this target manager instance.
+    :resjson integer sequence_number: The sequence number of the latest
+      change included in the response.
+    :resjsonarr changes: The changes after the given sequence number, in
+      order. This is not given if ``databases`` is given.
+    :resjsonarr databases: All databases. This is given only if the changes
+      after the given sequence number are not available.
+
+    :status 200: The changes or databases are returned.
+    """
+    after = request.args.get("after", type=int)
+    instance_id = request.args.get("instance_id")
+    max_timeout_seconds = 60
+    timeout_seconds = min(
+        request.args.get("timeout_seconds", default=0, type=float),
+        max_timeout_seconds,
+    )
+    gmt = ZoneInfo("GMT")
+    deadline = datetime.datetime.now(tz=gmt) + datetime.timedelta(
+        seconds=timeout_seconds,
+    )
+
+    _schedule_ratings()
+    changes = None
+    while after is not None and instance_id == _INSTANCE_ID:
+        _record_due_ratings()
+        changes = CHANGE_LOG.changes_after(sequence_number=after)
+        now = datetime.datetime.now(tz=gmt)
+        if changes is None or changes or now >= deadline:
+            break
+        wake_time = deadline
+        next_rating_due = CHANGE_LOG.next_rating_due()
+        if next_rating_due is not None:
+            wake_time = min(wake_time, next_rating_due)
+        CHANGE_LOG.wait(
+            sequence_number=after,
+            timeout_seconds=max((wake_time - now).total_seconds(), 0),
+        )
+
+    if after is not None and changes is not None:
+        body = {
+            "instance_id": _INSTANCE_ID,
+            "sequence_number": (
+                changes[-1]["sequence_number"] if changes else after
+            ),
+            "changes": changes,
+        }
+    else:
+        # The sequence number is read before the databases, so any change
+        # which is in both is applied again by the reader, which is harmless.
+        sequence_number = CHANGE_LOG.sequence_number
+        body = {
+            "instance_id": _INSTANCE_ID,
+            "sequence_number": sequence_number,
+            "databases": [
+                database.to_dict(include_images=False)
+                for database in TARGET_MANAGER.databases
+            ],
+        }
+
+    return Response(
+        response=json.dumps(obj=body),
+        status=HTTPStatus.OK,
+        headers={"Content-Type": "application/json"},
+    )
+
+
+def _create_flask_app() -> Flask:
+    """
+    Create a Flask app with the target manager routes.
+    """
+    flask_app = Flask(import_name=__name__)
+    flask_app.register_blueprint(blueprint=_BLUEPRINT)
+    return flask_app
+
+
+def create_app(settings: TargetManagerSettings) -> Flask:
+    """
+    Create a target manager Flask app with fixed settings.
+
+    The target rater is created once and used for every new target, and it
+    is warmed up before this returns, so that the app is ready to serve
+    requests quickly.
+    Databases which the storage backend has stored are loaded before this
+    returns, unless another app in this process has loaded them.
+
+    All apps in a process share :data:`TARGET_MANAGER`.
+
+    Args:
+        settings: Settings for the app.
+
+    Returns:
+        The Flask app.
+    """
+    app_state = _AppState.from_settings(settings=settings)
+    warm_up(
+        image_matchers=[],
+        target_tracking_raters=[app_state.target_tracking_rater],
+    )
+    flask_app = _create_flask_app()
+    flask_app.extensions[_BLUEPRINT.name] = app_state
+    return flask_app
+
+
+# This app reads settings from environment variables for each request.
+TARGET_MANAGER_FLASK_APP = _create_flask_app()
+
+
 if __name__ == "__main__":  # pragma: no cover
     SETTINGS = TargetManagerSettings.model_validate(obj={})
-    TARGET_MANAGER_FLASK_APP.run(host=SETTINGS.target_manager_host)
+    create_app(settings=SETTINGS).run(host=SETTINGS.target_manager_host)
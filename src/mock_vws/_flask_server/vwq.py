@@ -6,14 +6,26 @@ https://library.vuforia.com/web-api/vuforia-query-web-api
 """
 
 import email.utils
-from enum import StrEnum, auto
+from dataclasses import dataclass
 from http import HTTPStatus
+from pathlib import Path
+from typing import Self
 
-import requests
-from flask import Flask, Response, request
-from pydantic_settings import BaseSettings
+from flask import Blueprint, Flask, Response, current_app, g, request
 
+from mock_vws._database_matchers import get_access_key
+from mock_vws._flask_server._choices import ImageMatcherChoice
+from mock_vws._flask_server._databases import get_databases
+from mock_vws._flask_server._replica import get_replica
+from mock_vws._flask_server._server_settings import ServerSettings
+from mock_vws._flask_server._target_manager_client import (
+    TargetManagerClient,
+    TargetManagerClientSettings,
+    get_target_manager_client,
+)
+from mock_vws._flask_server._warm_up import warm_up
 from mock_vws._query_tools import (
+    QueryRequestBody,
     get_query_match_response_text,
 )
 from mock_vws._query_validators import run_query_validators
@@ -22,58 +34,116 @@ from mock_vws._query_validators.exceptions import (
 )
 from mock_vws.database import VuforiaDatabase
 from mock_vws.image_matchers import (
-    ExactMatcher,
     ImageMatcher,
-    StructuralSimilarityMatcher,
+    PerceptualHashPrefilterMatcher,
 )
 
-CLOUDRECO_FLASK_APP = Flask(import_name=__name__)
-CLOUDRECO_FLASK_APP.config["PROPAGATE_EXCEPTIONS"] = True
+_BLUEPRINT = Blueprint(name="vwq", import_name=__name__)
 
 
-class _ImageMatcherChoice(StrEnum):
-    """Image matcher choices."""
+class VWQSettings(ServerSettings, TargetManagerClientSettings):
+    """Settings for the VWQ Flask app."""
 
-    EXACT = auto()
-    STRUCTURAL_SIMILARITY = auto()
+    vwq_host: str = ""
+    server_workers: int = 1
+    query_image_matcher: ImageMatcherChoice = (
+        ImageMatcherChoice.STRUCTURAL_SIMILARITY
+    )
+    query_perceptual_hash_prefilter: bool = False
+    replicate_databases: bool = False
+    analysis_cache_directory: Path | None = None
 
-    def to_image_matcher(self) -> ImageMatcher:
-        """Get the image matcher."""
-        ssim_matcher = StructuralSimilarityMatcher()
-        matcher = {
-            _ImageMatcherChoice.EXACT: ExactMatcher(),
-            _ImageMatcherChoice.STRUCTURAL_SIMILARITY: ssim_matcher,
-        }[self]
-        assert isinstance(matcher, ImageMatcher)
-        return matcher
 
+@dataclass(frozen=True)
+class _AppState:
+    """
+    Settings and long-lived objects for a VWQ Flask app.
+    """
 
-class VWQSettings(BaseSettings):
-    """Settings for the VWQ Flask app."""
+    settings: VWQSettings
+    query_image_matcher: ImageMatcher
+    target_manager_client: TargetManagerClient
 
-    vwq_host: str = ""
-    target_manager_base_url: str
-    query_image_matcher: _ImageMatcherChoice = (
-        _ImageMatcherChoice.STRUCTURAL_SIMILARITY
-    )
+    @classmethod
+    def from_settings(cls, settings: VWQSettings) -> Self:
+        """
+        Create the objects which the given settings choose.
+
+        Args:
+            settings: Settings for the app.
+        """
+        query_image_matcher = settings.query_image_matcher.to_image_matcher(
+            analysis_cache_directory=settings.analysis_cache_directory,
+        )
+        if settings.query_perceptual_hash_prefilter:
+            query_image_matcher = PerceptualHashPrefilterMatcher(
+                matcher=query_image_matcher,
+            )
+        return cls(
+            settings=settings,
+            query_image_matcher=query_image_matcher,
+            target_manager_client=get_target_manager_client(
+                settings=settings,
+            ),
+        )
 
 
-def get_all_databases() -> set[VuforiaDatabase]:
+def _get_app_state() -> _AppState:
     """
-    Get all database objects from the target manager back-end.
+    Get the settings and long-lived objects for the current app.
+
+    Apps made with :func:`create_app` have these from when they were made.
+    For :data:`CLOUDRECO_FLASK_APP`, settings are read from environment
+    variables for each request, so that they can be changed while the app is
+    in use.
     """
+    app_state = current_app.extensions.get(_BLUEPRINT.name)
+    if isinstance(app_state, _AppState):
+        return app_state
     settings = VWQSettings.model_validate(obj={})
-    response = requests.get(
-        url=f"{settings.target_manager_base_url}/databases",
-        timeout=30,
-    )
-    return {
-        VuforiaDatabase.from_dict(database_dict=database_dict)
-        for database_dict in response.json()
-    }
+    return _AppState.from_settings(settings=settings)
+
 
+def get_request_databases() -> set[VuforiaDatabase]:
+    """
+    Get the database objects from the target manager back-end which have the
+    client access key given in the request's ``Authorization`` header.
 
-@CLOUDRECO_FLASK_APP.before_request
+    Only databases with that access key can match the request, so this avoids
+    fetching every database.
+    The result is stored for the rest of the request.
+    """
+    if "request_databases" in g:
+        request_databases: set[VuforiaDatabase] = g.request_databases
+        return request_databases
+
+    access_key = get_access_key(request_headers=dict(request.headers))
+    if access_key is None:
+        g.request_databases = set()
+        return set()
+
+    app_state = _get_app_state()
+    request_databases = None
+    if app_state.settings.replicate_databases:
+        replica = get_replica(
+            target_manager_client=app_state.target_manager_client,
+        )
+        request_databases = replica.get_databases(
+            access_key_name="client_access_key",
+            access_key=access_key,
+        )
+
+    if request_databases is None:
+        request_databases = get_databases(
+            target_manager_client=app_state.target_manager_client,
+            access_key_name="client_access_key",
+            access_key=access_key,
+        )
+    g.request_databases = request_databases
+    return request_databases
+
+
+@_BLUEPRINT.before_app_request
 def set_terminate_wsgi_input() -> None:
     """
     We set ``wsgi.input_terminated`` to ``True`` when going through
@@ -91,7 +161,7 @@ def set_terminate_wsgi_input() -> None:
     """
     try:
         set_terminate_wsgi_input_true = (
-            CLOUDRECO_FLASK_APP.config["VWS_MOCK_TERMINATE_WSGI_INPUT"] is True
+            current_app.config["VWS_MOCK_TERMINATE_WSGI_INPUT"] is True
         )
     except KeyError:
         set_terminate_wsgi_input_true = False
@@ -100,7 +170,7 @@ def set_terminate_wsgi_input() -> None:
         request.environ["wsgi.input_terminated"] = True
 
 
-@CLOUDRECO_FLASK_APP.errorhandler(ValidatorException)
+@_BLUEPRINT.app_errorhandler(ValidatorException)
 def handle_exceptions(exc: ValidatorException) -> Response:
     """
     Return the error response associated with the given exception.
@@ -116,16 +186,17 @@ def handle_exceptions(exc: ValidatorException) -> Response:
     return response
 
 
-@CLOUDRECO_FLASK_APP.route("/v1/query", methods=["POST"])
+@_BLUEPRINT.route("/v1/query", methods=["POST"])
 def query() -> Response:
     """
     Perform an image recognition query.
     """
-    settings = VWQSettings.model_validate(obj={})
-    query_match_checker = settings.query_image_matcher.to_image_matcher()
-
-    databases = get_all_databases()
-    request_body = request.stream.read()
+    query_match_checker = _get_app_state().query_image_matcher
+    databases = get_request_databases()
+    request_body = QueryRequestBody(
+        content_type=request.headers.get("Content-Type", ""),
+        content=request.stream.read(),
+    )
     run_query_validators(
         request_headers=dict(request.headers),
         request_body=request_body,
@@ -157,6 +228,44 @@ def query() -> Response:
     )
 
 
+def _create_flask_app() -> Flask:
+    """
+    Create a Flask app with the VWQ routes.
+    """
+    flask_app = Flask(import_name=__name__)
+    flask_app.config["PROPAGATE_EXCEPTIONS"] = True
+    flask_app.register_blueprint(blueprint=_BLUEPRINT)
+    return flask_app
+
+
+def create_app(settings: VWQSettings) -> Flask:
+    """
+    Create a VWQ Flask app with fixed settings.
+
+    The image matcher is created once and used for every request, and it is
+    warmed up before this returns, so that the app is ready to serve
+    requests quickly.
+
+    Args:
+        settings: Settings for the app.
+
+    Returns:
+        The Flask app.
+    """
+    app_state = _AppState.from_settings(settings=settings)
+    warm_up(
+        image_matchers=[app_state.query_image_matcher],
+        target_tracking_raters=[],
+    )
+    flask_app = _create_flask_app()
+    flask_app.extensions[_BLUEPRINT.name] = app_state
+    return flask_app
+
+
+# This app reads settings from environment variables for each request.
+CLOUDRECO_FLASK_APP = _create_flask_app()
+
+
 if __name__ == "__main__":  # pragma: no cover
     SETTINGS = VWQSettings.model_validate(obj={})
-    CLOUDRECO_FLASK_APP.run(host=SETTINGS.vwq_host)
+    create_app(settings=SETTINGS).run(host=SETTINGS.vwq_host)
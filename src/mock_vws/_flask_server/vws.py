@@ -5,91 +5,216 @@ See
 https://library.vuforia.com/web-api/cloud-targets-web-services-api
 """
 
-import base64
 import email.utils
-import json
 import logging
 import uuid
-from enum import StrEnum, auto
+from collections.abc import Callable
+from dataclasses import dataclass
 from http import HTTPStatus
+from pathlib import Path
+from typing import Self
 
 import requests
-from flask import Flask, Response, request
-from pydantic_settings import BaseSettings
+from flask import Blueprint, Flask, Response, current_app, g, request
 
 from mock_vws._constants import ResultCodes, TargetStatuses
-from mock_vws._database_matchers import get_database_matching_server_keys
-from mock_vws._mock_common import json_dump
+from mock_vws._database_matchers import (
+    get_access_key,
+    get_database_matching_server_keys,
+)
+from mock_vws._flask_server._change_log import SEQUENCE_NUMBER_HEADER
+from mock_vws._flask_server._choices import ImageMatcherChoice
+from mock_vws._flask_server._databases import get_databases
+from mock_vws._flask_server._replica import get_replica
+from mock_vws._flask_server._server_settings import ServerSettings
+from mock_vws._flask_server._target_etags import get_target_etag
+from mock_vws._flask_server._target_manager_client import (
+    TargetManagerClient,
+    TargetManagerClientSettings,
+    get_target_manager_client,
+)
+from mock_vws._flask_server._warm_up import warm_up
+from mock_vws._image_matching import (
+    get_candidate_targets,
+    get_matching_targets,
+)
+from mock_vws._mock_common import RequestBody, json_dump
 from mock_vws._services_validators import run_services_validators
 from mock_vws._services_validators.exceptions import (
     Fail,
+    OopsErrorOccurredResponse,
     TargetStatusNotSuccess,
     TargetStatusProcessing,
     ValidatorException,
 )
+from mock_vws._target_processing import TargetProcessor
 from mock_vws.database import VuforiaDatabase
-from mock_vws.image_matchers import (
-    ExactMatcher,
-    ImageMatcher,
-    StructuralSimilarityMatcher,
-)
+from mock_vws.image_matchers import ImageMatcher
 from mock_vws.target import Target
 from mock_vws.target_raters import (
     HardcodedTargetTrackingRater,
 )
 
-VWS_FLASK_APP = Flask(import_name=__name__)
-VWS_FLASK_APP.config["PROPAGATE_EXCEPTIONS"] = True
+_BLUEPRINT = Blueprint(name="vws", import_name=__name__)
 
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class _ImageMatcherChoice(StrEnum):
-    """Image matcher choices."""
-
-    EXACT = auto()
-    STRUCTURAL_SIMILARITY = auto()
-
-    def to_image_matcher(self) -> ImageMatcher:
-        """Get the image matcher."""
-        ssim_matcher = StructuralSimilarityMatcher()
-        matcher = {
-            _ImageMatcherChoice.EXACT: ExactMatcher(),
-            _ImageMatcherChoice.STRUCTURAL_SIMILARITY: ssim_matcher,
-        }[self]
-        assert isinstance(matcher, ImageMatcher)
-        return matcher
-
-
-class VWSSettings(BaseSettings):
+class VWSSettings(ServerSettings, TargetManagerClientSettings):
     """Settings for the VWS Flask app."""
 
-    target_manager_base_url: str
     processing_time_seconds: float = 2
     vws_host: str = ""
+    server_workers: int = 1
     duplicates_image_matcher: (
-        _ImageMatcherChoice
-    ) = _ImageMatcherChoice.STRUCTURAL_SIMILARITY
+        ImageMatcherChoice
+    ) = ImageMatcherChoice.STRUCTURAL_SIMILARITY
+    replicate_databases: bool = False
+    analysis_cache_directory: Path | None = None
 
 
-def get_all_databases() -> set[VuforiaDatabase]:
+@dataclass(frozen=True)
+class _AppState:
     """
-    Get all database objects from the task manager back-end.
+    Settings and long-lived objects for a VWS Flask app.
+    """
+
+    settings: VWSSettings
+    duplicates_image_matcher: ImageMatcher
+    target_manager_client: TargetManagerClient
+    target_processor: TargetProcessor | None
+
+    @classmethod
+    def from_settings(
+        cls,
+        settings: VWSSettings,
+        *,
+        process_targets: bool = False,
+    ) -> Self:
+        """
+        Create the objects which the given settings choose.
+
+        Args:
+            settings: Settings for the app.
+            process_targets: Whether to prepare the duplicates image matcher
+                for new and updated targets in the background. This is
+                useful only if the app state is used for many requests.
+        """
+        duplicates_image_matcher = (
+            settings.duplicates_image_matcher.to_image_matcher(
+                analysis_cache_directory=settings.analysis_cache_directory,
+            )
+        )
+        return cls(
+            settings=settings,
+            duplicates_image_matcher=duplicates_image_matcher,
+            target_manager_client=get_target_manager_client(
+                settings=settings,
+            ),
+            target_processor=(
+                TargetProcessor(image_matchers=[duplicates_image_matcher])
+                if process_targets
+                else None
+            ),
+        )
+
+
+def _get_app_state() -> _AppState:
     """
+    Get the settings and long-lived objects for the current app.
+
+    Apps made with :func:`create_app` have these from when they were made.
+    For :data:`VWS_FLASK_APP`, settings are read from environment variables
+    for each request, so that they can be changed while the app is in use.
+    """
+    app_state = current_app.extensions.get(_BLUEPRINT.name)
+    if isinstance(app_state, _AppState):
+        return app_state
     settings = VWSSettings.model_validate(obj={})
-    timeout_seconds = 30
-    response = requests.get(
-        url=f"{settings.target_manager_base_url}/databases",
-        timeout=timeout_seconds,
+    return _AppState.from_settings(settings=settings)
+
+
+def _wait_for_replica(
+    app_state: _AppState,
+    response: requests.Response,
+) -> None:
+    """
+    If databases are replicated, wait until the replica includes the change
+    made by the given target manager request.
+
+    This means that later requests to this app see the change.
+    """
+    if not app_state.settings.replicate_databases:
+        return
+
+    replica = get_replica(
+        target_manager_client=app_state.target_manager_client,
+    )
+    sequence_number = int(response.headers[SEQUENCE_NUMBER_HEADER])
+    timeout_seconds = 5
+    replica.wait_for(
+        sequence_number=sequence_number,
+        timeout_seconds=timeout_seconds,
     )
-    return {
-        VuforiaDatabase.from_dict(database_dict=database_dict)
-        for database_dict in response.json()
-    }
 
 
-@VWS_FLASK_APP.before_request
+def get_request_databases() -> set[VuforiaDatabase]:
+    """
+    Get the database objects from the target manager back-end which have the
+    server access key given in the request's ``Authorization`` header.
+
+    Only databases with that access key can match the request, so this avoids
+    fetching every database.
+    The result is stored for the rest of the request.
+    """
+    if "request_databases" in g:
+        request_databases: set[VuforiaDatabase] = g.request_databases
+        return request_databases
+
+    access_key = get_access_key(request_headers=dict(request.headers))
+    if access_key is None:
+        g.request_databases = set()
+        return set()
+
+    app_state = _get_app_state()
+    request_databases = None
+    if app_state.settings.replicate_databases:
+        replica = get_replica(
+            target_manager_client=app_state.target_manager_client,
+        )
+        request_databases = replica.get_databases(
+            access_key_name="server_access_key",
+            access_key=access_key,
+        )
+
+    if request_databases is None:
+        request_databases = get_databases(
+            target_manager_client=app_state.target_manager_client,
+            access_key_name="server_access_key",
+            access_key=access_key,
+        )
+    g.request_databases = request_databases
+    return request_databases
+
+
+def get_request_body() -> RequestBody:
+    """
+    Get the body of the request.
+
+    This is stored for the rest of the request, so that the validators and
+    the route handler share what is parsed from it.
+    """
+    if "request_body" in g:
+        request_body: RequestBody = g.request_body
+        return request_body
+
+    request_body = RequestBody(content=request.data)
+    g.request_body = request_body
+    return request_body
+
+
+@_BLUEPRINT.before_app_request
 def set_terminate_wsgi_input() -> None:
     """
     We set ``wsgi.input_terminated`` to ``True`` when going through
@@ -107,7 +232,7 @@ def set_terminate_wsgi_input() -> None:
     """
     try:
         set_terminate_wsgi_input_true = (
-            VWS_FLASK_APP.config["VWS_MOCK_TERMINATE_WSGI_INPUT"] is True
+            current_app.config["VWS_MOCK_TERMINATE_WSGI_INPUT"] is True
         )
     except KeyError:
         set_terminate_wsgi_input_true = False
@@ -116,22 +241,78 @@ def set_terminate_wsgi_input() -> None:
         request.environ["wsgi.input_terminated"] = True
 
 
-@VWS_FLASK_APP.before_request
+@_BLUEPRINT.before_app_request
 def validate_request() -> None:
     """
     Run validators on the request.
     """
-    databases = get_all_databases()
+    databases = get_request_databases()
     run_services_validators(
         request_headers=dict(request.headers),
-        request_body=request.data,
+        request_body=get_request_body(),
         request_method=request.method,
         request_path=request.path,
         databases=databases,
     )
 
 
-@VWS_FLASK_APP.errorhandler(ValidatorException)
+def _get_request_target(target_id: str) -> tuple[VuforiaDatabase, Target]:
+    """
+    Get the database which matches the request's keys, and the target with
+    the given ID in that database.
+    """
+    database = get_database_matching_server_keys(
+        request_headers=dict(request.headers),
+        request_body=request.data,
+        request_method=request.method,
+        request_path=request.path,
+        databases=get_request_databases(),
+    )
+    return database, database.get_target(target_id=target_id)
+
+
+def _send_change(
+    app_state: _AppState,
+    send: Callable[[], requests.Response],
+) -> requests.Response:
+    """
+    Send a change to the target manager, retrying if it conflicts with a
+    change made by another request.
+
+    The target manager rejects a change to a target which has changed since
+    the version it was based on, or a change which would give two targets
+    the same name.
+    This lets many VWS workers change targets at the same time.
+
+    Args:
+        app_state: The current app's settings and long-lived objects.
+        send: A callable which sends the change, based on the request's
+            databases.
+
+    Raises:
+        OopsErrorOccurredResponse: The change still conflicted after several
+            attempts.
+
+    Returns:
+        The target manager's response.
+    """
+    conflict_statuses = {HTTPStatus.CONFLICT, HTTPStatus.PRECONDITION_FAILED}
+    max_attempts = 5
+    for attempt in range(max_attempts):
+        if attempt:
+            # The conflicting change may make this request invalid, for
+            # example by using the name given in this request, so the request
+            # is validated again against the current databases.
+            g.pop("request_databases", None)
+            validate_request()
+        response = send()
+        _wait_for_replica(app_state=app_state, response=response)
+        if response.status_code not in conflict_statuses:
+            return response
+    raise OopsErrorOccurredResponse
+
+
+@_BLUEPRINT.app_errorhandler(ValidatorException)
 def handle_exceptions(exc: ValidatorException) -> Response:
     """
     Return the error response associated with the given exception.
@@ -147,7 +328,7 @@ def handle_exceptions(exc: ValidatorException) -> Response:
     return response
 
 
-@VWS_FLASK_APP.route("/targets", methods=["POST"])
+@_BLUEPRINT.route("/targets", methods=["POST"])
 def add_target() -> Response:
     """
     Add a target.
@@ -155,8 +336,8 @@ def add_target() -> Response:
     Fake implementation of
     https://library.vuforia.com/web-api/cloud-targets-web-services-api#add
     """
-    settings = VWSSettings.model_validate(obj={})
-    databases = get_all_databases()
+    app_state = _get_app_state()
+    databases = get_request_databases()
     database = get_database_matching_server_keys(
         request_headers=dict(request.headers),
         request_body=request.data,
@@ -167,7 +348,8 @@ def add_target() -> Response:
 
     # We do not use ``request.get_json(force=True)`` because this only works
     # when the content type is given as ``application/json``.
-    request_json = json.loads(request.data)
+    request_body = get_request_body()
+    request_json = request_body.json
     name = request_json["name"]
     active_flag = request_json.get("active_flag")
     if active_flag is None:
@@ -179,20 +361,29 @@ def add_target() -> Response:
     new_target = Target(
         name=name,
         width=request_json["width"],
-        image_value=base64.b64decode(request_json["image"]),
+        image_value=request_body.image,
         active_flag=active_flag,
-        processing_time_seconds=settings.processing_time_seconds,
+        processing_time_seconds=app_state.settings.processing_time_seconds,
         application_metadata=request_json.get("application_metadata"),
         target_tracking_rater=target_tracking_rater,
+        analysis_cache_directory=app_state.settings.analysis_cache_directory,
     )
 
-    databases_url = f"{settings.target_manager_base_url}/databases"
-    timeout_seconds = 30
-    requests.post(
-        url=f"{databases_url}/{database.database_name}/targets",
-        json=new_target.to_dict(),
-        timeout=timeout_seconds,
-    )
+    def send() -> requests.Response:
+        """
+        Send the new target to the target manager.
+        """
+        return app_state.target_manager_client.request(
+            method="POST",
+            path=f"/databases/{database.database_name}/targets",
+            json=new_target.to_dict(),
+        )
+
+    _send_change(app_state=app_state, send=send)
+    # The target manager rates the target. This prepares the status and the
+    # duplicates image matcher in this process.
+    if app_state.target_processor is not None:
+        app_state.target_processor.submit(target=new_target)
 
     date = email.utils.formatdate(None, localtime=False, usegmt=True)
     headers = {
@@ -219,7 +410,7 @@ def add_target() -> Response:
     )
 
 
-@VWS_FLASK_APP.route("/targets/<string:target_id>", methods=["GET"])
+@_BLUEPRINT.route("/targets/<string:target_id>", methods=["GET"])
 def get_target(target_id: str) -> Response:
     """
     Get details of a target.
@@ -227,7 +418,7 @@ def get_target(target_id: str) -> Response:
     Fake implementation of
     https://library.vuforia.com/web-api/cloud-targets-web-services-api#target-record
     """
-    databases = get_all_databases()
+    databases = get_request_databases()
     database = get_database_matching_server_keys(
         request_headers=dict(request.headers),
         request_body=request.data,
@@ -236,9 +427,7 @@ def get_target(target_id: str) -> Response:
         databases=databases,
     )
 
-    (target,) = (
-        target for target in database.targets if target.target_id == target_id
-    )
+    target = database.get_target(target_id=target_id)
 
     target_record = {
         "target_id": target.target_id,
@@ -273,7 +462,7 @@ def get_target(target_id: str) -> Response:
     )
 
 
-@VWS_FLASK_APP.route("/targets/<string:target_id>", methods=["DELETE"])
+@_BLUEPRINT.route("/targets/<string:target_id>", methods=["DELETE"])
 def delete_target(target_id: str) -> Response:
     """
     Delete a target.
@@ -281,28 +470,23 @@ def delete_target(target_id: str) -> Response:
     Fake implementation of
     https://library.vuforia.com/web-api/cloud-targets-web-services-api#delete
     """
-    settings = VWSSettings.model_validate(obj={})
-    databases = get_all_databases()
-    database = get_database_matching_server_keys(
-        request_headers=dict(request.headers),
-        request_body=request.data,
-        request_method=request.method,
-        request_path=request.path,
-        databases=databases,
-    )
-
-    (target,) = (
-        target for target in database.targets if target.target_id == target_id
-    )
-
-    if target.status == TargetStatuses.PROCESSING.value:
-        raise TargetStatusProcessing
+    app_state = _get_app_state()
+
+    def send() -> requests.Response:
+        """
+        Delete the current version of the target in the target manager.
+        """
+        database, target = _get_request_target(target_id=target_id)
+        if target.status == TargetStatuses.PROCESSING.value:
+            raise TargetStatusProcessing
+
+        return app_state.target_manager_client.request(
+            method="DELETE",
+            path=f"/databases/{database.database_name}/targets/{target_id}",
+            headers={"If-Match": get_target_etag(target=target)},
+        )
 
-    databases_url = f"{settings.target_manager_base_url}/databases"
-    requests.delete(
-        url=f"{databases_url}/{database.database_name}/targets/{target_id}",
-        timeout=30,
-    )
+    _send_change(app_state=app_state, send=send)
 
     body = {
         "transaction_id": uuid.uuid4().hex,
@@ -326,7 +510,7 @@ def delete_target(target_id: str) -> Response:
     )
 
 
-@VWS_FLASK_APP.route("/summary", methods=["GET"])
+@_BLUEPRINT.route("/summary", methods=["GET"])
 def database_summary() -> Response:
     """
     Get a database summary report.
@@ -334,7 +518,7 @@ def database_summary() -> Response:
     Fake implementation of
     https://library.vuforia.com/web-api/cloud-targets-web-services-api#summary-report
     """
-    databases = get_all_databases()
+    databases = get_request_databases()
     database = get_database_matching_server_keys(
         request_headers=dict(request.headers),
         request_body=request.data,
@@ -342,19 +526,20 @@ def database_summary() -> Response:
         request_path=request.path,
         databases=databases,
     )
+    summary = database.summary()
 
     body = {
         "result_code": ResultCodes.SUCCESS.value,
         "transaction_id": uuid.uuid4().hex,
         "name": database.database_name,
-        "active_images": len(database.active_targets),
-        "inactive_images": len(database.inactive_targets),
-        "failed_images": len(database.failed_targets),
+        "active_images": summary.active_images,
+        "inactive_images": summary.inactive_images,
+        "failed_images": summary.failed_images,
         "target_quota": database.target_quota,
         "total_recos": database.total_recos,
         "current_month_recos": database.current_month_recos,
         "previous_month_recos": database.previous_month_recos,
-        "processing_images": len(database.processing_targets),
+        "processing_images": summary.processing_images,
         "reco_threshold": database.reco_threshold,
         "request_quota": database.request_quota,
         # We have ``self.request_count`` but Vuforia always shows 0.
@@ -379,7 +564,7 @@ def database_summary() -> Response:
     )
 
 
-@VWS_FLASK_APP.route("/summary/<string:target_id>", methods=["GET"])
+@_BLUEPRINT.route("/summary/<string:target_id>", methods=["GET"])
 def target_summary(target_id: str) -> Response:
     """
     Get a summary report for a target.
@@ -387,7 +572,7 @@ def target_summary(target_id: str) -> Response:
     Fake implementation of
     https://library.vuforia.com/web-api/cloud-targets-web-services-api#retrieve-report
     """
-    databases = get_all_databases()
+    databases = get_request_databases()
     database = get_database_matching_server_keys(
         request_headers=dict(request.headers),
         request_body=request.data,
@@ -396,9 +581,7 @@ def target_summary(target_id: str) -> Response:
         databases=databases,
     )
 
-    (target,) = (
-        target for target in database.targets if target.target_id == target_id
-    )
+    target = database.get_target(target_id=target_id)
     body = {
         "status": target.status,
         "transaction_id": uuid.uuid4().hex,
@@ -430,7 +613,7 @@ def target_summary(target_id: str) -> Response:
     )
 
 
-@VWS_FLASK_APP.route("/duplicates/<string:target_id>", methods=["GET"])
+@_BLUEPRINT.route("/duplicates/<string:target_id>", methods=["GET"])
 def get_duplicates(target_id: str) -> Response:
     """
     Get targets which may be considered duplicates of a given target.
@@ -438,8 +621,7 @@ def get_duplicates(target_id: str) -> Response:
     Fake implementation of
     https://library.vuforia.com/web-api/cloud-targets-web-services-api#check
     """
-    databases = get_all_databases()
-    settings = VWSSettings.model_validate(obj={})
+    databases = get_request_databases()
     database = get_database_matching_server_keys(
         request_headers=dict(request.headers),
         request_body=request.data,
@@ -447,25 +629,33 @@ def get_duplicates(target_id: str) -> Response:
         request_path=request.path,
         databases=databases,
     )
-    image_match_checker = settings.duplicates_image_matcher.to_image_matcher()
+    image_match_checker = _get_app_state().duplicates_image_matcher
 
-    (target,) = (
-        target for target in database.targets if target.target_id == target_id
+    target = database.get_target(target_id=target_id)
+    other_targets = get_candidate_targets(
+        image_matcher=image_match_checker,
+        image_content=target.image_value,
+        targets=database.targets,
     )
-    other_targets = database.targets - {target}
 
-    similar_targets: list[str] = [
-        other.target_id
+    candidate_targets = [
+        other
         for other in other_targets
-        if image_match_checker(
-            first_image_content=target.image_value,
-            second_image_content=other.image_value,
-        )
+        if other.target_id != target.target_id
         and TargetStatuses.FAILED.value not in {target.status, other.status}
         and TargetStatuses.PROCESSING.value != other.status
         and other.active_flag
     ]
 
+    similar_targets: list[str] = [
+        other.target_id
+        for other in get_matching_targets(
+            image_matcher=image_match_checker,
+            image_content=target.image_value,
+            targets=candidate_targets,
+        )
+    ]
+
     body = {
         "transaction_id": uuid.uuid4().hex,
         "result_code": ResultCodes.SUCCESS.value,
@@ -490,7 +680,7 @@ def get_duplicates(target_id: str) -> Response:
     )
 
 
-@VWS_FLASK_APP.route("/targets", methods=["GET"])
+@_BLUEPRINT.route("/targets", methods=["GET"])
 def target_list() -> Response:
     """
     Get a list of all targets.
@@ -498,7 +688,7 @@ def target_list() -> Response:
     Fake implementation of
     https://library.vuforia.com/web-api/cloud-targets-web-services-api#details-list
     """
-    databases = get_all_databases()
+    databases = get_request_databases()
     database = get_database_matching_server_keys(
         request_headers=dict(request.headers),
         request_body=request.data,
@@ -531,7 +721,7 @@ def target_list() -> Response:
     )
 
 
-@VWS_FLASK_APP.route("/targets/<string:target_id>", methods=["PUT"])
+@_BLUEPRINT.route("/targets/<string:target_id>", methods=["PUT"])
 def update_target(target_id: str) -> Response:
     """
     Update a target.
@@ -539,22 +729,11 @@ def update_target(target_id: str) -> Response:
     Fake implementation of
     https://library.vuforia.com/web-api/cloud-targets-web-services-api#update
     """
-    settings = VWSSettings.model_validate(obj={})
+    app_state = _get_app_state()
     # We do not use ``request.get_json(force=True)`` because this only works
     # when the content type is given as ``application/json``.
-    request_json = json.loads(request.data)
-    databases = get_all_databases()
-    database = get_database_matching_server_keys(
-        request_headers=dict(request.headers),
-        request_body=request.data,
-        request_method=request.method,
-        request_path=request.path,
-        databases=databases,
-    )
-
-    (target,) = (
-        target for target in database.targets if target.target_id == target_id
-    )
+    request_json = get_request_body().json
+    _, target = _get_request_target(target_id=target_id)
 
     if target.status != TargetStatuses.SUCCESS.value:
         raise TargetStatusNotSuccess
@@ -595,11 +774,26 @@ def update_target(target_id: str) -> Response:
         image = request_json["image"]
         update_values["image"] = image
 
-    put_url = (
-        f"{settings.target_manager_base_url}/databases/"
-        f"{database.database_name}/targets/{target_id}"
-    )
-    requests.put(url=put_url, json=update_values, timeout=30)
+    def send() -> requests.Response:
+        """
+        Update the current version of the target in the target manager.
+        """
+        database, target = _get_request_target(target_id=target_id)
+        if target.status != TargetStatuses.SUCCESS.value:
+            raise TargetStatusNotSuccess
+
+        return app_state.target_manager_client.request(
+            method="PUT",
+            path=f"/databases/{database.database_name}/targets/{target_id}",
+            json=update_values,
+            headers={"If-Match": get_target_etag(target=target)},
+        )
+
+    response = _send_change(app_state=app_state, send=send)
+    if app_state.target_processor is not None:
+        app_state.target_processor.submit(
+            target=Target.from_dict(target_dict=response.json()),
+        )
 
     date = email.utils.formatdate(None, localtime=False, usegmt=True)
     headers = {
@@ -623,6 +817,49 @@ def update_target(target_id: str) -> Response:
     )
 
 
+def _create_flask_app() -> Flask:
+    """
+    Create a Flask app with the VWS routes.
+    """
+    flask_app = Flask(import_name=__name__)
+    flask_app.config["PROPAGATE_EXCEPTIONS"] = True
+    flask_app.register_blueprint(blueprint=_BLUEPRINT)
+    return flask_app
+
+
+def create_app(settings: VWSSettings) -> Flask:
+    """
+    Create a VWS Flask app with fixed settings.
+
+    The image matcher is created once and used for every request, and it is
+    warmed up before this returns, so that the app is ready to serve
+    requests quickly.
+    The image matcher is prepared for new and updated targets in the
+    background.
+
+    Args:
+        settings: Settings for the app.
+
+    Returns:
+        The Flask app.
+    """
+    app_state = _AppState.from_settings(
+        settings=settings,
+        process_targets=True,
+    )
+    warm_up(
+        image_matchers=[app_state.duplicates_image_matcher],
+        target_tracking_raters=[],
+    )
+    flask_app = _create_flask_app()
+    flask_app.extensions[_BLUEPRINT.name] = app_state
+    return flask_app
+
+
+# This app reads settings from environment variables for each request.
+VWS_FLASK_APP = _create_flask_app()
+
+
 if __name__ == "__main__":  # pragma: no cover
     SETTINGS = VWSSettings.model_validate(obj={})
-    VWS_FLASK_APP.run(host=SETTINGS.vws_host)
+    create_app(settings=SETTINGS).run(host=SETTINGS.vws_host)
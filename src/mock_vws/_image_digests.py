@@ -0,0 +1,22 @@
+"""
+Digests which identify images by their content.
+"""
+
+import hashlib
+
+
+def get_image_digest(image_content: bytes) -> str:
+    """
+    Return a digest of an image's content.
+
+    This is not cached, as a cache keyed by the image's content would keep
+    many images in memory, and hashing is fast.
+    Targets keep the digests of their images, see ``Target.image_digest``.
+
+    Args:
+        image_content: The content of the image.
+
+    Returns:
+        The digest, as a hex string.
+    """
+    return hashlib.blake2b(image_content, digest_size=32).hexdigest()
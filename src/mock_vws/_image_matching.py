@@ -0,0 +1,86 @@
+"""
+Helpers for finding targets with images which match an image.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from mock_vws.image_matchers import BatchImageMatcher, ExactMatcher
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from mock_vws._target_store import TargetStore
+    from mock_vws.image_matchers import ImageMatcher
+    from mock_vws.target import Target
+
+
+def get_candidate_targets(
+    image_matcher: ImageMatcher,
+    image_content: bytes,
+    targets: TargetStore,
+) -> Iterable[Target]:
+    """
+    Return the targets which could have images which match the given image.
+
+    When matching exactly, only targets with the same image can match, and
+    these are looked up by the image's digest rather than by comparing every
+    target's image.
+
+    Args:
+        image_matcher: The matcher which will be used to compare images.
+        image_content: The image to compare the targets' images with.
+        targets: All targets in a database.
+    """
+    if isinstance(image_matcher, ExactMatcher):
+        return targets.with_image(image_content=image_content)
+    return targets
+
+
+def get_matching_targets(
+    image_matcher: ImageMatcher,
+    image_content: bytes,
+    targets: Iterable[Target],
+) -> list[Target]:
+    """
+    Return the given targets which have images which match the given image.
+
+    If the matcher can compare many images at once, all targets are compared
+    in one call, and the matcher is given the digests which the targets
+    keep, so that their images are not hashed for each comparison.
+
+    Args:
+        image_matcher: The matcher to compare images with.
+        image_content: The image to compare the targets' images with.
+        targets: The targets to compare.
+    """
+    candidate_targets = list(targets)
+    if isinstance(image_matcher, BatchImageMatcher):
+        matches = image_matcher.match_many(
+            image_content=image_content,
+            candidate_image_contents=[
+                target.image_value for target in candidate_targets
+            ],
+            candidate_image_digests=[
+                target.image_digest for target in candidate_targets
+            ],
+        )
+        return [
+            target
+            for target, is_match in zip(
+                candidate_targets,
+                matches,
+                strict=True,
+            )
+            if is_match
+        ]
+
+    return [
+        target
+        for target in candidate_targets
+        if image_matcher(
+            first_image_content=target.image_value,
+            second_image_content=image_content,
+        )
+    ]
@@ -2,10 +2,13 @@
 Common utilities for creating mock routes.
 """
 
+import functools
 import json
 from dataclasses import dataclass
 from typing import Any
 
+from mock_vws._base64_decoding import decode_base64
+
 
 @dataclass(frozen=True)
 class Route:
@@ -30,3 +33,41 @@ def json_dump(body: dict[str, Any]) -> str:
         JSON dump of data in the same way that Vuforia dumps data.
     """
     return json.dumps(obj=body, separators=(",", ":"))
+
+
+@dataclass(frozen=True)
+class RequestBody:
+    """
+    The body of a request to a VWS endpoint.
+
+    One of these is made for each request, and it is given to the validators
+    and then to the route handler, so that the body is loaded as JSON, and
+    the image in it is decoded, at most once for the request.
+    Nothing is kept after the request.
+
+    Args:
+        content: The body of the request.
+    """
+
+    content: bytes
+
+    @functools.cached_property
+    def json(self) -> Any:
+        """
+        The body, loaded as JSON.
+
+        Raises:
+            json.JSONDecodeError: The body is not valid JSON.
+            UnicodeDecodeError: The body is not valid UTF-8.
+        """
+        return json.loads(s=self.content.decode())
+
+    @functools.cached_property
+    def image(self) -> bytes:
+        """
+        The image given in the body, decoded as base64.
+
+        Raises:
+            binascii.Error: The image cannot be decoded.
+        """
+        return decode_base64(encoded_data=self.json["image"])
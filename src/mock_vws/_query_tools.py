@@ -6,9 +6,12 @@ from __future__ import annotations
 
 import base64
 import datetime
+import functools
 import io
 import uuid
+from dataclasses import dataclass
 from email.message import EmailMessage
+from types import MappingProxyType
 from typing import IO, TYPE_CHECKING, Any
 from zoneinfo import ZoneInfo
 
@@ -17,9 +20,15 @@ from werkzeug.formparser import MultiPartParser
 from mock_vws._base64_decoding import decode_base64
 from mock_vws._constants import ResultCodes, TargetStatuses
 from mock_vws._database_matchers import get_database_matching_client_keys
+from mock_vws._image_matching import (
+    get_candidate_targets,
+    get_matching_targets,
+)
 from mock_vws._mock_common import json_dump
 
 if TYPE_CHECKING:
+    from collections.abc import Mapping
+
     from werkzeug.datastructures import FileStorage, MultiDict
 
     from mock_vws.database import VuforiaDatabase
@@ -47,9 +56,93 @@ class TypedMultiPartParser(MultiPartParser):
         )
 
 
+@dataclass(frozen=True)
+class _QueryRequestParts:
+    """
+    The parts of a query request body.
+
+    Args:
+        fields: The value of each non-file field.
+        file_names: The names of all file fields.
+        image_value: The content of the image file field, if given.
+    """
+
+    fields: Mapping[str, str]
+    file_names: frozenset[str]
+    image_value: bytes | None
+
+
+@dataclass(frozen=True)
+class QueryRequestBody:
+    """
+    The body of a query request.
+
+    One of these is made for each request, and it is given to the validators
+    and then to the query handler, so that the multipart body is parsed at
+    most once for the request.
+    Nothing is kept after the request.
+
+    Args:
+        content_type: The ``Content-Type`` header sent with the request.
+        content: The body of the request.
+    """
+
+    content_type: str
+    content: bytes
+
+    @functools.cached_property
+    def _parts(self) -> _QueryRequestParts:
+        """
+        The parts of the body, parsed as multipart form data.
+        """
+        email_message = EmailMessage()
+        email_message["Content-Type"] = self.content_type
+        boundary = email_message.get_boundary()
+        assert isinstance(boundary, str)
+
+        parser = TypedMultiPartParser()
+        fields, files = parser.parse(
+            stream=io.BytesIO(self.content),
+            boundary=boundary.encode("utf-8"),
+            content_length=len(self.content),
+        )
+
+        image_part = files.get("image")
+        image_value = None
+        if image_part is not None:
+            image_value = bytes(image_part.stream.read())
+
+        return _QueryRequestParts(
+            fields=MappingProxyType({key: str(fields[key]) for key in fields}),
+            file_names=frozenset(files.keys()),
+            image_value=image_value,
+        )
+
+    @property
+    def fields(self) -> Mapping[str, str]:
+        """
+        The value of each non-file field.
+        """
+        return self._parts.fields
+
+    @property
+    def file_names(self) -> frozenset[str]:
+        """
+        The names of all file fields.
+        """
+        return self._parts.file_names
+
+    @property
+    def image_value(self) -> bytes | None:
+        """
+        The content of the image file field, if given.
+        """
+        return self._parts.image_value
+
+
 def get_query_match_response_text(
     request_headers: dict[str, str],
-    request_body: bytes,
+    request_body: QueryRequestBody,
     request_method: str,
     request_path: str,
     databases: set[VuforiaDatabase],
@@ -68,51 +161,44 @@ def get_query_match_response_text(
     Returns:
         The response text for a query endpoint request.
     """
-    email_message = EmailMessage()
-    email_message["Content-Type"] = request_headers["Content-Type"]
-    boundary = email_message.get_boundary()
-    assert isinstance(boundary, str)
-
-    parser = TypedMultiPartParser()
-    fields, files = parser.parse(
-        stream=io.BytesIO(request_body),
-        boundary=boundary.encode("utf-8"),
-        content_length=len(request_body),
-    )
+    fields = request_body.fields
 
-    max_num_results = str(fields.get("max_num_results", "1"))
-    include_target_data = str(fields.get("include_target_data", "top")).lower()
+    max_num_results = fields.get("max_num_results", "1")
+    include_target_data = fields.get("include_target_data", "top").lower()
 
-    image_part = files["image"]
-    image_value = bytes(image_part.stream.read())
+    image_value = request_body.image_value
+    assert image_value is not None
     gmt = ZoneInfo("GMT")
     datetime.datetime.now(tz=gmt)
 
     database = get_database_matching_client_keys(
         request_headers=request_headers,
-        request_body=request_body,
+        request_body=request_body.content,
         request_method=request_method,
         request_path=request_path,
         databases=databases,
     )
 
-    matching_targets = [
+    # Only compare images of targets which could be returned, as comparing
+    # images is slow.
+    candidate_targets = [
         target
-        for target in database.targets
-        if query_match_checker(
-            first_image_content=target.image_value,
-            second_image_content=image_value,
+        for target in get_candidate_targets(
+            image_matcher=query_match_checker,
+            image_content=image_value,
+            targets=database.targets,
         )
-    ]
-
-    not_deleted_matches = [
-        target
-        for target in matching_targets
         if target.active_flag
         and not target.delete_date
         and target.status == TargetStatuses.SUCCESS.value
     ]
 
+    not_deleted_matches = get_matching_targets(
+        image_matcher=query_match_checker,
+        image_content=image_value,
+        targets=candidate_targets,
+    )
+
     all_quality_matches = not_deleted_matches
     minimum_rating = 0
     matches = [
@@ -37,13 +37,14 @@ from .num_results_validators import validate_max_num_results
 from .project_state_validators import validate_project_state
 
 if TYPE_CHECKING:
+    from mock_vws._query_tools import QueryRequestBody
     from mock_vws.database import VuforiaDatabase
 
 
 def run_query_validators(
     request_path: str,
     request_headers: dict[str, str],
-    request_body: bytes,
+    request_body: QueryRequestBody,
     request_method: str,
     databases: set[VuforiaDatabase],
 ) -> None:
@@ -53,18 +54,19 @@ def run_query_validators(
     Args:
         request_path: The path of the request.
         request_headers: The headers sent with the request.
-        request_body: The body of the request.
+        request_body: The body of the request. This is given to each
+            validator which reads it, so that it is parsed once.
         request_method: The HTTP method of the request.
         databases: All Vuforia databases.
     """
     validate_content_length_header_is_int(request_headers=request_headers)
     validate_content_length_header_not_too_large(
         request_headers=request_headers,
-        request_body=request_body,
+        request_body=request_body.content,
     )
     validate_content_length_header_not_too_small(
         request_headers=request_headers,
-        request_body=request_body,
+        request_body=request_body.content,
     )
     validate_auth_header_exists(request_headers=request_headers)
     validate_auth_header_number_of_parts(request_headers=request_headers)
@@ -75,14 +77,14 @@ def run_query_validators(
     )
     validate_authorization(
         request_headers=request_headers,
-        request_body=request_body,
+        request_body=request_body.content,
         request_method=request_method,
         request_path=request_path,
         databases=databases,
     )
     validate_project_state(
         request_headers=request_headers,
-        request_body=request_body,
+        request_body=request_body.content,
         request_method=request_method,
         request_path=request_path,
         databases=databases,
@@ -93,37 +95,13 @@ def run_query_validators(
     validate_date_in_range(request_headers=request_headers)
     validate_content_type_header(
         request_headers=request_headers,
-        request_body=request_body,
-    )
-    validate_extra_fields(
-        request_headers=request_headers,
-        request_body=request_body,
-    )
-    validate_image_field_given(
-        request_headers=request_headers,
-        request_body=request_body,
-    )
-    validate_image_is_image(
-        request_headers=request_headers,
-        request_body=request_body,
-    )
-    validate_image_format(
-        request_headers=request_headers,
-        request_body=request_body,
-    )
-    validate_image_dimensions(
-        request_headers=request_headers,
-        request_body=request_body,
-    )
-    validate_image_file_size(
-        request_headers=request_headers,
-        request_body=request_body,
-    )
-    validate_max_num_results(
-        request_headers=request_headers,
-        request_body=request_body,
-    )
-    validate_include_target_data(
-        request_headers=request_headers,
-        request_body=request_body,
+        request_body=request_body.content,
     )
+    validate_extra_fields(request_body=request_body)
+    validate_image_field_given(request_body=request_body)
+    validate_image_is_image(request_body=request_body)
+    validate_image_format(request_body=request_body)
+    validate_image_dimensions(request_body=request_body)
+    validate_image_file_size(request_body=request_body)
+    validate_max_num_results(request_body=request_body)
+    validate_include_target_data(request_body=request_body)
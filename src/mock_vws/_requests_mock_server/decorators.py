@@ -4,6 +4,7 @@ Decorators for using the mock.
 
 from __future__ import annotations
 
+import functools
 import re
 from contextlib import ContextDecorator
 from typing import TYPE_CHECKING, Literal, Self
@@ -12,6 +13,7 @@ from urllib.parse import urljoin, urlparse
 import requests
 from requests_mock.mocker import Mocker
 
+from mock_vws._target_processing import TargetProcessor
 from mock_vws.image_matchers import (
     ImageMatcher,
     StructuralSimilarityMatcher,
@@ -23,6 +25,8 @@ from .mock_web_query_api import MockVuforiaWebQueryAPI
 from .mock_web_services_api import MockVuforiaWebServicesAPI
 
 if TYPE_CHECKING:
+    from pathlib import Path
+
     from mock_vws.database import VuforiaDatabase
     from mock_vws.target_raters import TargetTrackingRater
 
@@ -31,6 +35,32 @@ _STRUCTURAL_SIMILARITY_MATCHER = StructuralSimilarityMatcher()
 _BRISQUE_TRACKING_RATER = BrisqueTargetTrackingRater()
 
 
+@functools.cache
+def _get_structural_similarity_matcher(
+    analysis_cache_directory: Path,
+) -> StructuralSimilarityMatcher:
+    """
+    Get a structural similarity matcher which uses the given analysis cache,
+    shared by all mocks which use that cache.
+    """
+    return StructuralSimilarityMatcher(
+        analysis_cache_directory=analysis_cache_directory,
+    )
+
+
+@functools.cache
+def _get_brisque_tracking_rater(
+    analysis_cache_directory: Path,
+) -> BrisqueTargetTrackingRater:
+    """
+    Get a BRISQUE target tracking rater which uses the given analysis cache,
+    shared by all mocks which use that cache.
+    """
+    return BrisqueTargetTrackingRater(
+        analysis_cache_directory=analysis_cache_directory,
+    )
+
+
 class MockVWS(ContextDecorator):
     """
     Route requests to Vuforia's Web Service APIs to fakes of those APIs.
@@ -46,6 +76,8 @@ class MockVWS(ContextDecorator):
         target_tracking_rater: TargetTrackingRater = _BRISQUE_TRACKING_RATER,
         *,
         real_http: bool = False,
+        target_processing_workers: int = 0,
+        analysis_cache_directory: Path | None = None,
     ) -> None:
         """
         Route requests to Vuforia's Web Service APIs to fakes of those APIs.
@@ -62,9 +94,30 @@ class MockVWS(ContextDecorator):
             base_vws_url: The base URL for the VWS API.
             query_match_checker: A callable which takes two image values and
                 returns whether they will match in a query request.
+                Wrap a matcher in a
+                :class:`mock_vws.image_matchers.PerceptualHashPrefilterMatcher`
+                to make queries faster on large databases.
             duplicate_match_checker: A callable which takes two image values
                 and returns whether they are duplicates.
             target_tracking_rater: A callable for rating targets for tracking.
+            target_processing_workers: The maximum number of threads which
+                rate new and updated targets and cache work for their images
+                with the image matchers in the background while they are
+                processing.
+                The target tracking rater and the image matchers are called
+                from these threads, so they must be safe to call from many
+                threads at once if this is more than 0.
+                If this is 0, which is the default, targets are rated when
+                they are read.
+                Targets which are still waiting to be processed when the mock
+                is stopped are not processed in the background.
+            analysis_cache_directory: A directory to keep the results of
+                analyzing target images in, such as statuses, tracking
+                ratings and images preprocessed for matching.
+                Results are kept between runs, so images which have been
+                analyzed before are not analyzed again.
+                This is used by the default image matchers and target rater,
+                and by target statuses.
 
         Raises:
             requests.exceptions.MissingSchema: There is no schema in a given
@@ -87,11 +140,33 @@ class MockVWS(ContextDecorator):
                 error = missing_scheme_error.format(url=url)
                 raise requests.exceptions.MissingSchema(error)
 
+        if analysis_cache_directory is not None:
+            # The default matchers and rater do not use an analysis cache, so
+            # ones which use the given cache are used instead.
+            if duplicate_match_checker is _STRUCTURAL_SIMILARITY_MATCHER:
+                duplicate_match_checker = _get_structural_similarity_matcher(
+                    analysis_cache_directory=analysis_cache_directory,
+                )
+            if query_match_checker is _STRUCTURAL_SIMILARITY_MATCHER:
+                query_match_checker = _get_structural_similarity_matcher(
+                    analysis_cache_directory=analysis_cache_directory,
+                )
+            if target_tracking_rater is _BRISQUE_TRACKING_RATER:
+                target_tracking_rater = _get_brisque_tracking_rater(
+                    analysis_cache_directory=analysis_cache_directory,
+                )
+
+        self._target_processor = TargetProcessor(
+            image_matchers=[duplicate_match_checker, query_match_checker],
+            max_workers=target_processing_workers,
+        )
         self._mock_vws_api = MockVuforiaWebServicesAPI(
             target_manager=self._target_manager,
             processing_time_seconds=processing_time_seconds,
             duplicate_match_checker=duplicate_match_checker,
             target_tracking_rater=target_tracking_rater,
+            target_processor=self._target_processor,
+            analysis_cache_directory=analysis_cache_directory,
         )
 
         self._mock_vwq_api = MockVuforiaWebQueryAPI(
@@ -112,6 +187,14 @@ class MockVWS(ContextDecorator):
         """
         self._target_manager.add_database(database=database)
 
+    @property
+    def target_processing_queue_depth(self) -> int:
+        """
+        The number of new and updated targets which are waiting to be
+        processed in the background or which are being processed.
+        """
+        return self._target_processor.queue_depth
+
     def __enter__(self) -> Self:
         """
         Start an instance of a Vuforia mock.
@@ -163,4 +246,5 @@ class MockVWS(ContextDecorator):
         assert isinstance(exc, tuple)
 
         self._mock.stop()
+        self._target_processor.shutdown()
         return False
@@ -12,8 +12,10 @@ from typing import TYPE_CHECKING
 
 from requests_mock import POST
 
+from mock_vws._database_matchers import get_access_key
 from mock_vws._mock_common import Route
 from mock_vws._query_tools import (
+    QueryRequestBody,
     get_query_match_response_text,
 )
 from mock_vws._query_validators import run_query_validators
@@ -27,6 +29,7 @@ if TYPE_CHECKING:
     from requests_mock.request import Request
     from requests_mock.response import Context
 
+    from mock_vws.database import VuforiaDatabase
     from mock_vws.image_matchers import ImageMatcher
     from mock_vws.target_manager import TargetManager
 
@@ -95,18 +98,43 @@ class MockVuforiaWebQueryAPI:
         self._target_manager = target_manager
         self._query_match_checker = query_match_checker
 
+    def _get_request_databases(self, request: Request) -> set[VuforiaDatabase]:
+        """
+        Get the databases which have the client access key given in the
+        request's ``Authorization`` header.
+
+        Only databases with that access key can match the request, so the
+        database is looked up by access key rather than checking every
+        database.
+        """
+        access_key = get_access_key(request_headers=request.headers)
+        if access_key is None:
+            return set()
+        try:
+            database = self._target_manager.get_database_by_client_access_key(
+                client_access_key=access_key,
+            )
+        except KeyError:
+            return set()
+        return {database}
+
     @route(path_pattern="/v1/query", http_methods={POST})
     def query(self, request: Request, context: Context) -> str:
         """
         Perform an image recognition query.
         """
+        request_body = QueryRequestBody(
+            content_type=request.headers.get("Content-Type", ""),
+            content=request.body,
+        )
+        databases = self._get_request_databases(request=request)
         try:
             run_query_validators(
                 request_path=request.path,
                 request_headers=request.headers,
-                request_body=request.body,
+                request_body=request_body,
                 request_method=request.method,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -115,10 +143,10 @@ class MockVuforiaWebQueryAPI:
 
         response_text = get_query_match_response_text(
             request_headers=request.headers,
-            request_body=request.body,
+            request_body=request_body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
             query_match_checker=self._query_match_checker,
         )
 
@@ -7,7 +7,6 @@ https://library.vuforia.com/web-api/cloud-targets-web-services-api
 
 from __future__ import annotations
 
-import base64
 import dataclasses
 import datetime
 import email.utils
@@ -19,8 +18,15 @@ from zoneinfo import ZoneInfo
 from requests_mock import DELETE, GET, POST, PUT
 
 from mock_vws._constants import ResultCodes, TargetStatuses
-from mock_vws._database_matchers import get_database_matching_server_keys
-from mock_vws._mock_common import Route, json_dump
+from mock_vws._database_matchers import (
+    get_access_key,
+    get_database_matching_server_keys,
+)
+from mock_vws._image_matching import (
+    get_candidate_targets,
+    get_matching_targets,
+)
+from mock_vws._mock_common import RequestBody, Route, json_dump
 from mock_vws._services_validators import run_services_validators
 from mock_vws._services_validators.exceptions import (
     Fail,
@@ -32,10 +38,13 @@ from mock_vws.target import Target
 
 if TYPE_CHECKING:
     from collections.abc import Callable
+    from pathlib import Path
 
     from requests_mock.request import Request
     from requests_mock.response import Context
 
+    from mock_vws._target_processing import TargetProcessor
+    from mock_vws.database import VuforiaDatabase
     from mock_vws.image_matchers import ImageMatcher
     from mock_vws.target_manager import TargetManager
     from mock_vws.target_raters import TargetTrackingRater
@@ -96,6 +105,8 @@ class MockVuforiaWebServicesAPI:
         processing_time_seconds: float,
         duplicate_match_checker: ImageMatcher,
         target_tracking_rater: TargetTrackingRater,
+        target_processor: TargetProcessor,
+        analysis_cache_directory: Path | None = None,
     ) -> None:
         """
         Args:
@@ -106,6 +117,10 @@ class MockVuforiaWebServicesAPI:
             duplicate_match_checker: A callable which takes two image values
               and returns whether they are duplicates.
             target_tracking_rater: A callable for rating targets for tracking.
+            target_processor: A processor for new and updated targets.
+            analysis_cache_directory: A directory to keep the results of
+              analyzing target images in, so that they are not computed again
+              in later runs.
 
         Attributes:
             routes: The `Route`s to be used in the mock.
@@ -115,6 +130,28 @@ class MockVuforiaWebServicesAPI:
         self._processing_time_seconds = processing_time_seconds
         self._duplicate_match_checker = duplicate_match_checker
         self._target_tracking_rater = target_tracking_rater
+        self._target_processor = target_processor
+        self._analysis_cache_directory = analysis_cache_directory
+
+    def _get_request_databases(self, request: Request) -> set[VuforiaDatabase]:
+        """
+        Get the databases which have the server access key given in the
+        request's ``Authorization`` header.
+
+        Only databases with that access key can match the request, so the
+        database is looked up by access key rather than checking every
+        database.
+        """
+        access_key = get_access_key(request_headers=request.headers)
+        if access_key is None:
+            return set()
+        try:
+            database = self._target_manager.get_database_by_server_access_key(
+                server_access_key=access_key,
+            )
+        except KeyError:
+            return set()
+        return {database}
 
     @route(
         path_pattern="/targets",
@@ -127,13 +164,15 @@ class MockVuforiaWebServicesAPI:
         Fake implementation of
         https://library.vuforia.com/web-api/cloud-targets-web-services-api#add
         """
+        request_body = RequestBody(content=request.body)
+        databases = self._get_request_databases(request=request)
         try:
             run_services_validators(
                 request_headers=request.headers,
-                request_body=request.body,
+                request_body=request_body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -145,28 +184,31 @@ class MockVuforiaWebServicesAPI:
             request_body=request.body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
         )
 
-        given_active_flag = request.json().get("active_flag")
+        request_json = request_body.json
+        given_active_flag = request_json.get("active_flag")
         active_flag = {
             None: True,
             True: True,
             False: False,
         }[given_active_flag]
 
-        application_metadata = request.json().get("application_metadata")
+        application_metadata = request_json.get("application_metadata")
 
         new_target = Target(
-            name=request.json()["name"],
-            width=request.json()["width"],
-            image_value=base64.b64decode(request.json()["image"]),
+            name=request_json["name"],
+            width=request_json["width"],
+            image_value=request_body.image,
             active_flag=active_flag,
             processing_time_seconds=self._processing_time_seconds,
             application_metadata=application_metadata,
             target_tracking_rater=self._target_tracking_rater,
+            analysis_cache_directory=self._analysis_cache_directory,
         )
         database.targets.add(new_target)
+        self._target_processor.submit(target=new_target)
 
         date = email.utils.formatdate(None, localtime=False, usegmt=True)
         context.status_code = HTTPStatus.CREATED
@@ -200,13 +242,15 @@ class MockVuforiaWebServicesAPI:
         Fake implementation of
         https://library.vuforia.com/web-api/cloud-targets-web-services-api#delete
         """
+        request_body = RequestBody(content=request.body)
+        databases = self._get_request_databases(request=request)
         try:
             run_services_validators(
                 request_headers=request.headers,
-                request_body=request.body,
+                request_body=request_body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -219,7 +263,7 @@ class MockVuforiaWebServicesAPI:
             request_body=request.body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
         )
 
         target_id = request.path.split("/")[-1]
@@ -233,8 +277,8 @@ class MockVuforiaWebServicesAPI:
 
         now = datetime.datetime.now(tz=target.upload_date.tzinfo)
         new_target = dataclasses.replace(target, delete_date=now)
-        database.targets.remove(target)
-        database.targets.add(new_target)
+        new_target.reuse_analysis(previous=target)
+        database.targets.replace(old=target, new=new_target)
         date = email.utils.formatdate(None, localtime=False, usegmt=True)
 
         body = {
@@ -263,13 +307,15 @@ class MockVuforiaWebServicesAPI:
         Fake implementation of
         https://library.vuforia.com/web-api/cloud-targets-web-services-api#summary-report
         """
+        request_body = RequestBody(content=request.body)
+        databases = self._get_request_databases(request=request)
         try:
             run_services_validators(
                 request_headers=request.headers,
-                request_body=request.body,
+                request_body=request_body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -283,22 +329,23 @@ class MockVuforiaWebServicesAPI:
             request_body=request.body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
         )
+        summary = database.summary()
 
         date = email.utils.formatdate(None, localtime=False, usegmt=True)
         body = {
             "result_code": ResultCodes.SUCCESS.value,
             "transaction_id": uuid.uuid4().hex,
             "name": database.database_name,
-            "active_images": len(database.active_targets),
-            "inactive_images": len(database.inactive_targets),
-            "failed_images": len(database.failed_targets),
+            "active_images": summary.active_images,
+            "inactive_images": summary.inactive_images,
+            "failed_images": summary.failed_images,
             "target_quota": database.target_quota,
             "total_recos": database.total_recos,
             "current_month_recos": database.current_month_recos,
             "previous_month_recos": database.previous_month_recos,
-            "processing_images": len(database.processing_targets),
+            "processing_images": summary.processing_images,
             "reco_threshold": database.reco_threshold,
             "request_quota": database.request_quota,
             "request_usage": 0,
@@ -325,13 +372,15 @@ class MockVuforiaWebServicesAPI:
         Fake implementation of
         https://library.vuforia.com/web-api/cloud-targets-web-services-api#details-list
         """
+        request_body = RequestBody(content=request.body)
+        databases = self._get_request_databases(request=request)
         try:
             run_services_validators(
                 request_headers=request.headers,
-                request_body=request.body,
+                request_body=request_body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -343,7 +392,7 @@ class MockVuforiaWebServicesAPI:
             request_body=request.body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
         )
 
         date = email.utils.formatdate(None, localtime=False, usegmt=True)
@@ -378,13 +427,15 @@ class MockVuforiaWebServicesAPI:
         Fake implementation of
         https://library.vuforia.com/web-api/cloud-targets-web-services-api#target-record
         """
+        request_body = RequestBody(content=request.body)
+        databases = self._get_request_databases(request=request)
         try:
             run_services_validators(
                 request_headers=request.headers,
-                request_body=request.body,
+                request_body=request_body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -396,7 +447,7 @@ class MockVuforiaWebServicesAPI:
             request_body=request.body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
         )
         target_id = request.path.split("/")[-1]
         target = database.get_target(target_id=target_id)
@@ -442,13 +493,15 @@ class MockVuforiaWebServicesAPI:
         Fake implementation of
         https://library.vuforia.com/web-api/cloud-targets-web-services-api#check
         """
+        request_body = RequestBody(content=request.body)
+        databases = self._get_request_databases(request=request)
         try:
             run_services_validators(
                 request_headers=request.headers,
-                request_body=request.body,
+                request_body=request_body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -460,26 +513,36 @@ class MockVuforiaWebServicesAPI:
             request_body=request.body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
         )
         target_id = request.path.split("/")[-1]
         target = database.get_target(target_id=target_id)
 
-        other_targets = database.targets - {target}
+        other_targets = get_candidate_targets(
+            image_matcher=self._duplicate_match_checker,
+            image_content=target.image_value,
+            targets=database.targets,
+        )
 
-        similar_targets: list[str] = [
-            other.target_id
+        candidate_targets = [
+            other
             for other in other_targets
-            if self._duplicate_match_checker(
-                first_image_content=target.image_value,
-                second_image_content=other.image_value,
-            )
+            if other.target_id != target.target_id
             and TargetStatuses.FAILED.value
             not in {target.status, other.status}
             and TargetStatuses.PROCESSING.value != other.status
             and other.active_flag
         ]
 
+        similar_targets: list[str] = [
+            other.target_id
+            for other in get_matching_targets(
+                image_matcher=self._duplicate_match_checker,
+                image_content=target.image_value,
+                targets=candidate_targets,
+            )
+        ]
+
         date = email.utils.formatdate(None, localtime=False, usegmt=True)
         body = {
             "transaction_id": uuid.uuid4().hex,
@@ -512,13 +575,15 @@ class MockVuforiaWebServicesAPI:
         Fake implementation of
         https://library.vuforia.com/web-api/cloud-targets-web-services-api#update
         """
+        request_body = RequestBody(content=request.body)
+        databases = self._get_request_databases(request=request)
         try:
             run_services_validators(
                 request_headers=request.headers,
-                request_body=request.body,
+                request_body=request_body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -530,7 +595,7 @@ class MockVuforiaWebServicesAPI:
             request_body=request.body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
         )
 
         target_id = request.path.split("/")[-1]
@@ -545,26 +610,27 @@ class MockVuforiaWebServicesAPI:
             context.status_code = exception.status_code
             return exception.response_text
 
-        width = request.json().get("width", target.width)
-        name = request.json().get("name", target.name)
-        active_flag = request.json().get("active_flag", target.active_flag)
-        application_metadata = request.json().get(
+        request_json = request_body.json
+        width = request_json.get("width", target.width)
+        name = request_json.get("name", target.name)
+        active_flag = request_json.get("active_flag", target.active_flag)
+        application_metadata = request_json.get(
             "application_metadata",
             target.application_metadata,
         )
 
         image_value = target.image_value
-        if "image" in request.json():
-            image_value = base64.b64decode(request.json()["image"])
+        if "image" in request_json:
+            image_value = request_body.image
 
-        if "active_flag" in request.json() and active_flag is None:
+        if "active_flag" in request_json and active_flag is None:
             fail_exception = Fail(status_code=HTTPStatus.BAD_REQUEST)
             context.headers = fail_exception.headers
             context.status_code = fail_exception.status_code
             return fail_exception.response_text
 
         if (
-            "application_metadata" in request.json()
+            "application_metadata" in request_json
             and application_metadata is None
         ):
             fail_exception = Fail(status_code=HTTPStatus.BAD_REQUEST)
@@ -584,9 +650,10 @@ class MockVuforiaWebServicesAPI:
             image_value=image_value,
             last_modified_date=last_modified_date,
         )
+        new_target.reuse_analysis(previous=target)
 
-        database.targets.remove(target)
-        database.targets.add(new_target)
+        database.targets.replace(old=target, new=new_target)
+        self._target_processor.submit(target=new_target)
 
         body = {
             "result_code": ResultCodes.SUCCESS.value,
@@ -614,13 +681,15 @@ class MockVuforiaWebServicesAPI:
         Fake implementation of
         https://library.vuforia.com/web-api/cloud-targets-web-services-api#retrieve-report
         """
+        request_body = RequestBody(content=request.body)
+        databases = self._get_request_databases(request=request)
         try:
             run_services_validators(
                 request_headers=request.headers,
-                request_body=request.body,
+                request_body=request_body,
                 request_method=request.method,
                 request_path=request.path,
-                databases=self._target_manager.databases,
+                databases=databases,
             )
         except ValidatorException as exc:
             context.headers = exc.headers
@@ -632,7 +701,7 @@ class MockVuforiaWebServicesAPI:
             request_body=request.body,
             request_method=request.method,
             request_path=request.path,
-            databases=self._target_manager.databases,
+            databases=databases,
         )
         target_id = request.path.split("/")[-1]
         target = database.get_target(target_id=target_id)
@@ -51,13 +51,14 @@ from .target_validators import validate_target_id_exists
 from .width_validators import validate_width
 
 if TYPE_CHECKING:
+    from mock_vws._mock_common import RequestBody
     from mock_vws.database import VuforiaDatabase
 
 
 def run_services_validators(
     request_path: str,
     request_headers: dict[str, str],
-    request_body: bytes,
+    request_body: RequestBody,
     request_method: str,
     databases: set[VuforiaDatabase],
 ) -> None:
@@ -67,7 +68,8 @@ def run_services_validators(
     Args:
         request_path: The path of the request.
         request_headers: The headers sent with the request.
-        request_body: The body of the request.
+        request_body: The body of the request. This is given to each
+            validator which reads it, so that it is parsed once.
         request_method: The HTTP method of the request.
         databases: All Vuforia databases.
     """
@@ -79,28 +81,28 @@ def run_services_validators(
     )
     validate_authorization(
         request_headers=request_headers,
-        request_body=request_body,
+        request_body=request_body.content,
         request_method=request_method,
         request_path=request_path,
         databases=databases,
     )
     validate_project_state(
         request_headers=request_headers,
-        request_body=request_body,
+        request_body=request_body.content,
         request_method=request_method,
         request_path=request_path,
         databases=databases,
     )
     validate_target_id_exists(
         request_headers=request_headers,
-        request_body=request_body,
+        request_body=request_body.content,
         request_method=request_method,
         request_path=request_path,
         databases=databases,
     )
 
     validate_body_given(
-        request_body=request_body,
+        request_body=request_body.content,
         request_method=request_method,
     )
 
@@ -157,14 +159,14 @@ def run_services_validators(
 
     validate_content_length_header_is_int(
         request_headers=request_headers,
-        request_body=request_body,
+        request_body=request_body.content,
     )
     validate_content_length_header_not_too_large(
         request_headers=request_headers,
-        request_body=request_body,
+        request_body=request_body.content,
     )
 
     validate_content_length_header_not_too_small(
         request_headers=request_headers,
-        request_body=request_body,
+        request_body=request_body.content,
     )
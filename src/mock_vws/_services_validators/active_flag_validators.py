@@ -2,16 +2,16 @@
 Validators for the active flag.
 """
 
-import json
 import logging
 from http import HTTPStatus
 
+from mock_vws._mock_common import RequestBody
 from mock_vws._services_validators.exceptions import Fail
 
 _LOGGER = logging.getLogger(__name__)
 
 
-def validate_active_flag(request_body: bytes) -> None:
+def validate_active_flag(request_body: RequestBody) -> None:
     """
     Validate the active flag data given to the endpoint.
 
@@ -22,14 +22,14 @@ def validate_active_flag(request_body: bytes) -> None:
         Fail: There is active flag data given to the endpoint which is not
             either a Boolean or NULL.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
-    request_text = request_body.decode()
-    if "active_flag" not in json.loads(request_text):
+    request_json = request_body.json
+    if "active_flag" not in request_json:
         return
 
-    active_flag = json.loads(request_text).get("active_flag")
+    active_flag = request_json.get("active_flag")
 
     if active_flag is None or isinstance(active_flag, bool):
         return
@@ -4,13 +4,12 @@ Image validators to use in the mock.
 
 import binascii
 import io
-import json
 import logging
 from http import HTTPStatus
 
 from PIL import Image
 
-from mock_vws._base64_decoding import decode_base64
+from mock_vws._mock_common import RequestBody
 from mock_vws._services_validators.exceptions import (
     BadImage,
     Fail,
@@ -20,7 +19,20 @@ from mock_vws._services_validators.exceptions import (
 _LOGGER = logging.getLogger(__name__)
 
 
-def validate_image_format(request_body: bytes) -> None:
+def _open_image(request_body: RequestBody) -> Image.Image:
+    """
+    Open the image given in a request body.
+
+    Only the image's header is read, so this is fast.
+
+    Raises:
+        OSError: The image data is not an image file.
+    """
+    image_file = io.BytesIO(request_body.image)
+    return Image.open(image_file)
+
+
+def validate_image_format(request_body: RequestBody) -> None:
     """
     Validate the format of the image given to a VWS endpoint.
 
@@ -30,18 +42,16 @@ def validate_image_format(request_body: bytes) -> None:
     Raises:
         BadImage:  The image is given and is not either a PNG or a JPEG.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
-    request_text = request_body.decode()
-    image = json.loads(request_text).get("image")
+    request_json = request_body.json
+    image = request_json.get("image")
 
     if image is None:
         return
 
-    decoded = decode_base64(encoded_data=image)
-    image_file = io.BytesIO(decoded)
-    pil_image = Image.open(image_file)
+    pil_image = _open_image(request_body=request_body)
 
     if pil_image.format in {"PNG", "JPEG"}:
         return
@@ -50,7 +60,7 @@ def validate_image_format(request_body: bytes) -> None:
     raise BadImage
 
 
-def validate_image_color_space(request_body: bytes) -> None:
+def validate_image_color_space(request_body: RequestBody) -> None:
     """
     Validate the color space of the image given to a VWS endpoint.
 
@@ -61,18 +71,16 @@ def validate_image_color_space(request_body: bytes) -> None:
         BadImage: The image is given and is not in either the RGB or
             greyscale color space.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
-    request_text = request_body.decode()
-    image = json.loads(request_text).get("image")
+    request_json = request_body.json
+    image = request_json.get("image")
 
     if image is None:
         return
 
-    decoded = decode_base64(encoded_data=image)
-    image_file = io.BytesIO(decoded)
-    pil_image = Image.open(image_file)
+    pil_image = _open_image(request_body=request_body)
 
     if pil_image.mode in {"L", "RGB"}:
         return
@@ -83,7 +91,7 @@ def validate_image_color_space(request_body: bytes) -> None:
     raise BadImage
 
 
-def validate_image_size(request_body: bytes) -> None:
+def validate_image_size(request_body: RequestBody) -> None:
     """
     Validate the file size of the image given to a VWS endpoint.
 
@@ -94,16 +102,16 @@ def validate_image_size(request_body: bytes) -> None:
         ImageTooLarge:  The image is given and is not under a certain file
             size threshold.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
-    request_text = request_body.decode()
-    image = json.loads(request_text).get("image")
+    request_json = request_body.json
+    image = request_json.get("image")
 
     if image is None:
         return
 
-    decoded = decode_base64(encoded_data=image)
+    decoded = request_body.image
 
     max_allowed_size = 2_359_293
     if len(decoded) <= max_allowed_size:
@@ -113,7 +121,7 @@ def validate_image_size(request_body: bytes) -> None:
     raise ImageTooLarge
 
 
-def validate_image_is_image(request_body: bytes) -> None:
+def validate_image_is_image(request_body: RequestBody) -> None:
     """
     Validate that the given image data is actually an image file.
 
@@ -123,25 +131,22 @@ def validate_image_is_image(request_body: bytes) -> None:
     Raises:
         BadImage: Image data is given and it is not an image file.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
-    request_text = request_body.decode()
-    image = json.loads(request_text).get("image")
+    request_json = request_body.json
+    image = request_json.get("image")
 
     if image is None:
         return
 
-    decoded = decode_base64(encoded_data=image)
-    image_file = io.BytesIO(decoded)
-
     try:
-        Image.open(image_file)
+        _open_image(request_body=request_body)
     except OSError as exc:
         raise BadImage from exc
 
 
-def validate_image_encoding(request_body: bytes) -> None:
+def validate_image_encoding(request_body: RequestBody) -> None:
     """
     Validate that the given image data can be base64 decoded.
 
@@ -151,23 +156,21 @@ def validate_image_encoding(request_body: bytes) -> None:
     Raises:
         Fail: Image data is given and it cannot be base64 decoded.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
-    request_text = request_body.decode()
-    if "image" not in json.loads(request_text):
+    request_json = request_body.json
+    if "image" not in request_json:
         return
 
-    image = json.loads(request_text).get("image")
-
     try:
-        decode_base64(encoded_data=image)
+        _ = request_body.image
     except binascii.Error as exc:
         _LOGGER.warning('Image data cannot be base64 decoded: "%s"', exc)
         raise Fail(status_code=HTTPStatus.UNPROCESSABLE_ENTITY) from exc
 
 
-def validate_image_data_type(request_body: bytes) -> None:
+def validate_image_data_type(request_body: RequestBody) -> None:
     """
     Validate that the given image data is a string.
 
@@ -177,14 +180,14 @@ def validate_image_data_type(request_body: bytes) -> None:
     Raises:
         Fail: Image data is given and it is not a string.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
-    request_text = request_body.decode()
-    if "image" not in json.loads(request_text):
+    request_json = request_body.json
+    if "image" not in request_json:
         return
 
-    image = json.loads(request_text).get("image")
+    image = request_json.get("image")
 
     if isinstance(image, str):
         return
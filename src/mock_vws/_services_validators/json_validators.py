@@ -2,13 +2,13 @@
 Validators for given JSON.
 """
 
-import json
 import logging
 from http import HTTPStatus
 from json.decoder import JSONDecodeError
 
 from requests_mock import POST, PUT
 
+from mock_vws._mock_common import RequestBody
 from mock_vws._services_validators.exceptions import (
     Fail,
     UnnecessaryRequestBody,
@@ -44,7 +44,7 @@ def validate_body_given(request_body: bytes, request_method: str) -> None:
         raise UnnecessaryRequestBody
 
 
-def validate_json(request_body: bytes) -> None:
+def validate_json(request_body: RequestBody) -> None:
     """
     Validate that any given body is valid JSON.
 
@@ -54,11 +54,11 @@ def validate_json(request_body: bytes) -> None:
     Raises:
         Fail: The request body includes invalid JSON.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
     try:
-        json.loads(request_body.decode())
+        _ = request_body.json
     except JSONDecodeError as exc:
         _LOGGER.warning(msg="The request body is not valid JSON.")
         raise Fail(status_code=HTTPStatus.BAD_REQUEST) from exc
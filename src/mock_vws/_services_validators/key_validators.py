@@ -2,7 +2,6 @@
 Validators for JSON keys.
 """
 
-import json
 import logging
 import re
 from dataclasses import dataclass
@@ -10,6 +9,8 @@ from http import HTTPStatus
 
 from requests_mock import DELETE, GET, POST, PUT
 
+from mock_vws._mock_common import RequestBody
+
 from .exceptions import Fail
 
 _LOGGER = logging.getLogger(__name__)
@@ -36,7 +37,7 @@ class _Route:
 
 
 def validate_keys(
-    request_body: bytes,
+    request_body: RequestBody,
     request_path: str,
     request_method: str,
 ) -> None:
@@ -144,11 +145,10 @@ def validate_keys(
     optional_keys = matching_route.optional_keys
     allowed_keys = mandatory_keys.union(optional_keys)
 
-    if not request_body and not allowed_keys:
+    if not request_body.content and not allowed_keys:
         return
 
-    request_text = request_body.decode()
-    request_json = json.loads(request_text)
+    request_json = request_body.json
     given_keys = set(request_json.keys())
     all_given_keys_allowed = given_keys.issubset(allowed_keys)
     all_mandatory_keys_given = mandatory_keys.issubset(given_keys)
@@ -3,17 +3,17 @@ Validators for application metadata.
 """
 
 import binascii
-import json
 import logging
 from http import HTTPStatus
 
 from mock_vws._base64_decoding import decode_base64
+from mock_vws._mock_common import RequestBody
 from mock_vws._services_validators.exceptions import Fail, MetadataTooLarge
 
 _LOGGER = logging.getLogger(__name__)
 
 
-def validate_metadata_size(request_body: bytes) -> None:
+def validate_metadata_size(request_body: RequestBody) -> None:
     """
     Validate that the given application metadata is a string or 1024 * 1024
     bytes or fewer.
@@ -24,11 +24,10 @@ def validate_metadata_size(request_body: bytes) -> None:
     Raises:
         MetadataTooLarge: Application metadata is given and it is too large.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
-    request_text = request_body.decode()
-    request_json = json.loads(request_text)
+    request_json = request_body.json
     application_metadata = request_json.get("application_metadata")
     if application_metadata is None:
         return
@@ -42,7 +41,7 @@ def validate_metadata_size(request_body: bytes) -> None:
     raise MetadataTooLarge
 
 
-def validate_metadata_encoding(request_body: bytes) -> None:
+def validate_metadata_encoding(request_body: RequestBody) -> None:
     """
     Validate that the given application metadata can be base64 decoded.
 
@@ -53,11 +52,10 @@ def validate_metadata_encoding(request_body: bytes) -> None:
         Fail: Application metadata is given and it cannot be base64
             decoded.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
-    request_text = request_body.decode()
-    request_json = json.loads(request_text)
+    request_json = request_body.json
     if "application_metadata" not in request_json:
         return
 
@@ -73,7 +71,7 @@ def validate_metadata_encoding(request_body: bytes) -> None:
         raise Fail(status_code=HTTPStatus.UNPROCESSABLE_ENTITY) from exc
 
 
-def validate_metadata_type(request_body: bytes) -> None:
+def validate_metadata_type(request_body: RequestBody) -> None:
     """
     Validate that the given application metadata is a string or NULL.
 
@@ -83,11 +81,10 @@ def validate_metadata_type(request_body: bytes) -> None:
     Raises:
         Fail: Application metadata is given and it is not a string or NULL.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
-    request_text = request_body.decode()
-    request_json = json.loads(request_text)
+    request_json = request_body.json
     if "application_metadata" not in request_json:
         return
 
@@ -2,11 +2,11 @@
 Validators for target names.
 """
 
-import json
 import logging
 from http import HTTPStatus
 
 from mock_vws._database_matchers import get_database_matching_server_keys
+from mock_vws._mock_common import RequestBody
 from mock_vws._services_validators.exceptions import (
     Fail,
     OopsErrorOccurredResponse,
@@ -18,7 +18,7 @@ _LOGGER = logging.getLogger(__name__)
 
 
 def validate_name_characters_in_range(
-    request_body: bytes,
+    request_body: RequestBody,
     request_method: str,
     request_path: str,
 ) -> None:
@@ -36,14 +36,14 @@ def validate_name_characters_in_range(
         TargetNameExist: Characters are out of range and the request is for
             another endpoint.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
-    request_text = request_body.decode()
-    if "name" not in json.loads(request_text):
+    request_json = request_body.json
+    if "name" not in request_json:
         return
 
-    name = json.loads(request_text)["name"]
+    name = request_json["name"]
 
     max_character_ord = 65535
     if all(ord(character) <= max_character_ord for character in name):
@@ -57,7 +57,7 @@ def validate_name_characters_in_range(
     raise TargetNameExist
 
 
-def validate_name_type(request_body: bytes) -> None:
+def validate_name_type(request_body: RequestBody) -> None:
     """
     Validate the type of the name argument given to a VWS endpoint.
 
@@ -67,14 +67,14 @@ def validate_name_type(request_body: bytes) -> None:
     Raises:
         Fail: A name is given and it is not a string.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
-    request_text = request_body.decode()
-    if "name" not in json.loads(request_text):
+    request_json = request_body.json
+    if "name" not in request_json:
         return
 
-    name = json.loads(request_text)["name"]
+    name = request_json["name"]
 
     if isinstance(name, str):
         return
@@ -83,7 +83,7 @@ def validate_name_type(request_body: bytes) -> None:
     raise Fail(status_code=HTTPStatus.BAD_REQUEST)
 
 
-def validate_name_length(request_body: bytes) -> None:
+def validate_name_length(request_body: RequestBody) -> None:
     """
     Validate the length of the name argument given to a VWS endpoint.
 
@@ -94,14 +94,14 @@ def validate_name_length(request_body: bytes) -> None:
         Fail: A name is given and it is not a between 1 and 64 characters in
             length.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
-    request_text = request_body.decode()
-    if "name" not in json.loads(request_text):
+    request_json = request_body.json
+    if "name" not in request_json:
         return
 
-    name = json.loads(request_text)["name"]
+    name = request_json["name"]
 
     max_length = 64
     if name and len(name) <= max_length:
@@ -113,7 +113,7 @@ def validate_name_length(request_body: bytes) -> None:
 
 def validate_name_does_not_exist_new_target(
     databases: set[VuforiaDatabase],
-    request_body: bytes,
+    request_body: RequestBody,
     request_headers: dict[str, str],
     request_method: str,
     request_path: str,
@@ -131,11 +131,11 @@ def validate_name_does_not_exist_new_target(
     Raises:
         TargetNameExist: The target name already exists.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
-    request_text = request_body.decode()
-    if "name" not in json.loads(request_text):
+    request_json = request_body.json
+    if "name" not in request_json:
         return
 
     split_path = request_path.split("/")
@@ -144,20 +144,16 @@ def validate_name_does_not_exist_new_target(
     if len(split_path) != split_path_no_target_id_length:
         return
 
-    name = json.loads(request_text)["name"]
+    name = request_json["name"]
     database = get_database_matching_server_keys(
         request_headers=request_headers,
-        request_body=request_body,
+        request_body=request_body.content,
         request_method=request_method,
         request_path=request_path,
         databases=databases,
     )
 
-    matching_name_targets = [
-        target
-        for target in database.not_deleted_targets
-        if target.name == name
-    ]
+    matching_name_targets = database.targets.not_deleted_with_name(name=name)
 
     if not matching_name_targets:
         return
@@ -168,7 +164,7 @@ def validate_name_does_not_exist_new_target(
 
 def validate_name_does_not_exist_existing_target(
     request_headers: dict[str, str],
-    request_body: bytes,
+    request_body: RequestBody,
     request_method: str,
     request_path: str,
     databases: set[VuforiaDatabase],
@@ -188,11 +184,11 @@ def validate_name_does_not_exist_existing_target(
         TargetNameExist: The target name is not the same as the name of the
             target being updated but it is the same as another target.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
-    request_text = request_body.decode()
-    if "name" not in json.loads(request_text):
+    request_json = request_body.json
+    if "name" not in request_json:
         return
 
     split_path = request_path.split("/")
@@ -202,20 +198,16 @@ def validate_name_does_not_exist_existing_target(
 
     target_id = split_path[-1]
 
-    name = json.loads(request_text)["name"]
+    name = request_json["name"]
     database = get_database_matching_server_keys(
         request_headers=request_headers,
-        request_body=request_body,
+        request_body=request_body.content,
         request_method=request_method,
         request_path=request_path,
         databases=databases,
     )
 
-    matching_name_targets = [
-        target
-        for target in database.not_deleted_targets
-        if target.name == name
-    ]
+    matching_name_targets = database.targets.not_deleted_with_name(name=name)
 
     if not matching_name_targets:
         return
@@ -48,11 +48,13 @@ def validate_target_id_exists(
     )
 
     try:
-        (_,) = (
-            target
-            for target in database.not_deleted_targets
-            if target.target_id == target_id
-        )
+        target = database.get_target(target_id=target_id)
     except ValueError as exc:
         _LOGGER.warning('The target ID "%s" does not exist.', target_id)
         raise UnknownTarget from exc
+
+    if not target.delete_date:
+        return
+
+    _LOGGER.warning('The target ID "%s" does not exist.', target_id)
+    raise UnknownTarget
@@ -2,16 +2,16 @@
 Validators for the width field.
 """
 
-import json
 import logging
 from http import HTTPStatus
 
+from mock_vws._mock_common import RequestBody
 from mock_vws._services_validators.exceptions import Fail
 
 _LOGGER = logging.getLogger(__name__)
 
 
-def validate_width(request_body: bytes) -> None:
+def validate_width(request_body: RequestBody) -> None:
     """
     Validate the width argument given to a VWS endpoint.
 
@@ -21,14 +21,14 @@ def validate_width(request_body: bytes) -> None:
     Raises:
         Fail: Width is given and is not a positive number.
     """
-    if not request_body:
+    if not request_body.content:
         return
 
-    request_text = request_body.decode()
-    if "width" not in json.loads(request_text):
+    request_json = request_body.json
+    if "width" not in request_json:
         return
 
-    width = json.loads(request_text).get("width")
+    width = request_json.get("width")
 
     width_is_number = isinstance(width, int | float)
     width_positive = width_is_number and width > 0
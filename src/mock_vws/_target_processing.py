@@ -0,0 +1,165 @@
+"""
+Background processing of new and updated targets.
+"""
+
+from __future__ import annotations
+
+import collections
+import logging
+import threading
+from typing import TYPE_CHECKING
+
+from mock_vws.image_matchers import TargetImageCachingMatcher
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from mock_vws.image_matchers import ImageMatcher
+    from mock_vws.target import Target
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TargetProcessor:
+    """
+    A bounded pool of threads which do the slow work for new and updated
+    targets while they are processing.
+
+    This computes each target's status and tracking rating, and caches the
+    work which image matchers do for the target's image, so that the first
+    request which reads a target after processing does not do this work.
+
+    Worker threads are started when targets are submitted and they stop when
+    there are no targets left to process, or when the processor is shut
+    down.
+    """
+
+    def __init__(
+        self,
+        image_matchers: Iterable[ImageMatcher] = (),
+        max_workers: int = 2,
+        max_queue_size: int = 1024,
+    ) -> None:
+        """
+        Args:
+            image_matchers: Image matchers to cache work for each target's
+                image with. Only matchers which implement
+                :class:`mock_vws.image_matchers.TargetImageCachingMatcher`
+                are used.
+            max_workers: The maximum number of threads to process targets
+                with. If this is 0, targets are not processed in the
+                background, and the work is done when they are read.
+            max_queue_size: The maximum number of targets to hold.
+                Targets submitted when this many are held are not processed
+                in the background, and the work is done when they are read.
+        """
+        self._image_matchers = tuple(dict.fromkeys(image_matchers))
+        self._max_workers = max_workers
+        self._max_queue_size = max_queue_size
+        self._lock = threading.Lock()
+        self._queue: collections.deque[
+            tuple[Target, Callable[[Target], None] | None]
+        ] = collections.deque()
+        self._workers: set[threading.Thread] = set()
+        self._number_in_progress = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        The number of targets which are waiting to be processed or which are
+        being processed.
+        """
+        with self._lock:
+            return len(self._queue) + self._number_in_progress
+
+    def submit(
+        self,
+        target: Target,
+        on_processed: Callable[[Target], None] | None = None,
+    ) -> None:
+        """
+        Process a target in the background.
+
+        Args:
+            target: The target to process.
+            on_processed: A function to call with the target once it has
+                been processed, for example to store its tracking rating.
+                This is not called if processing fails, or if the target is
+                not processed because there are no workers or because too
+                many targets are held.
+        """
+        with self._lock:
+            if (
+                not self._max_workers
+                or len(self._queue) >= self._max_queue_size
+            ):
+                return
+            self._queue.append((target, on_processed))
+            if len(self._workers) < self._max_workers:
+                worker = threading.Thread(
+                    target=self._work,
+                    name="mock-vws-target-processing",
+                    daemon=True,
+                )
+                self._workers.add(worker)
+                worker.start()
+
+    def shutdown(self) -> None:
+        """
+        Stop processing targets in the background.
+
+        Targets which are waiting to be processed are dropped, and their work
+        is done when they are read.
+        This waits for targets which are being processed.
+        Targets submitted later are processed as usual.
+        """
+        with self._lock:
+            self._queue.clear()
+            workers = set(self._workers)
+
+        for worker in workers:
+            worker.join()
+
+    def _work(self) -> None:
+        """
+        Process targets until there are none left.
+        """
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._workers.discard(threading.current_thread())
+                    return
+                target, on_processed = self._queue.popleft()
+                self._number_in_progress += 1
+
+            try:
+                self._process(target=target, on_processed=on_processed)
+            finally:
+                with self._lock:
+                    self._number_in_progress -= 1
+
+    def _process(
+        self,
+        target: Target,
+        on_processed: Callable[[Target], None] | None,
+    ) -> None:
+        """
+        Do the slow work for a target.
+        """
+        try:
+            target.process()
+            for image_matcher in self._image_matchers:
+                if isinstance(image_matcher, TargetImageCachingMatcher):
+                    image_matcher.cache_target_image(
+                        image_content=target.image_value,
+                        image_digest=target.image_digest,
+                    )
+            if on_processed is not None:
+                on_processed(target)
+        except Exception:
+            # The same work is done again when the target is read, so the
+            # error is raised for that request.
+            _LOGGER.exception(
+                "Processing target %s failed.",
+                target.target_id,
+            )
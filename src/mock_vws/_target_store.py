@@ -0,0 +1,334 @@
+"""
+An indexed store of targets for a mock Vuforia database.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterable, Iterator, MutableSet
+
+from mock_vws._image_digests import get_image_digest
+from mock_vws.target import Target
+
+
+class _Indexes:
+    """
+    The targets in a store and the indexes of them.
+    """
+
+    def __init__(self) -> None:
+        """
+        Create empty indexes.
+        """
+        self.targets_by_id: dict[str, Target] = {}
+        # The name index only includes targets which have not been deleted.
+        # Only targets which have not been deleted are considered when
+        # checking whether a name is already in use.
+        self.not_deleted_ids_by_name: dict[str, frozenset[str]] = {}
+        self.active_ids: set[str] = set()
+        self.inactive_ids: set[str] = set()
+        self.deleted_ids: set[str] = set()
+        self.ids_by_image_digest: dict[str, frozenset[str]] = {}
+        self.image_digests_by_id: dict[str, str] = {}
+
+    def copy(self) -> _Indexes:
+        """
+        Return a copy which can be changed without changing these indexes.
+
+        The values of the dictionaries are immutable, so they are shared.
+        This is linear in the number of targets, so it is used only to copy a
+        store, not for each change.
+        """
+        indexes = _Indexes()
+        indexes.targets_by_id = dict(self.targets_by_id)
+        indexes.not_deleted_ids_by_name = dict(self.not_deleted_ids_by_name)
+        indexes.active_ids = set(self.active_ids)
+        indexes.inactive_ids = set(self.inactive_ids)
+        indexes.deleted_ids = set(self.deleted_ids)
+        indexes.ids_by_image_digest = dict(self.ids_by_image_digest)
+        indexes.image_digests_by_id = dict(self.image_digests_by_id)
+        return indexes
+
+    def bucket_for(self, target: Target) -> set[str]:
+        """
+        Return the bucket of target IDs which the given target belongs in.
+        """
+        if target.delete_date:
+            return self.deleted_ids
+        if target.active_flag:
+            return self.active_ids
+        return self.inactive_ids
+
+    def index(self, target: Target) -> None:
+        """
+        Add the given target to the indexes.
+        """
+        target_id = target.target_id
+        self.targets_by_id[target_id] = target
+        self.bucket_for(target=target).add(target_id)
+        image_digest = target.image_digest
+        self.image_digests_by_id[target_id] = image_digest
+        self.ids_by_image_digest[image_digest] = self.ids_by_image_digest.get(
+            image_digest,
+            frozenset(),
+        ) | {target_id}
+        if not target.delete_date:
+            self.not_deleted_ids_by_name[target.name] = (
+                self.not_deleted_ids_by_name.get(target.name, frozenset())
+                | {target_id}
+            )
+
+    def unindex(self, target: Target) -> None:
+        """
+        Remove the given target from the indexes.
+        """
+        target_id = target.target_id
+        del self.targets_by_id[target_id]
+        self.bucket_for(target=target).discard(target_id)
+        image_digest = self.image_digests_by_id.pop(target_id)
+        image_ids = self.ids_by_image_digest[image_digest] - {target_id}
+        if image_ids:
+            self.ids_by_image_digest[image_digest] = image_ids
+        else:
+            del self.ids_by_image_digest[image_digest]
+        if not target.delete_date:
+            name_ids = self.not_deleted_ids_by_name[target.name] - {target_id}
+            if name_ids:
+                self.not_deleted_ids_by_name[target.name] = name_ids
+            else:
+                del self.not_deleted_ids_by_name[target.name]
+
+
+class TargetStore(MutableSet[Target]):
+    """
+    A set of targets which keeps indexes up to date as targets are added and
+    removed.
+
+    Targets are keyed by their target ID.
+    Adding a target with the same ID as a target which is already in the store
+    replaces that target.
+
+    The store is safe to use from many threads.
+    Each change updates the indexes in place while holding a lock, so a
+    change takes time which does not depend on the number of targets.
+    Reads which look at more than one index hold the same lock, so each read
+    sees the store as it was either before or after a change.
+    Iterating over the store iterates over an immutable snapshot of the
+    targets as they were when iteration started.
+    The snapshot is made on the first iteration after a change, and is
+    shared by later iterations until the next change.
+    """
+
+    def __init__(self, targets: Iterable[Target] = ()) -> None:
+        """
+        Args:
+            targets: Targets to add to the store.
+        """
+        self._lock = threading.Lock()
+        self._indexes = _Indexes()
+        self._snapshot: tuple[Target, ...] | None = None
+        for target in targets:
+            self._add(value=target)
+
+    def __contains__(self, value: object) -> bool:
+        """
+        Whether the given target is in the store.
+        """
+        if not isinstance(value, Target):
+            return False
+        return self._indexes.targets_by_id.get(value.target_id) == value
+
+    def __iter__(self) -> Iterator[Target]:
+        """
+        Iterate over all targets, including deleted targets.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    targets = self._indexes.targets_by_id.values()
+                    self._snapshot = tuple(targets)
+                snapshot = self._snapshot
+        return iter(snapshot)
+
+    def __len__(self) -> int:
+        """
+        The number of targets, including deleted targets.
+        """
+        return len(self._indexes.targets_by_id)
+
+    def __repr__(self) -> str:
+        """
+        A representation of the store which lists the target IDs.
+        """
+        target_ids = [target.target_id for target in self]
+        return f"{type(self).__name__}({target_ids!r})"
+
+    def copy(self) -> TargetStore:
+        """
+        Return a store with the same targets, which can be changed without
+        changing this store.
+
+        This copies the indexes rather than indexing each target again, so
+        images are not hashed again.
+        """
+        store = TargetStore()
+        with self._lock:
+            store._indexes = self._indexes.copy()
+            store._snapshot = self._snapshot
+        return store
+
+    def _add(self, value: Target) -> None:
+        """
+        Add a target, replacing any existing target with the same ID.
+
+        The caller must hold the lock, or be the only user of the store.
+        """
+        indexes = self._indexes
+        existing = indexes.targets_by_id.get(value.target_id)
+        if existing is not None:
+            indexes.unindex(target=existing)
+        indexes.index(target=value)
+        self._snapshot = None
+
+    def add(self, value: Target) -> None:
+        """
+        Add a target, replacing any existing target with the same ID.
+
+        Args:
+            value: The target to add.
+        """
+        with self._lock:
+            self._add(value=value)
+
+    def discard(self, value: Target) -> None:
+        """
+        Remove a target if it is in the store.
+
+        Args:
+            value: The target to remove.
+        """
+        with self._lock:
+            if value not in self:
+                return
+            self._indexes.unindex(target=value)
+            self._snapshot = None
+
+    def replace(self, old: Target, new: Target) -> None:
+        """
+        Swap a target for a new version of it, updating all indexes together.
+
+        Args:
+            old: The target which is in the store.
+            new: The target to store in its place.
+
+        Raises:
+            KeyError: The old target is not in the store, for example
+                because another thread has replaced it.
+        """
+        with self._lock:
+            if old not in self:
+                raise KeyError(old.target_id)
+            self._indexes.unindex(target=old)
+            self._indexes.index(target=new)
+            self._snapshot = None
+
+    def get(self, target_id: str) -> Target:
+        """
+        Return the target with the given ID.
+
+        Args:
+            target_id: The ID of the target.
+
+        Raises:
+            KeyError: There is no target with the given ID.
+        """
+        return self._indexes.targets_by_id[target_id]
+
+    def not_deleted_with_name(self, name: str) -> set[Target]:
+        """
+        All targets with the given name which have not been deleted.
+
+        Args:
+            name: The name of the targets.
+        """
+        with self._lock:
+            indexes = self._indexes
+            target_ids = indexes.not_deleted_ids_by_name.get(name, frozenset())
+            return {
+                indexes.targets_by_id[target_id] for target_id in target_ids
+            }
+
+    def with_image(self, image_content: bytes) -> set[Target]:
+        """
+        All targets, including deleted targets, with exactly the given image.
+
+        Args:
+            image_content: The content of the image.
+        """
+        image_digest = get_image_digest(image_content=image_content)
+        with self._lock:
+            indexes = self._indexes
+            target_ids = indexes.ids_by_image_digest.get(
+                image_digest,
+                frozenset(),
+            )
+            return {
+                indexes.targets_by_id[target_id] for target_id in target_ids
+            }
+
+    def get_image(self, image_digest: str) -> bytes:
+        """
+        Return the image with the given digest.
+
+        Args:
+            image_digest: The digest of the image's content.
+
+        Raises:
+            KeyError: No target has an image with the given digest.
+        """
+        with self._lock:
+            indexes = self._indexes
+            target_id = next(iter(indexes.ids_by_image_digest[image_digest]))
+            return indexes.targets_by_id[target_id].image_value
+
+    @property
+    def active(self) -> set[Target]:
+        """
+        All targets which have not been deleted and have the active flag set.
+
+        This does not consider the processing status of the targets.
+        """
+        with self._lock:
+            indexes = self._indexes
+            return {
+                indexes.targets_by_id[target_id]
+                for target_id in indexes.active_ids
+            }
+
+    @property
+    def inactive(self) -> set[Target]:
+        """
+        All targets which have not been deleted and do not have the active
+        flag set.
+
+        This does not consider the processing status of the targets.
+        """
+        with self._lock:
+            indexes = self._indexes
+            return {
+                indexes.targets_by_id[target_id]
+                for target_id in indexes.inactive_ids
+            }
+
+    @property
+    def not_deleted(self) -> set[Target]:
+        """
+        All targets which have not been deleted.
+        """
+        with self._lock:
+            indexes = self._indexes
+            return {
+                indexes.targets_by_id[target_id]
+                for target_id in indexes.active_ids | indexes.inactive_ids
+            }
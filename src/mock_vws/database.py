@@ -4,14 +4,20 @@ Utilities for managing mock Vuforia databases.
 
 from __future__ import annotations
 
+import datetime
 import uuid
 from dataclasses import dataclass, field
-from typing import TypedDict
+from typing import TYPE_CHECKING, Self, TypedDict, overload
+from zoneinfo import ZoneInfo
 
 from mock_vws._constants import TargetStatuses
+from mock_vws._target_store import TargetStore
 from mock_vws.states import States
 from mock_vws.target import Target, TargetDict
 
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
 
 class DatabaseDict(TypedDict):
     """
@@ -27,6 +33,27 @@ class DatabaseDict(TypedDict):
     targets: list[TargetDict]
 
 
+@dataclass(frozen=True)
+class DatabaseSummary:
+    """
+    Counts of the targets in a database which have not been deleted, by
+    status.
+
+    Args:
+        active_images: The number of active targets which were processed
+            successfully.
+        inactive_images: The number of inactive targets which were processed
+            successfully.
+        failed_images: The number of targets which failed processing.
+        processing_images: The number of targets which are processing.
+    """
+
+    active_images: int
+    inactive_images: int
+    failed_images: int
+    processing_images: int
+
+
 def _random_hex() -> str:
     """
     Return a random hex value.
@@ -34,6 +61,66 @@ def _random_hex() -> str:
     return uuid.uuid4().hex
 
 
+class _TargetStoreField:
+    """
+    A dataclass field which is given any iterable of targets, and which
+    stores them in an indexed ``TargetStore``.
+
+    A given ``TargetStore`` is stored as it is, so that a database made from
+    another database's fields shares its targets.
+    """
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        """
+        Store the value under a private name.
+        """
+        self._private_name = f"_{name}"
+
+    @overload
+    def __get__(self, instance: None, owner: type) -> Self: ...
+
+    @overload
+    def __get__(
+        self,
+        instance: VuforiaDatabase,
+        owner: type,
+    ) -> TargetStore: ...
+
+    def __get__(
+        self,
+        instance: VuforiaDatabase | None,
+        owner: type,
+    ) -> Self | TargetStore:
+        """
+        Return the stored targets.
+        """
+        if instance is None:
+            return self
+        target_store: TargetStore = getattr(instance, self._private_name)
+        return target_store
+
+    def __set__(
+        self,
+        instance: VuforiaDatabase,
+        value: Iterable[Target],
+    ) -> None:
+        """
+        Store the given targets.
+        """
+        # This field is given to ``field`` as the default value, so that the
+        # field can be left out of the hash, and so this is given when no
+        # targets are given.
+        if isinstance(value, _TargetStoreField):
+            value = ()
+        target_store = (
+            value
+            if isinstance(value, TargetStore)
+            else TargetStore(targets=value)
+        )
+        # ``object.__setattr__`` is needed as the class is frozen.
+        object.__setattr__(instance, self._private_name, target_store)
+
+
 @dataclass(eq=True, frozen=True)
 class VuforiaDatabase:
     """
@@ -51,6 +138,8 @@ class VuforiaDatabase:
         client_secret_key: A VWS client secret key. Defaults to a random
             string.
         state: The state of the database.
+        targets: The targets in the database. These are stored in an indexed
+            ``TargetStore``, which is given as ``targets`` on the database.
     """
 
     # We hide a few things in the ``repr`` with ``repr=False`` so that they do
@@ -64,7 +153,10 @@ class VuforiaDatabase:
     # ``frozen=True`` while still being able to keep the interface we want.
     # In particular, we might want to inspect the ``database`` object's targets
     # as they change via API requests.
-    targets: set[Target] = field(default_factory=set, hash=False)
+    targets: _TargetStoreField = field(
+        default=_TargetStoreField(),
+        hash=False,
+    )
     state: States = States.WORKING
 
     request_quota: int = 100000
@@ -74,11 +166,18 @@ class VuforiaDatabase:
     total_recos: int = 0
     target_quota: int = 1000
 
-    def to_dict(self) -> DatabaseDict:
+    def to_dict(self, *, include_images: bool = True) -> DatabaseDict:
         """
         Dump a target to a dictionary which can be loaded as JSON.
+
+        Args:
+            include_images: Whether to include the targets' images. The
+                images' digests are always included.
         """
-        targets = [target.to_dict() for target in self.targets]
+        targets = [
+            target.to_dict(include_image=include_images)
+            for target in self.targets
+        ]
         return {
             "database_name": self.database_name,
             "server_access_key": self.server_access_key,
@@ -92,16 +191,63 @@ class VuforiaDatabase:
     def get_target(self, target_id: str) -> Target:
         """
         Return a target from the database with the given ID.
+
+        Raises:
+            ValueError: There is no target with the given ID.
+        """
+        try:
+            return self.targets.get(target_id=target_id)
+        except KeyError as exc:
+            msg = f'There is no target with the ID "{target_id}".'
+            raise ValueError(msg) from exc
+
+    def summary(self) -> DatabaseSummary:
+        """
+        Count the targets in the database by status.
+
+        This looks at each target once, using the same time for each target.
         """
-        (target,) = (
-            target for target in self.targets if target.target_id == target_id
+        gmt = ZoneInfo("GMT")
+        now = datetime.datetime.now(tz=gmt)
+        active_images = 0
+        inactive_images = 0
+        failed_images = 0
+        processing_images = 0
+
+        for target in self.targets:
+            if target.delete_date:
+                continue
+
+            status = target.status_at(now=now)
+            if status == TargetStatuses.PROCESSING.value:
+                processing_images += 1
+            elif status == TargetStatuses.FAILED.value:
+                failed_images += 1
+            elif target.active_flag:
+                active_images += 1
+            else:
+                inactive_images += 1
+
+        return DatabaseSummary(
+            active_images=active_images,
+            inactive_images=inactive_images,
+            failed_images=failed_images,
+            processing_images=processing_images,
         )
-        return target
 
     @classmethod
-    def from_dict(cls, database_dict: DatabaseDict) -> VuforiaDatabase:
+    def from_dict(
+        cls,
+        database_dict: DatabaseDict,
+        get_image: Callable[[str], bytes] | None = None,
+    ) -> VuforiaDatabase:
         """
         Load a database from a dictionary.
+
+        Args:
+            database_dict: The dictionary to load.
+            get_image: A function which returns the image with a given digest.
+                This is used for targets whose images are not included.
         """
         return cls(
             database_name=database_dict["database_name"],
@@ -110,10 +256,15 @@ class VuforiaDatabase:
             client_access_key=database_dict["client_access_key"],
             client_secret_key=database_dict["client_secret_key"],
             state=States[database_dict["state_name"]],
-            targets={
-                Target.from_dict(target_dict=target_dict)
-                for target_dict in database_dict["targets"]
-            },
+            targets=TargetStore(
+                targets=[
+                    Target.from_dict(
+                        target_dict=target_dict,
+                        get_image=get_image,
+                    )
+                    for target_dict in database_dict["targets"]
+                ],
+            ),
         )
 
     @property
@@ -121,7 +272,7 @@ class VuforiaDatabase:
         """
         All targets which have not been deleted.
         """
-        return {target for target in self.targets if not target.delete_date}
+        return self.targets.not_deleted
 
     @property
     def active_targets(self) -> set[Target]:
@@ -130,9 +281,8 @@ class VuforiaDatabase:
         """
         return {
             target
-            for target in self.not_deleted_targets
+            for target in self.targets.active
             if target.status == TargetStatuses.SUCCESS.value
-            and target.active_flag
         }
 
     @property
@@ -142,9 +292,8 @@ class VuforiaDatabase:
         """
         return {
             target
-            for target in self.not_deleted_targets
+            for target in self.targets.inactive
             if target.status == TargetStatuses.SUCCESS.value
-            and not target.active_flag
         }
 
     @property
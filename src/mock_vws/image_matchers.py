@@ -1,14 +1,22 @@
 """Matchers for query and duplicate requests."""
 
 import io
-from typing import TYPE_CHECKING, Protocol, runtime_checkable
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Protocol, runtime_checkable
 
 import piq  # type: ignore[import-untyped]
+import torch
 from PIL import Image
 from torchvision.transforms import functional  # type: ignore[import-untyped]
 
-if TYPE_CHECKING:
-    import torch
+from mock_vws._analysis_cache import get_analysis_cache
+from mock_vws._digest_cache import CacheStats, DigestCache
+from mock_vws._image_digests import get_image_digest
+
+# Change this whenever the preprocessing for SSIM changes, so that tensors
+# stored in an analysis cache by older versions are not used.
+_SSIM_IMAGE_TENSOR_ALGORITHM = "ssim-image-tensor-v2"
 
 
 @runtime_checkable
@@ -32,6 +40,71 @@ class ImageMatcher(Protocol):
         ...  # pylint: disable=unnecessary-ellipsis
 
 
+@runtime_checkable
+class BatchImageMatcher(Protocol):
+    """
+    Protocol for a matcher which can compare one image with many images at
+    once.
+
+    Matchers can implement this as well as :class:`ImageMatcher` when
+    comparing many images together is faster than comparing them one by one.
+    """
+
+    def match_many(
+        self,
+        image_content: bytes,
+        candidate_image_contents: Sequence[bytes],
+        candidate_image_digests: Sequence[str] | None = None,
+    ) -> list[bool]:
+        """
+        Whether an image's content matches each of the given images' content.
+
+        Args:
+            image_content: One image's content.
+            candidate_image_contents: Other images' content.
+            candidate_image_digests: The digests of the other images, in the
+                same order, for example from ``Target.image_digest``.
+                Matchers can use these to look up cached work for the other
+                images without hashing them. If these are not given, they
+                are computed when needed.
+
+        Returns:
+            Whether each candidate image matches, in the order given.
+        """
+        # We disable a pylint warning here because the ellipsis is required
+        # for pyright to recognize this as a protocol.
+        ...  # pylint: disable=unnecessary-ellipsis
+
+
+@runtime_checkable
+class TargetImageCachingMatcher(Protocol):
+    """
+    Protocol for a matcher which caches work for target images.
+
+    Matchers can implement this as well as :class:`ImageMatcher` so that the
+    work for a new target's image can be done while the target is
+    processing, rather than when the image is first compared.
+    """
+
+    def cache_target_image(
+        self,
+        image_content: bytes,
+        image_digest: str,
+    ) -> None:
+        """
+        Do and cache the work for a target image which is needed to compare
+        it with other images.
+
+        Args:
+            image_content: A target image's content.
+            image_digest: The digest of the target image, for example from
+                ``Target.image_digest``.
+        """
+        # We disable a pylint warning here because the ellipsis is required
+        # for pyright to recognize this as a protocol.
+        ...  # pylint: disable=unnecessary-ellipsis
+
+
 class ExactMatcher:
     """A matcher which returns whether two images are exactly equal."""
 
@@ -50,9 +123,250 @@ class ExactMatcher:
         return bool(first_image_content == second_image_content)
 
 
+def _get_candidate_image_digests(
+    candidate_image_contents: Sequence[bytes],
+    candidate_image_digests: Sequence[str] | None,
+) -> Sequence[str]:
+    """
+    Get the digests of candidate images, computing them if they are not
+    given.
+    """
+    if candidate_image_digests is not None:
+        return candidate_image_digests
+    return [
+        get_image_digest(image_content=candidate_image_content)
+        for candidate_image_content in candidate_image_contents
+    ]
+
+
+def _get_ssim_image_tensor(image_content: bytes) -> torch.Tensor:
+    """
+    Get a tensor of an image which is ready to be compared using SSIM, once
+    it is converted with :func:`_to_ssim_input`.
+
+    The tensor keeps the image's pixel values as they are, for example as
+    8 bit integers, so that it uses a quarter of the memory of a tensor of
+    floats.
+
+    Args:
+        image_content: An image's content.
+
+    Returns:
+        A tensor with a batch dimension of an image resized to the size we
+        compare images at.
+    """
+    image_file = io.BytesIO(initial_bytes=image_content)
+    image = Image.open(fp=image_file)
+    # Images must be the same size, and they must be larger than the
+    # default SSIM window size of 11x11.
+    target_size = (256, 256)
+    image = image.resize(size=target_size)
+
+    # See https://github.com/pytorch/vision/pull/8251 for precise type.
+    image_tensor: torch.Tensor = functional.pil_to_tensor(pic=image)  # pyright: ignore[reportUnknownMemberType]
+    return image_tensor.unsqueeze(0)
+
+
+def _to_ssim_input(image_tensor: torch.Tensor) -> torch.Tensor:
+    """
+    Convert a tensor from :func:`_get_ssim_image_tensor` to floats, in the
+    same way as ``torchvision``'s ``to_tensor`` does.
+
+    8 bit values are scaled to be from 0 to 1.
+    """
+    float_tensor = image_tensor.to(dtype=torch.get_default_dtype())
+    if image_tensor.dtype == torch.uint8:
+        return float_tensor.div(255)
+    return float_tensor
+
+
+def _get_tensor_size(tensor: torch.Tensor) -> int:
+    """
+    Get the number of bytes which a tensor's data uses.
+    """
+    return tensor.element_size() * tensor.nelement()
+
+
+def _encode_tensor(tensor: torch.Tensor) -> bytes:
+    """
+    Convert a tensor to bytes to store.
+    """
+    buffer = io.BytesIO()
+    torch.save(obj=tensor, f=buffer)
+    return buffer.getvalue()
+
+
+def _decode_tensor(data: bytes) -> torch.Tensor:
+    """
+    Convert stored bytes to a tensor.
+    """
+    tensor: torch.Tensor = torch.load(
+        f=io.BytesIO(initial_bytes=data),
+        weights_only=True,
+    )
+    return tensor
+
+
+def _is_ssim_match(ssim_score: float) -> bool:
+    """
+    Whether a SSIM score is high enough for two images to match.
+
+    Args:
+        ssim_score: A SSIM score from -1 to 1.
+    """
+    # Normalize SSIM score from -1 to 1 scale to 0 to 10 scale.
+    # This maps -1 to 0 and 1 to 10.
+    normalized_score = (ssim_score + 1) * 5
+    minimum_acceptable_ssim_score = 7
+    return bool(normalized_score > minimum_acceptable_ssim_score)
+
+
+def _get_match(
+    first_image_tensor: torch.Tensor,
+    second_image_tensor: torch.Tensor,
+) -> bool:
+    """
+    Whether two preprocessed images match using SSIM.
+
+    Args:
+        first_image_tensor: An image from :func:`_get_ssim_image_tensor`.
+        second_image_tensor: Another image from
+            :func:`_get_ssim_image_tensor`.
+    """
+    # See https://github.com/photosynthesis-team/piq/pull/377
+    # for fixing the type hint in ``piq``.
+    ssim_value: torch.Tensor = piq.ssim(  # pyright: ignore[reportAssignmentType]
+        x=_to_ssim_input(image_tensor=first_image_tensor),
+        y=_to_ssim_input(image_tensor=second_image_tensor),
+        data_range=1.0,
+    )
+    return _is_ssim_match(ssim_score=ssim_value.item())
+
+
+def _get_batch_matches(
+    image_input: torch.Tensor,
+    candidate_tensors: Sequence[torch.Tensor],
+) -> list[bool]:
+    """
+    Whether each of a batch of preprocessed images matches an image using
+    SSIM.
+
+    Args:
+        image_input: An image converted with :func:`_to_ssim_input`.
+        candidate_tensors: Images from :func:`_get_ssim_image_tensor` with
+            the same shape as the image.
+
+    Returns:
+        Whether each candidate image matches, in the order given.
+    """
+    candidates_batch = torch.cat(
+        tensors=[
+            _to_ssim_input(image_tensor=candidate_tensor)
+            for candidate_tensor in candidate_tensors
+        ],
+    )
+    image_batch = image_input.expand(len(candidate_tensors), -1, -1, -1)
+    # See https://github.com/photosynthesis-team/piq/pull/377
+    # for fixing the type hint in ``piq``.
+    ssim_values: torch.Tensor = piq.ssim(  # pyright: ignore[reportAssignmentType]
+        x=candidates_batch,
+        y=image_batch,
+        data_range=1.0,
+        reduction="none",
+    )
+    return [
+        _is_ssim_match(ssim_score=ssim_score)
+        for ssim_score in ssim_values.tolist()
+    ]
+
+
 class StructuralSimilarityMatcher:
     """A matcher which returns whether two images are similar using SSIM."""
 
+    def __init__(
+        self,
+        image_cache_max_bytes: int = 2 * 1024 * 1024 * 1024,
+        analysis_cache_directory: Path | None = None,
+        batch_size: int = 64,
+    ) -> None:
+        """
+        Args:
+            image_cache_max_bytes: The maximum number of bytes to use for
+                keeping preprocessed target images in memory. Stored target
+                images are compared on every query, so caching them means
+                that only new images are decoded and resized. The default
+                fits about 10,000 color images. Query images are not cached.
+            analysis_cache_directory: A directory to keep preprocessed target
+                images in, so that they are not preprocessed again in later
+                runs. If this is not given, preprocessed images are only
+                cached in memory.
+            batch_size: The maximum number of images to compare in one batch
+                in ``match_many``. Larger batches are faster, but each image
+                in a batch uses about 800 KB of memory while it is compared.
+        """
+        self._analysis_cache_directory = analysis_cache_directory
+        self._batch_size = batch_size
+        self._image_tensor_cache: DigestCache[torch.Tensor] = DigestCache(
+            max_bytes=image_cache_max_bytes,
+            get_size=_get_tensor_size,
+        )
+
+    @property
+    def image_cache_stats(self) -> CacheStats:
+        """
+        Hit, miss and eviction counts for the cache of preprocessed target
+        images, and its size.
+        """
+        return self._image_tensor_cache.stats
+
+    def _get_target_image_tensor(
+        self,
+        image_content: bytes,
+        image_digest: str,
+    ) -> torch.Tensor:
+        """
+        Get a preprocessed target image, using the cache.
+        """
+        return self._image_tensor_cache.get(
+            digest=image_digest,
+            image_content=image_content,
+            compute=self._load_image_tensor,
+        )
+
+    def cache_target_image(
+        self,
+        image_content: bytes,
+        image_digest: str,
+    ) -> None:
+        """
+        Preprocess a target image and cache it.
+
+        Args:
+            image_content: A target image's content.
+            image_digest: The digest of the target image.
+        """
+        self._get_target_image_tensor(
+            image_content=image_content,
+            image_digest=image_digest,
+        )
+
+    def _load_image_tensor(self, image_content: bytes) -> torch.Tensor:
+        """
+        Get a preprocessed image from the analysis cache, or preprocess it.
+        """
+        if self._analysis_cache_directory is None:
+            return _get_ssim_image_tensor(image_content=image_content)
+        analysis_cache = get_analysis_cache(
+            directory=self._analysis_cache_directory,
+        )
+        return analysis_cache.get(
+            algorithm=_SSIM_IMAGE_TENSOR_ALGORITHM,
+            image_content=image_content,
+            compute=_get_ssim_image_tensor,
+            encode=_encode_tensor,
+            decode=_decode_tensor,
+        )
+
     def __call__(
         self,
         first_image_content: bytes,
@@ -61,38 +375,312 @@ class StructuralSimilarityMatcher:
         """
         Whether one image's content matches another's using a SSIM.
 
+        Only the first image is cached, as that is the target image when
+        matching targets.
+
+        Args:
+            first_image_content: One image's content.
+            second_image_content: Another image's content.
+        """
+        first_image_tensor = self._get_target_image_tensor(
+            image_content=first_image_content,
+            image_digest=get_image_digest(image_content=first_image_content),
+        )
+        second_image_tensor = _get_ssim_image_tensor(
+            image_content=second_image_content,
+        )
+        return _get_match(
+            first_image_tensor=first_image_tensor,
+            second_image_tensor=second_image_tensor,
+        )
+
+    def match_many(
+        self,
+        image_content: bytes,
+        candidate_image_contents: Sequence[bytes],
+        candidate_image_digests: Sequence[str] | None = None,
+    ) -> list[bool]:
+        """
+        Whether an image's content matches each of the given images' content
+        using SSIM.
+
+        Candidate images with the same number of color channels as the given
+        image are compared in batches of up to ``batch_size`` images.
+        The given image is not cached, as it is usually a query image.
+
+        Args:
+            image_content: One image's content.
+            candidate_image_contents: Other images' content.
+            candidate_image_digests: The digests of the other images, in the
+                same order. These are used to look up cached preprocessed
+                images. If these are not given, they are computed.
+
+        Returns:
+            Whether each candidate image matches, in the order given.
+        """
+        image_tensor = _get_ssim_image_tensor(image_content=image_content)
+        image_input = _to_ssim_input(image_tensor=image_tensor)
+        matches = [False] * len(candidate_image_contents)
+        batch_indexes: list[int] = []
+        batch_tensors: list[torch.Tensor] = []
+        for index, (candidate_image_content, candidate_image_digest) in (
+            enumerate(
+                zip(
+                    candidate_image_contents,
+                    _get_candidate_image_digests(
+                        candidate_image_contents=candidate_image_contents,
+                        candidate_image_digests=candidate_image_digests,
+                    ),
+                    strict=True,
+                ),
+            )
+        ):
+            candidate_tensor = self._get_target_image_tensor(
+                image_content=candidate_image_content,
+                image_digest=candidate_image_digest,
+            )
+            if candidate_tensor.shape != image_input.shape:
+                # Leave images which cannot be stacked with the given image
+                # to be compared in the same way as single comparisons.
+                matches[index] = _get_match(
+                    first_image_tensor=candidate_tensor,
+                    second_image_tensor=image_tensor,
+                )
+                continue
+
+            batch_indexes.append(index)
+            batch_tensors.append(candidate_tensor)
+
+        # Only one batch at a time is converted to floats and compared, so
+        # that comparing many images does not use a lot of memory at once.
+        for start in range(0, len(batch_tensors), self._batch_size):
+            batch_matches = _get_batch_matches(
+                image_input=image_input,
+                candidate_tensors=batch_tensors[
+                    start : start + self._batch_size
+                ],
+            )
+            for index, is_match in zip(
+                batch_indexes[start : start + self._batch_size],
+                batch_matches,
+                strict=True,
+            ):
+                matches[index] = is_match
+        return matches
+
+
+def _get_difference_hash(image_content: bytes) -> int:
+    """
+    Get a 64 bit difference hash of an image.
+
+    Similar images have hashes which differ in few bits.
+
+    Args:
+        image_content: An image's content.
+    """
+    image_file = io.BytesIO(initial_bytes=image_content)
+    image = Image.open(fp=image_file)
+    hash_size = 8
+    # Each row has one more pixel than the hash size so that each bit can be
+    # the comparison of two neighboring pixels.
+    image = image.convert(mode="L").resize(size=(hash_size + 1, hash_size))
+    pixels = image.tobytes()
+    difference_hash = 0
+    for row in range(hash_size):
+        for column in range(hash_size):
+            left = pixels[row * (hash_size + 1) + column]
+            right = pixels[row * (hash_size + 1) + column + 1]
+            difference_hash = (difference_hash << 1) | int(left > right)
+    return difference_hash
+
+
+class PerceptualHashPrefilterMatcher:
+    """
+    A matcher which only uses another matcher for images with similar
+    perceptual hashes.
+
+    Comparing perceptual hashes is much faster than, for example, comparing
+    images using SSIM.
+    This means that most images which do not match can be ruled out quickly.
+
+    This is lossy.
+    Images which the wrapped matcher would match can have very different
+    hashes, for example when one is cropped, rotated or much brighter than
+    the other, and these images are ruled out.
+    This is therefore not used unless it is chosen, and it should only be
+    chosen when missing some matches is acceptable.
+    """
+
+    def __init__(
+        self,
+        matcher: ImageMatcher,
+        max_hash_distance: int = 20,
+        hash_cache_max_bytes: int = 16 * 1024 * 1024,
+    ) -> None:
+        """
+        Args:
+            matcher: The matcher to use for images with similar hashes.
+            max_hash_distance: The maximum number of bits, out of 64, which
+                can differ between two images' hashes for the images to be
+                compared with ``matcher``. Lower values rule out more images,
+                but may rule out images which ``matcher`` would match.
+            hash_cache_max_bytes: The maximum number of bytes to use for
+                keeping target images' hashes in memory. Hashes are cached by
+                the digest of the image, so images are not kept in memory.
+                The default fits about 100,000 hashes. Query images' hashes
+                are not cached.
+        """
+        self._matcher = matcher
+        self._max_hash_distance = max_hash_distance
+        self._hash_cache: DigestCache[int] = DigestCache(
+            max_bytes=hash_cache_max_bytes,
+        )
+
+    @property
+    def hash_cache_stats(self) -> CacheStats:
+        """
+        Hit, miss and eviction counts for the cache of target images' hashes,
+        and its size.
+        """
+        return self._hash_cache.stats
+
+    def cache_target_image(
+        self,
+        image_content: bytes,
+        image_digest: str,
+    ) -> None:
+        """
+        Hash a target image and cache the hash, and cache work for the image
+        with the wrapped matcher if it can.
+
+        Args:
+            image_content: A target image's content.
+            image_digest: The digest of the target image.
+        """
+        self._hash_cache.get(
+            digest=image_digest,
+            image_content=image_content,
+            compute=_get_difference_hash,
+        )
+        if isinstance(self._matcher, TargetImageCachingMatcher):
+            self._matcher.cache_target_image(
+                image_content=image_content,
+                image_digest=image_digest,
+            )
+
+    def _hash_is_similar(
+        self,
+        target_image_content: bytes,
+        target_image_digest: str,
+        image_hash: int,
+    ) -> bool:
+        """
+        Whether a target image has a hash similar enough to the given hash for
+        the images to be compared with the wrapped matcher.
+        """
+        target_hash = self._hash_cache.get(
+            digest=target_image_digest,
+            image_content=target_image_content,
+            compute=_get_difference_hash,
+        )
+        distance = (target_hash ^ image_hash).bit_count()
+        return distance <= self._max_hash_distance
+
+    def __call__(
+        self,
+        first_image_content: bytes,
+        second_image_content: bytes,
+    ) -> bool:
+        """
+        Whether one image's content matches another's, using the wrapped
+        matcher if the images' hashes are similar.
+
+        Only the first image's hash is cached, as that is the target image
+        when matching targets.
+
         Args:
             first_image_content: One image's content.
             second_image_content: Another image's content.
         """
-        first_image_file = io.BytesIO(initial_bytes=first_image_content)
-        first_image = Image.open(fp=first_image_file)
-        second_image_file = io.BytesIO(initial_bytes=second_image_content)
-        second_image = Image.open(fp=second_image_file)
-        # Images must be the same size, and they must be larger than the
-        # default SSIM window size of 11x11.
-        target_size = (256, 256)
-        first_image = first_image.resize(size=target_size)
-        second_image = second_image.resize(size=target_size)
-
-        # See https://github.com/pytorch/vision/pull/8251 for precise type.
-        first_image_tensor = functional.to_tensor(pic=first_image)  # pyright: ignore[reportUnknownMemberType]
-        second_image_tensor = functional.to_tensor(pic=second_image)  # pyright: ignore[reportUnknownMemberType]
-
-        first_image_tensor_batch_dimension = first_image_tensor.unsqueeze(0)
-        second_image_tensor_batch_dimension = second_image_tensor.unsqueeze(0)
-
-        # See https://github.com/photosynthesis-team/piq/pull/377
-        # for fixing the type hint in ``piq``.
-        ssim_value: torch.Tensor = piq.ssim(  # pyright: ignore[reportAssignmentType]
-            x=first_image_tensor_batch_dimension,
-            y=second_image_tensor_batch_dimension,
-            data_range=1.0,
+        second_image_hash = _get_difference_hash(
+            image_content=second_image_content,
+        )
+        return self._hash_is_similar(
+            target_image_content=first_image_content,
+            target_image_digest=get_image_digest(
+                image_content=first_image_content,
+            ),
+            image_hash=second_image_hash,
+        ) and self._matcher(
+            first_image_content=first_image_content,
+            second_image_content=second_image_content,
+        )
+
+    def match_many(
+        self,
+        image_content: bytes,
+        candidate_image_contents: Sequence[bytes],
+        candidate_image_digests: Sequence[str] | None = None,
+    ) -> list[bool]:
+        """
+        Whether an image's content matches each of the given images' content.
+
+        Only candidates with hashes similar to the given image's hash are
+        given to the wrapped matcher.
+
+        Args:
+            image_content: One image's content.
+            candidate_image_contents: Other images' content.
+            candidate_image_digests: The digests of the other images, in the
+                same order. These are used to look up cached hashes, and
+                they are given to the wrapped matcher. If these are not
+                given, they are computed.
+
+        Returns:
+            Whether each candidate image matches, in the order given.
+        """
+        digests = _get_candidate_image_digests(
+            candidate_image_contents=candidate_image_contents,
+            candidate_image_digests=candidate_image_digests,
         )
-        ssim_score = ssim_value.item()
+        image_hash = _get_difference_hash(image_content=image_content)
+        matches = [False] * len(candidate_image_contents)
+        shortlist_indexes = [
+            index
+            for index, (candidate_image_content, candidate_image_digest) in (
+                enumerate(
+                    zip(candidate_image_contents, digests, strict=True),
+                )
+            )
+            if self._hash_is_similar(
+                target_image_content=candidate_image_content,
+                target_image_digest=candidate_image_digest,
+                image_hash=image_hash,
+            )
+        ]
+        shortlist = [candidate_image_contents[i] for i in shortlist_indexes]
+
+        if isinstance(self._matcher, BatchImageMatcher):
+            shortlist_matches = self._matcher.match_many(
+                image_content=image_content,
+                candidate_image_contents=shortlist,
+                candidate_image_digests=[
+                    digests[i] for i in shortlist_indexes
+                ],
+            )
+        else:
+            shortlist_matches = [
+                self._matcher(
+                    first_image_content=candidate_image_content,
+                    second_image_content=image_content,
+                )
+                for candidate_image_content in shortlist
+            ]
 
-        # Normalize SSIM score from -1 to 1 scale to 0 to 10 scale.
-        # This maps -1 to 0 and 1 to 10.
-        normalized_score = (ssim_score + 1) * 5
-        minimum_acceptable_ssim_score = 7
-        return bool(normalized_score > minimum_acceptable_ssim_score)
+        for index, is_match in zip(
+            shortlist_indexes,
+            shortlist_matches,
+            strict=True,
+        ):
+            matches[index] = is_match
+        return matches
@@ -5,30 +5,40 @@ from __future__ import annotations
 
 import base64
 import datetime
+import functools
 import io
 import statistics
 import uuid
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, TypedDict
+from typing import TYPE_CHECKING, NotRequired, TypedDict
 from zoneinfo import ZoneInfo
 
 from PIL import Image, ImageStat
 
+from mock_vws._analysis_cache import get_analysis_cache
 from mock_vws._constants import TargetStatuses
+from mock_vws._digest_cache import DigestCache
+from mock_vws._image_digests import get_image_digest
 from mock_vws.target_raters import HardcodedTargetTrackingRater
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
     from mock_vws.target_raters import TargetTrackingRater
 
 
 class TargetDict(TypedDict):
     """
     A dictionary type which represents a target.
+
+    The image may be left out, in which case it is identified by its digest.
     """
 
     name: str
     width: float
-    image_base64: str
+    image_base64: NotRequired[str]
+    image_digest: str
     active_flag: bool
     processing_time_seconds: int | float
     application_metadata: str | None
@@ -46,6 +56,45 @@ def _random_hex() -> str:
     return uuid.uuid4().hex
 
 
+def _get_post_processing_status(image_content: bytes) -> TargetStatuses:
+    """
+    Get what the status of a target with the given image will be when
+    processing is finished.
+
+    The status depends on the standard deviation of the color bands.
+    How VWS determines this is unknown, but it relates to how suitable the
+    target is for detection.
+
+    Args:
+        image_content: A target's image's content.
+    """
+    image_file = io.BytesIO(initial_bytes=image_content)
+    image = Image.open(fp=image_file)
+    image_stat = ImageStat.Stat(image_or_list=image)
+
+    average_std_dev = statistics.mean(image_stat.stddev)
+
+    success_threshold = 5
+
+    if average_std_dev > success_threshold:
+        return TargetStatuses.SUCCESS
+
+    return TargetStatuses.FAILED
+
+
+# Change this whenever the way the post-processing status is computed
+# changes, so that statuses stored in an analysis cache by older versions are
+# not used.
+_POST_PROCESSING_STATUS_ALGORITHM = "post-processing-status-v1"
+
+# Statuses are shared by targets with the same image, for example when a
+# target is updated without changing its image, as decoding an image is slow.
+# They are keyed by the image's digest, so images are not kept in memory.
+_POST_PROCESSING_STATUS_CACHE: DigestCache[TargetStatuses] = DigestCache(
+    max_bytes=1024 * 1024,
+)
+
+
 def _time_now() -> datetime.datetime:
     """
     Return the current time in the GMT time zone.
@@ -76,29 +125,43 @@ class Target:
     target_id: str = field(default_factory=_random_hex)
     total_recos: int = 0
     upload_date: datetime.datetime = field(default_factory=_time_now)
+    analysis_cache_directory: Path | None = field(default=None, compare=False)
 
-    @property
+    @functools.cached_property
     def _post_processing_status(self) -> TargetStatuses:
         """
         Return the status of the target, or what it will be when processing is
         finished.
 
-        The status depends on the standard deviation of the color bands.
-        How VWS determines this is unknown, but it relates to how suitable the
-        target is for detection.
+        This is computed the first time it is needed, which is when processing
+        is finished, and then stored on the target.
         """
-        image_file = io.BytesIO(self.image_value)
-        image = Image.open(image_file)
-        image_stat = ImageStat.Stat(image)
-
-        average_std_dev = statistics.mean(image_stat.stddev)
-
-        success_threshold = 5
-
-        if average_std_dev > success_threshold:
-            return TargetStatuses.SUCCESS
+        return _POST_PROCESSING_STATUS_CACHE.get(
+            digest=self.image_digest,
+            image_content=self.image_value,
+            compute=self._load_post_processing_status,
+        )
 
-        return TargetStatuses.FAILED
+    def _load_post_processing_status(
+        self,
+        image_content: bytes,
+    ) -> TargetStatuses:
+        """
+        Get the post-processing status of an image from the analysis cache,
+        or compute it.
+        """
+        if self.analysis_cache_directory is None:
+            return _get_post_processing_status(image_content=image_content)
+        analysis_cache = get_analysis_cache(
+            directory=self.analysis_cache_directory,
+        )
+        return analysis_cache.get(
+            algorithm=_POST_PROCESSING_STATUS_ALGORITHM,
+            image_content=image_content,
+            compute=_get_post_processing_status,
+            encode=lambda status: status.value.encode(),
+            decode=lambda data: TargetStatuses(data.decode()),
+        )
 
     @property
     def status(self) -> str:
@@ -112,12 +175,24 @@ class Target:
         How VWS determines this is unknown, but it relates to how suitable the
         target is for detection.
         """
+        timezone = self.upload_date.tzinfo
+        now = datetime.datetime.now(tz=timezone)
+        return self.status_at(now=now)
+
+    def status_at(self, now: datetime.datetime) -> str:
+        """
+        Return the status of the target at the given time.
+
+        This lets callers which look at many targets use one timestamp for
+        all of them.
+
+        Args:
+            now: The time to get the status at.
+        """
         processing_time = datetime.timedelta(
             seconds=self.processing_time_seconds,
         )
 
-        timezone = self.upload_date.tzinfo
-        now = datetime.datetime.now(tz=timezone)
         time_since_change = now - self.last_modified_date
 
         if time_since_change <= processing_time:
@@ -125,8 +200,28 @@ class Target:
 
         return str(self._post_processing_status.value)
 
-    @property
+    @functools.cached_property
+    def image_digest(self) -> str:
+        """
+        The digest of the target's image.
+
+        This is computed the first time it is needed and then stored on the
+        target, so that indexing and dumping targets does not hash the same
+        image again.
+        """
+        return get_image_digest(image_content=self.image_value)
+
+    @functools.cached_property
     def _post_processing_target_rating(self) -> int:
+        """
+        Return the tracking rating of the target recognition image.
+
+        This is computed the first time it is needed, which is when the rating
+        is first given, and then stored on the target.
+        Reading a target's rating, for example when a database summary is
+        requested or when query matches are filtered, then does not use the
+        target tracking rater again.
+        """
         return self.target_tracking_rater(image_content=self.image_value)
 
     @property
@@ -134,6 +229,18 @@ class Target:
         """
         Return the tracking rating of the target recognition image.
         """
+        return self._get_tracking_rating(rate=True)
+
+    def _get_tracking_rating(self, *, rate: bool) -> int:
+        """
+        Return the tracking rating of the target recognition image, or -1 if
+        it is not available yet.
+
+        Args:
+            rate: Whether to compute the rating if it is available and has
+                not been computed yet. If this is ``False``, -1 is given for
+                such a rating.
+        """
         pre_rating_time = datetime.timedelta(
             # That this is half of the total processing time is unrealistic.
             # In VWS it is not a constant percentage.
@@ -149,19 +256,86 @@ class Target:
         if time_since_upload <= pre_rating_time:
             return -1
 
+        if not rate and "_post_processing_target_rating" not in self.__dict__:
+            return -1
+
         return self._post_processing_target_rating
 
+    @property
+    def post_processing_tracking_rating(self) -> int:
+        """
+        Return the tracking rating which the target will have when processing
+        is finished, computing it if it has not been computed yet.
+        """
+        return self._post_processing_target_rating
+
+    def process(self) -> None:
+        """
+        Compute the status and tracking rating which the target will have
+        when processing is finished.
+
+        These are stored on the target, so reading them later is fast.
+        This is slow, so it is done in the background while the target is
+        processing.
+        """
+        _ = self._post_processing_status
+        _ = self._post_processing_target_rating
+
+    def reuse_analysis(self, previous: Target) -> None:
+        """
+        Reuse what has been computed for a previous version of this target,
+        for example one which this was made from with ``dataclasses.replace``.
+
+        The image digest, status and tracking rating are reused only if the
+        image and the target tracking rater have not changed, as they depend
+        only on these.
+
+        Args:
+            previous: The previous version of this target.
+        """
+        if (
+            self.target_tracking_rater is not previous.target_tracking_rater
+            or self.image_value != previous.image_value
+        ):
+            return
+
+        for name in (
+            "image_digest",
+            "_post_processing_status",
+            "_post_processing_target_rating",
+        ):
+            if name in previous.__dict__:
+                self.__dict__[name] = previous.__dict__[name]
+
     @classmethod
-    def from_dict(cls, target_dict: TargetDict) -> Target:
+    def from_dict(
+        cls,
+        target_dict: TargetDict,
+        get_image: Callable[[str], bytes] | None = None,
+    ) -> Target:
         """
         Load a target from a dictionary.
+
+        Args:
+            target_dict: The dictionary to load.
+            get_image: A function which returns the image with a given digest.
+                This is used if the dictionary does not include the image.
+
+        Raises:
+            ValueError: The dictionary does not include the image and no
+                function to get it is given.
         """
         timezone = ZoneInfo("GMT")
         name = target_dict["name"]
         active_flag = target_dict["active_flag"]
         width = target_dict["width"]
-        image_base64 = target_dict["image_base64"]
-        image_value = base64.b64decode(image_base64)
+        if "image_base64" in target_dict:
+            image_value = base64.b64decode(target_dict["image_base64"])
+        elif get_image is not None:
+            image_value = get_image(target_dict["image_digest"])
+        else:
+            message = "The target dictionary does not include the image."
+            raise ValueError(message)
         processing_time_seconds = target_dict["processing_time_seconds"]
         application_metadata = target_dict["application_metadata"]
         target_id = target_dict["target_id"]
@@ -196,20 +370,30 @@ class Target:
             target_tracking_rater=target_tracking_rater,
         )
 
-    def to_dict(self) -> TargetDict:
+    def to_dict(
+        self,
+        *,
+        include_image: bool = True,
+        rate: bool = True,
+    ) -> TargetDict:
         """
         Dump a target to a dictionary which can be loaded as JSON.
+
+        Args:
+            include_image: Whether to include the image. The image's digest
+                is always included.
+            rate: Whether to compute the tracking rating if it is available
+                and has not been computed yet, which can be slow. If this is
+                ``False``, such a rating is given as -1.
         """
         delete_date: str | None = None
         if self.delete_date:
             delete_date = datetime.datetime.isoformat(self.delete_date)
 
-        image_base64 = base64.encodebytes(self.image_value).decode()
-
-        return {
+        target_dict: TargetDict = {
             "name": self.name,
             "width": self.width,
-            "image_base64": image_base64,
+            "image_digest": self.image_digest,
             "active_flag": self.active_flag,
             "processing_time_seconds": self.processing_time_seconds,
             "application_metadata": self.application_metadata,
@@ -217,5 +401,9 @@ class Target:
             "last_modified_date": self.last_modified_date.isoformat(),
             "delete_date_optional": delete_date,
             "upload_date": self.upload_date.isoformat(),
-            "tracking_rating": self.tracking_rating,
+            "tracking_rating": self._get_tracking_rating(rate=rate),
         }
+        if include_image:
+            image_base64 = base64.encodebytes(self.image_value).decode()
+            target_dict["image_base64"] = image_base64
+        return target_dict
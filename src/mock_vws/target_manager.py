@@ -3,22 +3,39 @@ A fake implementation of a Vuforia target manager.
 """
 from __future__ import annotations
 
+import threading
+from types import MappingProxyType
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
+    from collections.abc import Mapping
+
     from mock_vws.database import VuforiaDatabase
 
 
 class TargetManager:
     """
     A target manager as per https://developer.vuforia.com/target-manager.
+
+    The target manager is safe to use from many threads.
+    Adding or removing a database replaces the set of databases and the
+    indexes of databases by access key, so readers do not wait for writers.
     """
 
     def __init__(self) -> None:
         """
         Create a target manager with no databases.
         """
-        self._databases: set[VuforiaDatabase] = set()
+        self._write_lock = threading.Lock()
+        self._databases: frozenset[VuforiaDatabase] = frozenset()
+        self._databases_by_server_access_key: Mapping[
+            str,
+            VuforiaDatabase,
+        ] = MappingProxyType({})
+        self._databases_by_client_access_key: Mapping[
+            str,
+            VuforiaDatabase,
+        ] = MappingProxyType({})
 
     def remove_database(self, database: VuforiaDatabase) -> None:
         """
@@ -30,7 +47,11 @@ class TargetManager:
         Raises:
             KeyError: The database is not in the target manager.
         """
-        self._databases.remove(database)
+        with self._write_lock:
+            if database not in self._databases:
+                raise KeyError(database)
+            self._databases -= {database}
+            self._update_indexes()
 
     def add_database(self, database: VuforiaDatabase) -> None:
         """
@@ -39,6 +60,38 @@ class TargetManager:
         Args:
             database: The database to add.
 
+        Raises:
+            ValueError: One of the given database keys matches a key for an
+                existing database.
+        """
+        with self._write_lock:
+            self._check_unique(database=database)
+            self._databases |= {database}
+            self._update_indexes()
+
+    def _update_indexes(self) -> None:
+        """
+        Replace the indexes of databases by access key with ones for the
+        current databases.
+        """
+        self._databases_by_server_access_key = MappingProxyType(
+            {
+                database.server_access_key: database
+                for database in self._databases
+            },
+        )
+        self._databases_by_client_access_key = MappingProxyType(
+            {
+                database.client_access_key: database
+                for database in self._databases
+            },
+        )
+
+    def _check_unique(self, database: VuforiaDatabase) -> None:
+        """
+        Check that the given database's keys do not match an existing
+        database's keys.
+
         Raises:
             ValueError: One of the given database keys matches a key for an
                 existing database.
@@ -47,7 +100,7 @@ class TargetManager:
             "All {key_name}s must be unique. "
             'There is already a database with the {key_name} "{value}".'
         )
-        for existing_db in self.databases:
+        for existing_db in self._databases:
             for existing, new, key_name in (
                 (
                     existing_db.server_access_key,
@@ -79,11 +132,45 @@ class TargetManager:
                     message = message_fmt.format(key_name=key_name, value=new)
                     raise ValueError(message)
 
-        self._databases.add(database)
-
     @property
     def databases(self) -> set[VuforiaDatabase]:
         """
-        All cloud databases.
+        All cloud databases, as they are when this is called.
+        """
+        return set(self._databases)
+
+    def get_database_by_server_access_key(
+        self,
+        server_access_key: str,
+    ) -> VuforiaDatabase:
+        """
+        Get the cloud database with the given server access key.
+
+        Args:
+            server_access_key: The server access key of the database.
+
+        Returns:
+            The database with the given server access key.
+
+        Raises:
+            KeyError: No database has the given server access key.
+        """
+        return self._databases_by_server_access_key[server_access_key]
+
+    def get_database_by_client_access_key(
+        self,
+        client_access_key: str,
+    ) -> VuforiaDatabase:
+        """
+        Get the cloud database with the given client access key.
+
+        Args:
+            client_access_key: The client access key of the database.
+
+        Returns:
+            The database with the given client access key.
+
+        Raises:
+            KeyError: No database has the given client access key.
         """
-        return self._databases
+        return self._databases_by_client_access_key[client_access_key]
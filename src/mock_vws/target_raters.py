@@ -1,17 +1,24 @@
 """Raters for target quality."""
 
-import functools
 import io
 import math
 import random
+from pathlib import Path
 from typing import Protocol, runtime_checkable
 
 import piq  # type: ignore[import-untyped]
 from PIL import Image
 from torchvision.transforms import functional  # type: ignore[import-untyped]
 
+from mock_vws._analysis_cache import get_analysis_cache
+from mock_vws._digest_cache import CacheStats, DigestCache
+from mock_vws._image_digests import get_image_digest
+
+# Change this whenever BRISQUE ratings change, so that ratings stored in an
+# analysis cache by older versions are not used.
+_BRISQUE_ALGORITHM = "brisque-rating-v1"
+
 
-@functools.cache
 def _get_brisque_target_tracking_rating(image_content: bytes) -> int:
     """
     Get a target tracking rating based on a BRISQUE score.
@@ -89,6 +96,30 @@ class HardcodedTargetTrackingRater:
 class BrisqueTargetTrackingRater:
     """A rater which returns a rating based on a BRISQUE score."""
 
+    def __init__(
+        self,
+        cache_max_bytes: int = 1024 * 1024,
+        analysis_cache_directory: Path | None = None,
+    ) -> None:
+        """
+        Args:
+            cache_max_bytes: The maximum number of bytes to use for caching
+                ratings. Ratings are cached by the digest of the image, so
+                images are not kept in memory.
+            analysis_cache_directory: A directory to keep ratings in, so that
+                they are not computed again in later runs. If this is not
+                given, ratings are only cached in memory.
+        """
+        self._cache: DigestCache[int] = DigestCache(max_bytes=cache_max_bytes)
+        self._analysis_cache_directory = analysis_cache_directory
+
+    @property
+    def cache_stats(self) -> CacheStats:
+        """
+        Hit, miss and eviction counts for the cache of ratings, and its size.
+        """
+        return self._cache.stats
+
     def __call__(self, image_content: bytes) -> int:
         """
         A rating based on a BRISQUE score.
@@ -100,4 +131,29 @@ class BrisqueTargetTrackingRater:
         Args:
             image_content: A target's image's content.
         """
-        return _get_brisque_target_tracking_rating(image_content=image_content)
+        # A rater is given only an image, so the image is hashed here.
+        # Targets store their ratings, so each image is rated about once.
+        return self._cache.get(
+            digest=get_image_digest(image_content=image_content),
+            image_content=image_content,
+            compute=self._get_rating,
+        )
+
+    def _get_rating(self, image_content: bytes) -> int:
+        """
+        Get a rating from the analysis cache, or compute it.
+        """
+        if self._analysis_cache_directory is None:
+            return _get_brisque_target_tracking_rating(
+                image_content=image_content,
+            )
+        analysis_cache = get_analysis_cache(
+            directory=self._analysis_cache_directory,
+        )
+        return analysis_cache.get(
+            algorithm=_BRISQUE_ALGORITHM,
+            image_content=image_content,
+            compute=_get_brisque_target_tracking_rating,
+            encode=lambda rating: str(rating).encode(),
+            decode=int,
+        )
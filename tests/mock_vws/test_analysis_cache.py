@@ -0,0 +1,95 @@
+"""
+Tests for the persistent cache of results computed from images.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+from mock_vws._analysis_cache import AnalysisCache
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def _get_cached_result(
+    analysis_cache: AnalysisCache,
+    image_content: bytes,
+    result: bytes,
+) -> bytes:
+    """
+    Get a result from an analysis cache, computing it as the given result if
+    it is not stored.
+    """
+    return analysis_cache.get(
+        algorithm="example-v1",
+        image_content=image_content,
+        compute=lambda _: result,
+        encode=lambda stored_result: stored_result,
+        decode=lambda data: data,
+    )
+
+
+class TestAnalysisCache:
+    """
+    Tests for the analysis cache.
+    """
+
+    @staticmethod
+    def test_read_back(tmp_path: Path) -> None:
+        """
+        Results are stored, so that a cache which uses the same directory, for
+        example in a later run, does not compute them again.
+        """
+        result = b"result"
+        _get_cached_result(
+            analysis_cache=AnalysisCache(directory=tmp_path),
+            image_content=b"image",
+            result=result,
+        )
+
+        new_analysis_cache = AnalysisCache(directory=tmp_path)
+        cached_result = new_analysis_cache.get(
+            algorithm="example-v1",
+            image_content=b"image",
+            compute=lambda _: pytest.fail(reason="The result was computed."),
+            encode=lambda stored_result: stored_result,
+            decode=lambda data: data,
+        )
+        assert cached_result == result
+
+    @staticmethod
+    def test_max_bytes(tmp_path: Path) -> None:
+        """
+        When the stored results are larger than the maximum size, the results
+        which were stored first are removed.
+        """
+        result_size_bytes = 10
+        analysis_cache = AnalysisCache(
+            directory=tmp_path,
+            max_bytes=result_size_bytes * 2,
+        )
+        image_contents = [b"first", b"second", b"third"]
+        for index, image_content in enumerate(iterable=image_contents):
+            _get_cached_result(
+                analysis_cache=analysis_cache,
+                image_content=image_content,
+                result=bytes([index]) * result_size_bytes,
+            )
+
+        new_result = b"new"
+        results = [
+            _get_cached_result(
+                analysis_cache=analysis_cache,
+                image_content=image_content,
+                result=new_result,
+            )
+            for image_content in reversed(image_contents)
+        ]
+        # The two results stored last are kept, and the first is computed
+        # again.
+        assert results == [
+            bytes([2]) * result_size_bytes,
+            bytes([1]) * result_size_bytes,
+            new_result,
+        ]
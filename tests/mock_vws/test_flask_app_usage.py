@@ -3,6 +3,8 @@ Tests for the usage of the mock Flask application.
 """
 from __future__ import annotations
 
+import dataclasses
+import datetime
 import io
 import uuid
 from http import HTTPStatus
@@ -10,19 +12,38 @@ from typing import TYPE_CHECKING
 
 import pytest
 import requests
+from mock_vws._flask_server import serve
+from mock_vws._flask_server._change_log import ChangeLog
+from mock_vws._flask_server._databases import get_databases
+from mock_vws._flask_server._replica import DatabaseReplica
+from mock_vws._flask_server._storage import SQLiteStorageBackend
+from mock_vws._flask_server._target_etags import get_target_etag
+from mock_vws._flask_server._target_manager_client import TargetManagerClient
+from mock_vws._flask_server.all_in_one import ALL_IN_ONE_FLASK_APP
 from mock_vws._flask_server.target_manager import TARGET_MANAGER_FLASK_APP
-from mock_vws._flask_server.vwq import CLOUDRECO_FLASK_APP
+from mock_vws._flask_server.vwq import (
+    CLOUDRECO_FLASK_APP,
+    VWQSettings,
+    create_app,
+)
 from mock_vws._flask_server.vws import VWS_FLASK_APP
 from mock_vws.database import VuforiaDatabase
+from mock_vws.target_raters import HardcodedTargetTrackingRater
 from PIL import Image
 from requests_mock_flask import add_flask_app_to_mock
 from vws import VWS, CloudRecoService
 
 from tests.mock_vws.utils.usage_test_helpers import (
+    make_target,
     processing_time_seconds,
 )
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from flask import Flask
+    from mock_vws._flask_server._server_settings import ServerSettings
     from requests_mock import Mocker
 
 _EXAMPLE_URL_FOR_TARGET_MANAGER = "http://" + uuid.uuid4().hex + ".com"
@@ -238,6 +259,568 @@ class TestDeleteDatabase:
         assert response.status_code == HTTPStatus.NOT_FOUND
 
 
+class TestGetDatabases:
+    """
+    Tests for getting databases from the mock.
+    """
+
+    @staticmethod
+    def test_not_modified(high_quality_image: io.BytesIO) -> None:
+        """
+        Databases are not returned again if they have not changed since the
+        response with the given entity tag.
+        """
+        database = VuforiaDatabase()
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + "/databases"
+        requests.post(url=databases_url, json=database.to_dict(), timeout=30)
+        params = {"server_access_key": database.server_access_key}
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        target_id = vws_client.add_target(
+            name="x",
+            width=1,
+            image=high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+        # Responses with pending tracking ratings have no entity tag.
+        vws_client.wait_for_target_processed(target_id=target_id)
+
+        response = requests.get(url=databases_url, params=params, timeout=30)
+        assert response.status_code == HTTPStatus.OK
+        etag = response.headers["ETag"]
+
+        response = requests.get(
+            url=databases_url,
+            params=params,
+            headers={"If-None-Match": etag},
+            timeout=30,
+        )
+        assert response.status_code == HTTPStatus.NOT_MODIFIED
+        assert response.headers["ETag"] == etag
+        assert not response.content
+
+        vws_client.update_target(target_id=target_id, name="y")
+        vws_client.wait_for_target_processed(target_id=target_id)
+
+        response = requests.get(
+            url=databases_url,
+            params=params,
+            headers={"If-None-Match": etag},
+            timeout=30,
+        )
+        assert response.status_code == HTTPStatus.OK
+        new_etag = response.headers["ETag"]
+        assert new_etag != etag
+        (database_dict,) = response.json()
+        (target_dict,) = database_dict["targets"]
+        assert target_dict["name"] == "y"
+
+    @staticmethod
+    def test_unknown_access_key_not_cached(requests_mock: Mocker) -> None:
+        """
+        Databases are not kept for access keys which match no database, so
+        that requests with unknown keys do not fill the cache.
+        """
+        client = TargetManagerClient(base_url=_EXAMPLE_URL_FOR_TARGET_MANAGER)
+        access_key = uuid.uuid4().hex
+        for _ in range(2):
+            databases = get_databases(
+                target_manager_client=client,
+                access_key_name="server_access_key",
+                access_key=access_key,
+            )
+            assert not databases
+
+        # If the empty result had been kept, the second request would
+        # revalidate it.
+        last_request = requests_mock.request_history[-1]
+        assert "If-None-Match" not in last_request.headers
+
+    @staticmethod
+    def test_images_not_downloaded_again(
+        high_quality_image: io.BytesIO,
+        requests_mock: Mocker,
+    ) -> None:
+        """
+        When databases are loaded again after a change, images which are in
+        the previously loaded databases are not downloaded again.
+        """
+        database = VuforiaDatabase()
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + "/databases"
+        requests.post(url=databases_url, json=database.to_dict(), timeout=30)
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        client = TargetManagerClient(base_url=_EXAMPLE_URL_FOR_TARGET_MANAGER)
+
+        def count_blob_requests() -> int:
+            """
+            Count the requests made to get images from the target manager.
+            """
+            return sum(
+                "/blobs/" in request.path
+                for request in requests_mock.request_history
+            )
+
+        # Both targets have the same image.
+        names = ("a", "b")
+        for name in names:
+            vws_client.add_target(
+                name=name,
+                width=1,
+                image=high_quality_image,
+                active_flag=True,
+                application_metadata=None,
+            )
+            blob_requests_before_load = count_blob_requests()
+            (loaded_database,) = get_databases(
+                target_manager_client=client,
+                access_key_name="server_access_key",
+                access_key=database.server_access_key,
+            )
+
+        assert len(loaded_database.targets) == len(names)
+        assert count_blob_requests() == blob_requests_before_load
+
+
+class TestBlobs:
+    """
+    Tests for getting images by digest.
+    """
+
+    @staticmethod
+    def test_get_blob(high_quality_image: io.BytesIO) -> None:
+        """
+        Databases can be returned without images, and each image can be
+        fetched by its digest.
+        """
+        database = VuforiaDatabase()
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + "/databases"
+        requests.post(url=databases_url, json=database.to_dict(), timeout=30)
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        vws_client.add_target(
+            name="x",
+            width=1,
+            image=high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+
+        response = requests.get(
+            url=databases_url,
+            params={
+                "server_access_key": database.server_access_key,
+                "include_images": "false",
+            },
+            timeout=30,
+        )
+        (database_dict,) = response.json()
+        (target_dict,) = database_dict["targets"]
+        assert "image_base64" not in target_dict
+
+        blob_url = (
+            _EXAMPLE_URL_FOR_TARGET_MANAGER
+            + "/blobs/"
+            + target_dict["image_digest"]
+        )
+        response = requests.get(url=blob_url, timeout=30)
+        assert response.status_code == HTTPStatus.OK
+        assert response.content == high_quality_image.getvalue()
+        assert "immutable" in response.headers["Cache-Control"]
+
+    @staticmethod
+    def test_not_found() -> None:
+        """
+        A 404 error is returned for a digest which no image has.
+        """
+        blob_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + "/blobs/foobar"
+        response = requests.get(url=blob_url, timeout=30)
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+class _UnusedTargetTrackingRater:
+    """
+    A target tracking rater which fails the test if it is used.
+    """
+
+    def __call__(self, image_content: bytes) -> int:
+        """
+        Fail, as the target should not be rated.
+        """
+        del image_content
+        pytest.fail(reason="The target was rated.")
+
+
+class TestSQLiteStorageBackend:
+    """
+    Tests for storing databases in a SQLite file.
+    """
+
+    @staticmethod
+    def test_round_trip(
+        high_quality_image: io.BytesIO,
+        different_high_quality_image: io.BytesIO,
+        tmp_path: Path,
+    ) -> None:
+        """
+        Stored databases and targets are loaded by a new backend using the
+        same file, and images which are no longer used are removed.
+        """
+        path = tmp_path / "target_manager.sqlite3"
+        storage_backend = SQLiteStorageBackend(path=path)
+        database = VuforiaDatabase()
+        storage_backend.save_database(database=database)
+        target = make_target(
+            image_value=high_quality_image.getvalue(),
+            target_tracking_rater=HardcodedTargetTrackingRater(rating=3),
+        )
+        storage_backend.save_target(
+            database_name=database.database_name,
+            target=target,
+        )
+        new_target = dataclasses.replace(
+            target,
+            image_value=different_high_quality_image.getvalue(),
+        )
+        storage_backend.save_target(
+            database_name=database.database_name,
+            target=new_target,
+        )
+
+        target_tracking_rater = HardcodedTargetTrackingRater(rating=1)
+        (loaded_database,) = SQLiteStorageBackend(
+            path=path,
+        ).load_databases(target_tracking_rater=target_tracking_rater)
+        assert loaded_database == database
+        (loaded_target,) = loaded_database.targets
+        assert loaded_target == new_target
+        # A width given as an integer is not loaded as a float.
+        assert type(loaded_target.width) is type(new_target.width)
+        assert not loaded_database.targets.with_image(
+            image_content=high_quality_image.getvalue(),
+        )
+
+        storage_backend.delete_database(database_name=database.database_name)
+        assert not SQLiteStorageBackend(path=path).load_databases(
+            target_tracking_rater=target_tracking_rater,
+        )
+
+    @staticmethod
+    def test_tracking_rating(
+        high_quality_image: io.BytesIO,
+        different_high_quality_image: io.BytesIO,
+        tmp_path: Path,
+    ) -> None:
+        """
+        Saving a target does not rate it, and a stored tracking rating is
+        used when the target is loaded until the target's image changes.
+        """
+        path = tmp_path / "target_manager.sqlite3"
+        storage_backend = SQLiteStorageBackend(path=path)
+        database = VuforiaDatabase()
+        storage_backend.save_database(database=database)
+        target = make_target(
+            image_value=high_quality_image.getvalue(),
+            target_tracking_rater=_UnusedTargetTrackingRater(),
+        )
+        storage_backend.save_target(
+            database_name=database.database_name,
+            target=target,
+        )
+
+        load_rating = 1
+        load_rater = HardcodedTargetTrackingRater(rating=load_rating)
+        (loaded_database,) = SQLiteStorageBackend(
+            path=path,
+        ).load_databases(target_tracking_rater=load_rater)
+        (loaded_target,) = loaded_database.targets
+        assert loaded_target.target_tracking_rater is load_rater
+
+        stored_rating = 3
+        storage_backend.save_tracking_rating(
+            database_name=database.database_name,
+            target_id=target.target_id,
+            image_digest=target.image_digest,
+            tracking_rating=stored_rating,
+        )
+        renamed_target = dataclasses.replace(target, name="renamed")
+        storage_backend.save_target(
+            database_name=database.database_name,
+            target=renamed_target,
+        )
+        (loaded_database,) = SQLiteStorageBackend(
+            path=path,
+        ).load_databases(target_tracking_rater=load_rater)
+        (loaded_target,) = loaded_database.targets
+        assert loaded_target.tracking_rating == stored_rating
+
+        new_image_target = dataclasses.replace(
+            renamed_target,
+            image_value=different_high_quality_image.getvalue(),
+        )
+        storage_backend.save_target(
+            database_name=database.database_name,
+            target=new_image_target,
+        )
+        # A rating of the old image is not stored for the new image.
+        storage_backend.save_tracking_rating(
+            database_name=database.database_name,
+            target_id=target.target_id,
+            image_digest=target.image_digest,
+            tracking_rating=stored_rating,
+        )
+        (loaded_database,) = SQLiteStorageBackend(
+            path=path,
+        ).load_databases(target_tracking_rater=load_rater)
+        (loaded_target,) = loaded_database.targets
+        assert loaded_target.tracking_rating == load_rating
+
+
+class TestTargetManagerClient:
+    """
+    Tests for the client which the VWS and VWQ apps use to make requests to
+    the target manager.
+    """
+
+    @staticmethod
+    def test_call_stats() -> None:
+        """
+        The latency of each call is recorded by HTTP method.
+        """
+        client = TargetManagerClient(base_url=_EXAMPLE_URL_FOR_TARGET_MANAGER)
+        assert not client.call_stats
+        number_of_calls = 2
+        for _ in range(number_of_calls):
+            response = client.request(method="GET", path="/databases")
+            assert response.status_code == HTTPStatus.OK
+
+        (method,) = client.call_stats.keys()
+        assert method == "GET"
+        call_stats = client.call_stats[method]
+        assert call_stats.count == number_of_calls
+        assert 0 <= call_stats.max_seconds <= call_stats.total_seconds
+
+
+class TestDatabaseReplica:
+    """
+    Tests for keeping a copy of the databases up to date from the change
+    feed.
+    """
+
+    @staticmethod
+    def test_changes_are_applied(high_quality_image: io.BytesIO) -> None:
+        """
+        Database and target changes are applied to a replica.
+        """
+        replica = DatabaseReplica(
+            target_manager_client=TargetManagerClient(
+                base_url=_EXAMPLE_URL_FOR_TARGET_MANAGER,
+            ),
+        )
+        assert (
+            replica.get_databases(
+                access_key_name="server_access_key",
+                access_key="x",
+            )
+            is None
+        )
+        replica.sync(timeout_seconds=0)
+
+        database = VuforiaDatabase()
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + "/databases"
+        requests.post(url=databases_url, json=database.to_dict(), timeout=30)
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        target_id = vws_client.add_target(
+            name="x",
+            width=1,
+            image=high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+
+        replica.sync(timeout_seconds=0)
+        (replicated_database,) = replica.get_databases(
+            access_key_name="server_access_key",
+            access_key=database.server_access_key,
+        ) or set()
+        target = replicated_database.get_target(target_id=target_id)
+        assert target.name == "x"
+
+        requests.delete(
+            url=databases_url + "/" + database.database_name,
+            timeout=30,
+        )
+        replica.sync(timeout_seconds=0)
+        assert not replica.get_databases(
+            access_key_name="server_access_key",
+            access_key=database.server_access_key,
+        )
+
+    @staticmethod
+    def test_ratings_scheduled_once_read() -> None:
+        """
+        When targets' tracking ratings become available is only kept once
+        something reads changes, so that it does not build up when no
+        databases are replicated.
+        """
+        change_log = ChangeLog()
+        due = datetime.datetime.now(tz=datetime.UTC)
+        change_log.schedule_rating(
+            due=due,
+            database_name="example",
+            target_id="example",
+        )
+        assert change_log.next_rating_due() is None
+
+        assert change_log.start_scheduling_ratings()
+        assert not change_log.start_scheduling_ratings()
+        change_log.schedule_rating(
+            due=due,
+            database_name="example",
+            target_id="example",
+        )
+        assert change_log.next_rating_due() == due
+
+
+class TestConditionalTargetChanges:
+    """
+    Tests for changing targets in the target manager only if they have not
+    been changed by another request.
+    """
+
+    @staticmethod
+    def test_etag_does_not_rate_target(high_quality_image: io.BytesIO) -> None:
+        """
+        Getting a target's entity tag does not rate the target, and the
+        entity tag changes when the target changes.
+        """
+        target = make_target(
+            image_value=high_quality_image.getvalue(),
+            target_tracking_rater=_UnusedTargetTrackingRater(),
+        )
+        renamed_target = dataclasses.replace(target, name="renamed")
+        assert get_target_etag(target=target) == get_target_etag(
+            target=dataclasses.replace(target),
+        )
+        assert get_target_etag(target=target) != get_target_etag(
+            target=renamed_target,
+        )
+
+    @staticmethod
+    def test_stale_version(high_quality_image: io.BytesIO) -> None:
+        """
+        A change to a target is rejected if the target has changed since the
+        version given in ``If-Match``, and VWS changes the current version.
+        """
+        database = VuforiaDatabase()
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + "/databases"
+        requests.post(url=databases_url, json=database.to_dict(), timeout=30)
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        target_id = vws_client.add_target(
+            name="x",
+            width=1,
+            image=high_quality_image,
+            active_flag=True,
+            application_metadata=None,
+        )
+        vws_client.wait_for_target_processed(target_id=target_id)
+
+        target_url = (
+            f"{databases_url}/{database.database_name}/targets/{target_id}"
+        )
+        response = requests.put(
+            url=target_url,
+            json={"name": "y"},
+            headers={"If-Match": '"stale"'},
+            timeout=30,
+        )
+        assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+        target_record = vws_client.get_target_record(target_id=target_id)
+        assert target_record.target_record.name == "x"
+
+        vws_client.update_target(target_id=target_id, name="z")
+        target_record = vws_client.get_target_record(target_id=target_id)
+        assert target_record.target_record.name == "z"
+
+
+class TestAllInOne:
+    """
+    Tests for the application which serves VWS, VWQ and the target manager.
+    """
+
+    @staticmethod
+    def test_add_and_query(
+        high_quality_image: io.BytesIO,
+        monkeypatch: pytest.MonkeyPatch,
+        requests_mock: Mocker,
+    ) -> None:
+        """
+        Targets added through the VWS routes can be found through the VWQ
+        route, in a database created through the target manager route.
+        """
+        base_url = "http://" + uuid.uuid4().hex + ".com"
+        monkeypatch.setitem(
+            ALL_IN_ONE_FLASK_APP.config,
+            "VWS_MOCK_TERMINATE_WSGI_INPUT",
+            True,
+        )
+        add_flask_app_to_mock(
+            mock_obj=requests_mock,
+            flask_app=ALL_IN_ONE_FLASK_APP,
+            base_url=base_url,
+        )
+        monkeypatch.setenv(name="PROCESSING_TIME_SECONDS", value="0.1")
+
+        database = VuforiaDatabase()
+        response = requests.post(
+            url=base_url + "/databases",
+            json=database.to_dict(),
+            timeout=30,
+        )
+        assert response.status_code == HTTPStatus.CREATED
+
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+            base_vws_url=base_url,
+        )
+        cloud_reco_client = CloudRecoService(
+            client_access_key=database.client_access_key,
+            client_secret_key=database.client_secret_key,
+            base_vwq_url=base_url,
+        )
+
+        target_id = vws_client.add_target(
+            name="example",
+            width=1,
+            image=high_quality_image,
+            application_metadata=None,
+            active_flag=True,
+        )
+        vws_client.wait_for_target_processed(target_id=target_id)
+        (result,) = cloud_reco_client.query(image=high_quality_image)
+        assert result.target_id == target_id
+
+        response = requests.delete(
+            url=base_url + "/databases/" + database.database_name,
+            timeout=30,
+        )
+        assert response.status_code == HTTPStatus.OK
+
+
 class TestQueryImageMatchers:
     """Tests for query image matchers."""
 
@@ -428,3 +1011,180 @@ class TestDuplicatesImageMatchers:
         vws_client.wait_for_target_processed(target_id=duplicate_target_id)
         duplicates = vws_client.get_duplicate_targets(target_id=target_id)
         assert duplicates == [duplicate_target_id]
+
+
+class TestCreateApp:
+    """
+    Tests for creating apps with fixed settings.
+    """
+
+    @staticmethod
+    def test_settings_fixed(
+        high_quality_image: io.BytesIO,
+        monkeypatch: pytest.MonkeyPatch,
+        requests_mock: Mocker,
+    ) -> None:
+        """
+        An app created with settings uses those settings, even if the
+        environment variables change later.
+        """
+        settings = VWQSettings.model_validate(
+            obj={
+                "target_manager_base_url": _EXAMPLE_URL_FOR_TARGET_MANAGER,
+                "query_image_matcher": "exact",
+            },
+        )
+        base_vwq_url = "http://" + uuid.uuid4().hex + ".com"
+        add_flask_app_to_mock(
+            mock_obj=requests_mock,
+            flask_app=create_app(settings=settings),
+            base_url=base_vwq_url,
+        )
+        monkeypatch.setenv(
+            name="QUERY_IMAGE_MATCHER",
+            value="structural_similarity",
+        )
+
+        database = VuforiaDatabase()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        cloud_reco_client = CloudRecoService(
+            client_access_key=database.client_access_key,
+            client_secret_key=database.client_secret_key,
+            base_vwq_url=base_vwq_url,
+        )
+
+        pil_image = Image.open(fp=high_quality_image)
+        re_exported_image = io.BytesIO()
+        pil_image.save(re_exported_image, format="PNG")
+
+        databases_url = _EXAMPLE_URL_FOR_TARGET_MANAGER + "/databases"
+        requests.post(url=databases_url, json=database.to_dict(), timeout=30)
+
+        target_id = vws_client.add_target(
+            name="example",
+            width=1,
+            image=high_quality_image,
+            application_metadata=None,
+            active_flag=True,
+        )
+        vws_client.wait_for_target_processed(target_id=target_id)
+        same_image_result = cloud_reco_client.query(
+            image=high_quality_image,
+        )
+        assert len(same_image_result) == 1
+        similar_image_result = cloud_reco_client.query(
+            image=re_exported_image,
+        )
+        assert not similar_image_result
+
+
+@dataclasses.dataclass(frozen=True)
+class _ServeCall:
+    """
+    The arguments which an app was served with.
+    """
+
+    host: str
+    workers: int
+    settings: ServerSettings
+    unix_socket_path: Path | None
+
+
+def _record_serve_calls(monkeypatch: pytest.MonkeyPatch) -> list[_ServeCall]:
+    """
+    Record apps which ``mock-vws serve`` would serve, rather than serving
+    them.
+    """
+    serve_calls: list[_ServeCall] = []
+
+    def record_serve_call(
+        create_app: Callable[[], Flask],
+        host: str,
+        workers: int,
+        settings: ServerSettings,
+        unix_socket_path: Path | None = None,
+    ) -> None:
+        """
+        Record the arguments which an app would be served with.
+        """
+        del create_app
+        serve_calls.append(
+            _ServeCall(
+                host=host,
+                workers=workers,
+                settings=settings,
+                unix_socket_path=unix_socket_path,
+            ),
+        )
+
+    monkeypatch.setattr(target=serve, name="_serve", value=record_serve_call)
+    return serve_calls
+
+
+class TestServe:
+    """
+    Tests for the ``mock-vws serve`` command.
+    """
+
+    @staticmethod
+    def test_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        Apps which can have many worker processes are served with the
+        settings from environment variables.
+        """
+        serve_calls = _record_serve_calls(monkeypatch=monkeypatch)
+        workers = 3
+        threads = 4
+        monkeypatch.setenv(name="VWS_HOST", value="localhost")
+        monkeypatch.setenv(name="SERVER_WORKERS", value=str(workers))
+        monkeypatch.setenv(name="SERVER_THREADS", value=str(threads))
+
+        serve.main(argv=["serve", "vws"])
+
+        (serve_call,) = serve_calls
+        assert serve_call.host == "localhost"
+        assert serve_call.workers == workers
+        assert serve_call.settings.server_threads == threads
+        assert serve_call.unix_socket_path is None
+
+    @staticmethod
+    def test_target_manager(
+        monkeypatch: pytest.MonkeyPatch,
+        tmp_path: Path,
+    ) -> None:
+        """
+        The target manager is served by one worker process, with enough
+        threads for replicas waiting for changes, and it can also listen on
+        a Unix domain socket.
+        """
+        serve_calls = _record_serve_calls(monkeypatch=monkeypatch)
+        unix_socket_path = tmp_path / "target_manager.sock"
+        monkeypatch.setenv(name="SERVER_WORKERS", value="3")
+        monkeypatch.setenv(
+            name="TARGET_MANAGER_UNIX_SOCKET_PATH",
+            value=str(unix_socket_path),
+        )
+
+        serve.main(argv=["serve", "target-manager"])
+
+        (serve_call,) = serve_calls
+        default_target_manager_threads = 64
+        assert serve_call.workers == 1
+        assert (
+            serve_call.settings.server_threads
+            == default_target_manager_threads
+        )
+        assert serve_call.unix_socket_path == unix_socket_path
+
+    @staticmethod
+    def test_unknown_application(monkeypatch: pytest.MonkeyPatch) -> None:
+        """
+        An error is given for an application which does not exist.
+        """
+        serve_calls = _record_serve_calls(monkeypatch=monkeypatch)
+        with pytest.raises(expected_exception=SystemExit):
+            serve.main(argv=["serve", "example"])
+        assert not serve_calls
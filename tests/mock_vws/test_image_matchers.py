@@ -0,0 +1,197 @@
+"""
+Tests for image matchers.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+from mock_vws import image_matchers
+from mock_vws._image_digests import get_image_digest
+from mock_vws.image_matchers import (
+    ExactMatcher,
+    PerceptualHashPrefilterMatcher,
+    StructuralSimilarityMatcher,
+)
+
+if TYPE_CHECKING:
+    import io
+    from pathlib import Path
+
+    import torch
+
+
+class TestStructuralSimilarityMatcher:
+    """
+    Tests for the structural similarity matcher.
+    """
+
+    @staticmethod
+    def test_image_cache_stats(high_quality_image: io.BytesIO) -> None:
+        """
+        Preprocessed target images are cached, and query images are not.
+        """
+        matcher = StructuralSimilarityMatcher()
+        target_image_content = high_quality_image.getvalue()
+        # The query image is the same as the target image, so that if query
+        # images were cached, they would be found in the cache.
+        query_image_content = target_image_content
+
+        for _ in range(3):
+            matcher.match_many(
+                image_content=query_image_content,
+                candidate_image_contents=[target_image_content],
+            )
+
+        image_cache_stats = matcher.image_cache_stats
+        expected_hits = 2
+        expected_misses = 1
+        assert image_cache_stats.hits == expected_hits
+        assert image_cache_stats.misses == expected_misses
+        assert image_cache_stats.size_bytes > 0
+
+    @staticmethod
+    def test_given_digests(
+        high_quality_image: io.BytesIO,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        When the digests of candidate images are given, the candidate images
+        are not hashed.
+        """
+        matcher = StructuralSimilarityMatcher()
+        image_content = high_quality_image.getvalue()
+        image_digest = get_image_digest(image_content=image_content)
+
+        def fail_to_get_image_digest(image_content: bytes) -> str:
+            """
+            Fail, as no image should be hashed.
+            """
+            pytest.fail(reason=f"{len(image_content)} bytes were hashed.")
+
+        monkeypatch.setattr(
+            target=image_matchers,
+            name="get_image_digest",
+            value=fail_to_get_image_digest,
+        )
+        for _ in range(2):
+            matches = matcher.match_many(
+                image_content=image_content,
+                candidate_image_contents=[image_content],
+                candidate_image_digests=[image_digest],
+            )
+            assert matches == [True]
+
+        assert matcher.image_cache_stats.hits == 1
+
+    @staticmethod
+    def test_analysis_cache(
+        high_quality_image: io.BytesIO,
+        different_high_quality_image: io.BytesIO,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Preprocessed target images are kept in an analysis cache directory,
+        so that a matcher which uses the same directory, for example in a
+        later run, does not preprocess them again.
+        """
+        target_image_content = high_quality_image.getvalue()
+        query_image_content = different_high_quality_image.getvalue()
+        matcher = StructuralSimilarityMatcher(
+            analysis_cache_directory=tmp_path,
+        )
+        match = matcher(
+            first_image_content=target_image_content,
+            second_image_content=query_image_content,
+        )
+
+        # pylint: disable-next=protected-access
+        get_ssim_image_tensor = image_matchers._get_ssim_image_tensor  # noqa: SLF001
+
+        def get_query_image_tensor(image_content: bytes) -> torch.Tensor:
+            """
+            Preprocess a query image, and fail if the target image is
+            preprocessed.
+            """
+            if image_content == target_image_content:
+                pytest.fail(reason="The target image was preprocessed.")
+            return get_ssim_image_tensor(image_content=image_content)
+
+        monkeypatch.setattr(
+            target=image_matchers,
+            name="_get_ssim_image_tensor",
+            value=get_query_image_tensor,
+        )
+        new_matcher = StructuralSimilarityMatcher(
+            analysis_cache_directory=tmp_path,
+        )
+        new_match = new_matcher(
+            first_image_content=target_image_content,
+            second_image_content=query_image_content,
+        )
+        assert new_match == match
+
+    @staticmethod
+    @pytest.mark.parametrize("batch_size", [1, 2, 64])
+    def test_match_many_batches(
+        high_quality_image: io.BytesIO,
+        different_high_quality_image: io.BytesIO,
+        batch_size: int,
+    ) -> None:
+        """
+        Comparing images in batches gives the same results as comparing them
+        one by one, whatever the batch size.
+        """
+        matcher = StructuralSimilarityMatcher(batch_size=batch_size)
+        image_content = high_quality_image.getvalue()
+        different_image_content = different_high_quality_image.getvalue()
+        candidate_image_contents = [
+            image_content,
+            different_image_content,
+            image_content,
+        ]
+
+        matches = matcher.match_many(
+            image_content=image_content,
+            candidate_image_contents=candidate_image_contents,
+        )
+
+        assert matches == [True, False, True]
+        assert matches == [
+            matcher(
+                first_image_content=candidate_image_content,
+                second_image_content=image_content,
+            )
+            for candidate_image_content in candidate_image_contents
+        ]
+
+
+class TestPerceptualHashPrefilterMatcher:
+    """
+    Tests for the perceptual hash prefilter matcher.
+    """
+
+    @staticmethod
+    def test_hash_cache_stats(high_quality_image: io.BytesIO) -> None:
+        """
+        Target images' hashes are cached, and query images' hashes are not.
+        """
+        matcher = PerceptualHashPrefilterMatcher(matcher=ExactMatcher())
+        target_image_content = high_quality_image.getvalue()
+        # The query image is the same as the target image, so that if query
+        # images' hashes were cached, they would be found in the cache.
+        query_image_content = target_image_content
+
+        for _ in range(3):
+            matches = matcher.match_many(
+                image_content=query_image_content,
+                candidate_image_contents=[target_image_content],
+            )
+            assert matches == [True]
+
+        hash_cache_stats = matcher.hash_cache_stats
+        expected_hits = 2
+        expected_misses = 1
+        assert hash_cache_stats.hits == expected_hits
+        assert hash_cache_stats.misses == expected_misses
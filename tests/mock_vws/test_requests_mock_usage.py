@@ -3,19 +3,31 @@ Tests for the usage of the mock for ``requests``.
 """
 from __future__ import annotations
 
+import dataclasses
 import datetime
 import email.utils
+import functools
 import io
 import json
 import socket
+import threading
+import time
+from typing import TYPE_CHECKING
 
 import pytest
 import requests
 from freezegun import freeze_time
 from mock_vws import MockVWS
+from mock_vws import target as target_module
+from mock_vws._digest_cache import DigestCache
 from mock_vws.database import VuforiaDatabase
-from mock_vws.image_matchers import ExactMatcher, StructuralSimilarityMatcher
+from mock_vws.image_matchers import (
+    ExactMatcher,
+    PerceptualHashPrefilterMatcher,
+    StructuralSimilarityMatcher,
+)
 from mock_vws.target import Target
+from mock_vws.target_manager import TargetManager
 from PIL import Image
 from requests.exceptions import MissingSchema
 from requests_mock.exceptions import NoMockAddress
@@ -23,9 +35,16 @@ from vws import VWS, CloudRecoService
 from vws_auth_tools import rfc_1123_date
 
 from tests.mock_vws.utils.usage_test_helpers import (
+    make_target,
     processing_time_seconds,
 )
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from mock_vws._constants import TargetStatuses
+
 
 def _not_exact_matcher(
     first_image_content: bytes,
@@ -280,6 +299,102 @@ class TestTargets:
         new_target = Target.from_dict(target_dict=target_dict)
         assert new_target == target
 
+    @staticmethod
+    def test_rating_computed_once(high_quality_image: io.BytesIO) -> None:
+        """
+        A target's tracking rating is computed once, when it is first given,
+        and is then read without using the target tracking rater again.
+        """
+        rater_calls: list[bytes] = []
+        rating = 3
+
+        def target_tracking_rater(image_content: bytes) -> int:
+            """
+            Record a call and return a fixed rating.
+            """
+            rater_calls.append(image_content)
+            return rating
+
+        target = make_target(
+            image_value=high_quality_image.getvalue(),
+            target_tracking_rater=target_tracking_rater,
+        )
+        number_of_reads = 3
+        for _ in range(number_of_reads):
+            assert target.tracking_rating == rating
+            assert target.to_dict()["tracking_rating"] == rating
+
+        assert len(rater_calls) == 1
+
+    @staticmethod
+    def test_to_dict_without_rating(high_quality_image: io.BytesIO) -> None:
+        """
+        A target can be dumped without computing its tracking rating, and a
+        rating which has not been computed is then given as -1.
+        """
+        rating = 3
+        rater_calls: list[bytes] = []
+
+        def target_tracking_rater(image_content: bytes) -> int:
+            """
+            Record a call and return a fixed rating.
+            """
+            rater_calls.append(image_content)
+            return rating
+
+        target = make_target(
+            image_value=high_quality_image.getvalue(),
+            target_tracking_rater=target_tracking_rater,
+        )
+        assert target.to_dict(rate=False)["tracking_rating"] == -1
+        assert not rater_calls
+
+        assert target.tracking_rating == rating
+        assert target.to_dict(rate=False)["tracking_rating"] == rating
+        assert len(rater_calls) == 1
+
+    @staticmethod
+    def test_rating_reused_after_replace(
+        high_quality_image: io.BytesIO,
+        different_high_quality_image: io.BytesIO,
+    ) -> None:
+        """
+        A new version of a target made with ``dataclasses.replace`` can reuse
+        the tracking rating computed for the previous version, unless its
+        image has changed.
+        """
+        rater_calls: list[bytes] = []
+        rating = 3
+
+        def target_tracking_rater(image_content: bytes) -> int:
+            """
+            Record a call and return a fixed rating.
+            """
+            rater_calls.append(image_content)
+            return rating
+
+        target = make_target(
+            image_value=high_quality_image.getvalue(),
+            target_tracking_rater=target_tracking_rater,
+        )
+        assert target.tracking_rating == rating
+
+        renamed_target = dataclasses.replace(target, name="renamed")
+        renamed_target.reuse_analysis(previous=target)
+        assert renamed_target.tracking_rating == rating
+        assert len(rater_calls) == 1
+
+        new_image_target = dataclasses.replace(
+            target,
+            image_value=different_high_quality_image.getvalue(),
+        )
+        new_image_target.reuse_analysis(previous=target)
+        assert new_image_target.tracking_rating == rating
+        assert rater_calls == [
+            high_quality_image.getvalue(),
+            different_high_quality_image.getvalue(),
+        ]
+
     @staticmethod
     def test_to_dict_deleted(high_quality_image: io.BytesIO) -> None:
         """
@@ -315,6 +430,233 @@ class TestTargets:
         new_target = Target.from_dict(target_dict=target_dict)
         assert new_target.delete_date == target.delete_date
 
+    @staticmethod
+    def test_to_dict_without_image(high_quality_image: io.BytesIO) -> None:
+        """
+        It is possible to dump a target to a dictionary without its image and
+        load it back, given a way to get the image by its digest.
+        """
+        database = VuforiaDatabase()
+
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+
+        with MockVWS() as mock:
+            mock.add_database(database=database)
+            vws_client.add_target(
+                name="example",
+                width=1,
+                image=high_quality_image,
+                active_flag=True,
+                application_metadata=None,
+            )
+
+        target = next(iter(database.targets))
+        target_dict = target.to_dict(include_image=False)
+        assert "image_base64" not in target_dict
+
+        with pytest.raises(expected_exception=ValueError):
+            Target.from_dict(target_dict=target_dict)
+
+        images = {target_dict["image_digest"]: target.image_value}
+        new_target = Target.from_dict(
+            target_dict=target_dict,
+            get_image=images.__getitem__,
+        )
+        assert new_target == target
+
+
+class TestTargetProcessing:
+    """
+    Tests for processing new targets in the background.
+    """
+
+    @staticmethod
+    def test_rated_in_background(high_quality_image: io.BytesIO) -> None:
+        """
+        A new target is rated in the background while it is processing, so
+        the rating is not computed again when it is read.
+        """
+        rater_calls: list[bytes] = []
+        rating = 3
+
+        def target_tracking_rater(image_content: bytes) -> int:
+            """
+            Record a call and return a fixed rating.
+            """
+            rater_calls.append(image_content)
+            return rating
+
+        database = VuforiaDatabase()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+
+        with MockVWS(
+            processing_time_seconds=0,
+            target_tracking_rater=target_tracking_rater,
+            target_processing_workers=2,
+        ) as mock:
+            mock.add_database(database=database)
+            target_id = vws_client.add_target(
+                name="example",
+                width=1,
+                image=high_quality_image,
+                active_flag=True,
+                application_metadata=None,
+            )
+            timeout_seconds = 60
+            deadline = time.monotonic() + timeout_seconds
+            while mock.target_processing_queue_depth:
+                assert time.monotonic() < deadline
+                time.sleep(0.01)
+
+            assert len(rater_calls) == 1
+            target_record = vws_client.get_target_record(target_id=target_id)
+
+        assert target_record.target_record.tracking_rating == rating
+        assert len(rater_calls) == 1
+
+    @staticmethod
+    def test_stopped_on_exit(high_quality_image: io.BytesIO) -> None:
+        """
+        Stopping the mock waits for targets which are being processed in the
+        background, so that no background threads are left running.
+        """
+        rater_threads: list[threading.Thread] = []
+        rater_called = threading.Event()
+        rating = 3
+
+        def target_tracking_rater(image_content: bytes) -> int:
+            """
+            Record the thread which the rater is called from, and take some
+            time to rate the image.
+            """
+            del image_content
+            rater_threads.append(threading.current_thread())
+            rater_called.set()
+            time.sleep(0.5)
+            return rating
+
+        database = VuforiaDatabase()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+
+        with MockVWS(
+            processing_time_seconds=0,
+            target_tracking_rater=target_tracking_rater,
+            target_processing_workers=1,
+        ) as mock:
+            mock.add_database(database=database)
+            vws_client.add_target(
+                name="example",
+                width=1,
+                image=high_quality_image,
+                active_flag=True,
+                application_metadata=None,
+            )
+            timeout_seconds = 60
+            assert rater_called.wait(timeout=timeout_seconds)
+
+        assert not mock.target_processing_queue_depth
+        (rater_thread,) = rater_threads
+        assert not rater_thread.is_alive()
+
+    @staticmethod
+    def test_not_processed_in_background_by_default(
+        high_quality_image: io.BytesIO,
+    ) -> None:
+        """
+        By default, targets are not processed in background threads, as a
+        custom target tracking rater may not be safe to call from many
+        threads.
+        """
+        rater_threads: list[threading.Thread] = []
+        rating = 3
+
+        def target_tracking_rater(image_content: bytes) -> int:
+            """
+            Record the thread which the rater is called from.
+            """
+            del image_content
+            rater_threads.append(threading.current_thread())
+            return rating
+
+        database = VuforiaDatabase()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+
+        with MockVWS(
+            processing_time_seconds=0,
+            target_tracking_rater=target_tracking_rater,
+        ) as mock:
+            mock.add_database(database=database)
+            target_id = vws_client.add_target(
+                name="example",
+                width=1,
+                image=high_quality_image,
+                active_flag=True,
+                application_metadata=None,
+            )
+            assert not mock.target_processing_queue_depth
+            target_record = vws_client.get_target_record(target_id=target_id)
+
+        assert target_record.target_record.tracking_rating == rating
+        assert rater_threads == [threading.current_thread()]
+
+
+class TestTargetStatus:
+    """
+    Tests for the status of a target.
+    """
+
+    @staticmethod
+    def test_analysis_cache(
+        high_quality_image: io.BytesIO,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Statuses are kept in an analysis cache directory, so that a target
+        with the same image and directory, for example in a later run, does
+        not compute the status again.
+        """
+        target = make_target(
+            image_value=high_quality_image.getvalue(),
+            analysis_cache_directory=tmp_path,
+        )
+        status = target.status
+
+        def get_post_processing_status(
+            image_content: bytes,
+        ) -> TargetStatuses:
+            """
+            Fail, as the status should not be computed.
+            """
+            pytest.fail(reason=f"{len(image_content)} bytes were analyzed.")
+
+        monkeypatch.setattr(
+            target=target_module,
+            name="_get_post_processing_status",
+            value=get_post_processing_status,
+        )
+        # Statuses are also cached in memory, and this test is for a later
+        # run, which starts with an empty cache.
+        monkeypatch.setattr(
+            target=target_module,
+            name="_POST_PROCESSING_STATUS_CACHE",
+            value=DigestCache(max_bytes=1024),
+        )
+        new_target = dataclasses.replace(target, name="new_name")
+        assert new_target.status == status
+
 
 class TestDatabaseToDict:
     """
@@ -351,6 +693,53 @@ class TestDatabaseToDict:
         assert new_database == database
 
 
+class TestDatabaseTargets:
+    """
+    Tests for the targets of a database.
+    """
+
+    @staticmethod
+    def test_set_of_targets(high_quality_image: io.BytesIO) -> None:
+        """
+        A database can be given a set of targets, and they are indexed.
+        """
+        target = make_target(image_value=high_quality_image.getvalue())
+        database = VuforiaDatabase(targets={target})
+        assert database.get_target(target_id=target.target_id) == target
+        assert database.targets.not_deleted_with_name(name="example") == {
+            target,
+        }
+
+    @staticmethod
+    def test_copy(high_quality_image: io.BytesIO) -> None:
+        """
+        A copy of a database's targets can be changed without changing the
+        database's targets.
+        """
+        target = make_target(image_value=high_quality_image.getvalue())
+        database = VuforiaDatabase(targets={target})
+        targets = database.targets.copy()
+        new_target = dataclasses.replace(target, name="new_name")
+        targets.replace(old=target, new=new_target)
+
+        assert set(database.targets) == {target}
+        assert set(targets) == {new_target}
+        assert targets.with_image(
+            image_content=high_quality_image.getvalue(),
+        ) == {new_target}
+        assert not targets.not_deleted_with_name(name="example")
+
+    @staticmethod
+    def test_unknown_target_id() -> None:
+        """
+        A ``ValueError`` is raised when getting a target which does not
+        exist.
+        """
+        database = VuforiaDatabase()
+        with pytest.raises(ValueError, match="no target with the ID"):
+            database.get_target(target_id="unknown")
+
+
 class TestDateHeader:
     """
     Tests for the date header in responses from mock routes.
@@ -437,6 +826,154 @@ class TestAddDatabase:
                     mock.add_database(database=bad_database)
 
 
+class TestDatabasesByAccessKey:
+    """
+    Tests for getting databases from the target manager by access key.
+    """
+
+    @staticmethod
+    def test_added_and_removed() -> None:
+        """
+        Databases can be got by access key once added, and not once removed.
+        """
+        target_manager = TargetManager()
+        database = VuforiaDatabase()
+        other_database = VuforiaDatabase()
+        target_manager.add_database(database=database)
+        target_manager.add_database(database=other_database)
+
+        assert (
+            target_manager.get_database_by_server_access_key(
+                server_access_key=database.server_access_key,
+            )
+            == database
+        )
+        assert (
+            target_manager.get_database_by_client_access_key(
+                client_access_key=database.client_access_key,
+            )
+            == database
+        )
+
+        target_manager.remove_database(database=database)
+        with pytest.raises(KeyError):
+            target_manager.get_database_by_server_access_key(
+                server_access_key=database.server_access_key,
+            )
+        with pytest.raises(KeyError):
+            target_manager.get_database_by_client_access_key(
+                client_access_key=database.client_access_key,
+            )
+        assert (
+            target_manager.get_database_by_server_access_key(
+                server_access_key=other_database.server_access_key,
+            )
+            == other_database
+        )
+
+
+class TestConcurrency:
+    """
+    Tests for using databases and the target manager from many threads.
+    """
+
+    @staticmethod
+    def test_concurrent_changes_and_reads(
+        high_quality_image: io.BytesIO,
+    ) -> None:
+        """
+        Readers see consistent targets and databases while other threads
+        change them.
+        """
+        number_of_targets = 20
+        iterations = 500
+        database = VuforiaDatabase()
+        for index in range(number_of_targets):
+            target = make_target(
+                image_value=high_quality_image.getvalue(),
+                name=f"example_{index}",
+            )
+            database.targets.add(value=target)
+        target_ids = [target.target_id for target in database.targets]
+        target_manager = TargetManager()
+        target_manager.add_database(database=database)
+
+        def change_targets(thread_index: int) -> None:
+            """
+            Flip the active flags of targets, and add and remove another
+            database.
+            """
+            for iteration in range(iterations):
+                target_id = target_ids[iteration % number_of_targets]
+                target = database.get_target(target_id=target_id)
+                new_target = dataclasses.replace(
+                    target,
+                    active_flag=not target.active_flag,
+                )
+                try:
+                    database.targets.replace(old=target, new=new_target)
+                except KeyError:
+                    # Another thread changed the target first.
+                    continue
+
+                other_database = VuforiaDatabase(
+                    database_name=f"other_{thread_index}_{iteration}",
+                )
+                target_manager.add_database(database=other_database)
+                target_manager.remove_database(database=other_database)
+
+        def read_targets() -> None:
+            """
+            Read the targets and databases in several ways.
+            """
+            for _ in range(iterations):
+                assert len(list(database.targets)) == number_of_targets
+                assert len(database.targets.not_deleted) == number_of_targets
+                assert len(database.not_deleted_targets) == number_of_targets
+                assert len(
+                    database.targets.with_image(
+                        image_content=high_quality_image.getvalue(),
+                    ),
+                ) == number_of_targets
+                assert database in target_manager.databases
+
+        errors: list[Exception] = []
+
+        def run(function: Callable[[], None]) -> None:
+            """
+            Run a function, recording any error so that the test fails.
+            """
+            try:
+                function()
+            except Exception as exc:
+                errors.append(exc)
+                raise
+
+        number_of_threads = 4
+        functions: list[Callable[[], None]] = [
+            functools.partial(change_targets, thread_index)
+            for thread_index in range(number_of_threads)
+        ] + [read_targets] * number_of_threads
+        # The threads are daemon threads which are given a deadline, so that
+        # a deadlock fails the test rather than stopping the test run from
+        # finishing.
+        threads = [
+            threading.Thread(target=run, args=(function,), daemon=True)
+            for function in functions
+        ]
+        for thread in threads:
+            thread.start()
+        timeout_seconds = 120
+        deadline = time.monotonic() + timeout_seconds
+        for thread in threads:
+            thread.join(timeout=max(deadline - time.monotonic(), 0))
+        assert not any(thread.is_alive() for thread in threads)
+        assert not errors
+
+        assert target_manager.databases == {database}
+        assert len(database.targets) == number_of_targets
+
+
 class TestQueryImageMatchers:
     """Tests for query image matchers."""
 
@@ -558,6 +1095,79 @@ class TestQueryImageMatchers:
             )
             assert not different_image_result
 
+    @staticmethod
+    def test_perceptual_hash_prefilter(
+        high_quality_image: io.BytesIO,
+        different_high_quality_image: io.BytesIO,
+        image_file_success_state_low_rating: io.BytesIO,
+        image_file_failed_state: io.BytesIO,
+    ) -> None:
+        """
+        The perceptual hash prefilter gives the same matches as the matcher it
+        wraps for these images, which include a re-compressed image.
+
+        The prefilter is lossy, so this is not true for all images.
+        """
+        pil_image = Image.open(fp=high_quality_image)
+        re_exported_image = io.BytesIO()
+        pil_image.save(re_exported_image, format="JPEG", quality=50)
+
+        image_contents = [
+            high_quality_image.getvalue(),
+            re_exported_image.getvalue(),
+            different_high_quality_image.getvalue(),
+            image_file_success_state_low_rating.getvalue(),
+            image_file_failed_state.getvalue(),
+        ]
+
+        matcher = StructuralSimilarityMatcher()
+        prefilter_matcher = PerceptualHashPrefilterMatcher(matcher=matcher)
+
+        for image_content in image_contents:
+            expected_matches = [
+                matcher(
+                    first_image_content=candidate_image_content,
+                    second_image_content=image_content,
+                )
+                for candidate_image_content in image_contents
+            ]
+            prefilter_matches = prefilter_matcher.match_many(
+                image_content=image_content,
+                candidate_image_contents=image_contents,
+            )
+            assert prefilter_matches == expected_matches
+
+        database = VuforiaDatabase()
+        vws_client = VWS(
+            server_access_key=database.server_access_key,
+            server_secret_key=database.server_secret_key,
+        )
+        cloud_reco_client = CloudRecoService(
+            client_access_key=database.client_access_key,
+            client_secret_key=database.client_secret_key,
+        )
+
+        high_quality_image.seek(0)
+        with MockVWS(query_match_checker=prefilter_matcher) as mock:
+            mock.add_database(database=database)
+            target_id = vws_client.add_target(
+                name="example",
+                width=1,
+                image=high_quality_image,
+                application_metadata=None,
+                active_flag=True,
+            )
+            vws_client.wait_for_target_processed(target_id=target_id)
+            similar_image_result = cloud_reco_client.query(
+                image=re_exported_image,
+            )
+            assert len(similar_image_result) == 1
+
+            different_image_result = cloud_reco_client.query(
+                image=different_high_quality_image,
+            )
+            assert not different_image_result
+
 
 class TestDuplicatesImageMatchers:
     """Tests for duplicates image matchers."""
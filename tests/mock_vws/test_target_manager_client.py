@@ -0,0 +1,146 @@
+"""
+Tests for the client which the VWS and VWQ apps use to make requests to a
+target manager which is served over a socket.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import sys
+import threading
+from http import HTTPStatus
+from typing import TYPE_CHECKING
+
+import pytest
+from flask import Flask, Response, request
+from mock_vws._flask_server._target_manager_client import TargetManagerClient
+from mock_vws._flask_server.target_manager import TARGET_MANAGER_FLASK_APP
+from werkzeug.serving import make_server
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+    from werkzeug.serving import BaseWSGIServer
+
+
+@contextlib.contextmanager
+def _served(flask_app: Flask, host: str) -> Iterator[BaseWSGIServer]:
+    """
+    Serve a Flask app in a background thread.
+
+    Args:
+        flask_app: The app to serve.
+        host: The host to listen on. This can be ``unix://`` followed by the
+            path of a Unix domain socket.
+
+    Yields:
+        The server.
+    """
+    server = make_server(host=host, port=0, app=flask_app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        thread.join(timeout=30)
+
+
+def _unavailable_app(request_methods: list[str]) -> Flask:
+    """
+    Create an app which records the method of each request and responds
+    with ``503 Service Unavailable``.
+    """
+    flask_app = Flask(import_name=__name__)
+
+    @flask_app.route("/example", methods=["GET", "POST"])
+    def unavailable() -> Response:
+        """
+        Record the request and say that the service is unavailable.
+        """
+        request_methods.append(request.method)
+        return Response(status=HTTPStatus.SERVICE_UNAVAILABLE)
+
+    return flask_app
+
+
+class TestUnixSocket:
+    """
+    Tests for connecting to a target manager on a Unix domain socket.
+    """
+
+    @staticmethod
+    @pytest.mark.skipif(
+        condition=sys.platform == "win32",
+        reason="Unix domain sockets are not supported on Windows.",
+    )
+    def test_request(tmp_path: Path) -> None:
+        """
+        Requests are sent to the Unix domain socket rather than to the base
+        URL's host.
+        """
+        unix_socket_path = tmp_path / "target_manager.sock"
+        with _served(
+            flask_app=TARGET_MANAGER_FLASK_APP,
+            host=f"unix://{unix_socket_path}",
+        ):
+            client = TargetManagerClient(
+                base_url="http://target-manager.invalid",
+                unix_socket_path=unix_socket_path,
+            )
+            response = client.request(method="GET", path="/databases")
+
+        assert response.status_code == HTTPStatus.OK
+        assert response.json() == []
+
+
+class TestRetries:
+    """
+    Tests for retrying requests which get a response which says that the
+    target manager is unavailable.
+    """
+
+    @staticmethod
+    def test_idempotent_request_retried() -> None:
+        """
+        ``GET`` requests are retried.
+        """
+        request_methods: list[str] = []
+        max_retries = 2
+        with _served(
+            flask_app=_unavailable_app(request_methods=request_methods),
+            host="127.0.0.1",
+        ) as server:
+            client = TargetManagerClient(
+                base_url=f"http://127.0.0.1:{server.port}",
+                max_retries=max_retries,
+            )
+            response = client.request(method="GET", path="/example")
+
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+        assert request_methods == ["GET"] * (max_retries + 1)
+
+    @staticmethod
+    def test_post_not_replayed() -> None:
+        """
+        ``POST`` requests which have been sent are not sent again, as they
+        may have changed the target manager.
+        """
+        request_methods: list[str] = []
+        with _served(
+            flask_app=_unavailable_app(request_methods=request_methods),
+            host="127.0.0.1",
+        ) as server:
+            client = TargetManagerClient(
+                base_url=f"http://127.0.0.1:{server.port}",
+                max_retries=2,
+            )
+            response = client.request(
+                method="POST",
+                path="/example",
+                json={},
+            )
+
+        assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+        assert request_methods == ["POST"]
@@ -2,8 +2,10 @@
 Tests for target quality raters.
 """
 import io
+from pathlib import Path
 
 import pytest
+from mock_vws import target_raters
 from mock_vws.target_raters import (
     BrisqueTargetTrackingRater,
     HardcodedTargetTrackingRater,
@@ -79,3 +81,64 @@ class TestBrisqueTargetTrackingRater:
         image_content = different_high_quality_image.getvalue()
         rating = rater(image_content=image_content)
         assert rating > 1
+
+    @staticmethod
+    def test_cache_stats(
+        high_quality_image: io.BytesIO,
+        different_high_quality_image: io.BytesIO,
+    ) -> None:
+        """
+        Ratings are cached by image, and the least recently used ratings are
+        evicted to keep within the cache's byte budget.
+        """
+        # This budget is enough for one rating.
+        cache_max_bytes = 200
+        rater = BrisqueTargetTrackingRater(cache_max_bytes=cache_max_bytes)
+        image_content = high_quality_image.getvalue()
+        different_image_content = different_high_quality_image.getvalue()
+
+        first_rating = rater(image_content=image_content)
+        assert rater(image_content=image_content) == first_rating
+        rater(image_content=different_image_content)
+        rater(image_content=image_content)
+
+        cache_stats = rater.cache_stats
+        expected_hits = 1
+        expected_misses = 3
+        expected_evictions = 2
+        assert cache_stats.hits == expected_hits
+        assert cache_stats.misses == expected_misses
+        assert cache_stats.evictions == expected_evictions
+        assert 0 < cache_stats.size_bytes <= cache_max_bytes
+
+    @staticmethod
+    def test_analysis_cache(
+        high_quality_image: io.BytesIO,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        """
+        Ratings are kept in an analysis cache directory, so that a rater
+        which uses the same directory, for example in a later run, does not
+        compute them again.
+        """
+        image_content = high_quality_image.getvalue()
+        rating = BrisqueTargetTrackingRater(analysis_cache_directory=tmp_path)(
+            image_content=image_content,
+        )
+
+        def get_rating(image_content: bytes) -> int:
+            """
+            Fail, as the rating should not be computed.
+            """
+            pytest.fail(reason=f"{len(image_content)} bytes were rated.")
+
+        monkeypatch.setattr(
+            target=target_raters,
+            name="_get_brisque_target_tracking_rating",
+            value=get_rating,
+        )
+        new_rater = BrisqueTargetTrackingRater(
+            analysis_cache_directory=tmp_path,
+        )
+        assert new_rater(image_content=image_content) == rating
@@ -6,13 +6,49 @@ from __future__ import annotations
 import datetime
 from typing import TYPE_CHECKING
 
+from mock_vws.target import Target
+from mock_vws.target_raters import HardcodedTargetTrackingRater
 from vws import VWS
 from vws.reports import TargetStatuses
 
 if TYPE_CHECKING:
     import io
+    from pathlib import Path
 
     from mock_vws.database import VuforiaDatabase
+    from mock_vws.target_raters import TargetTrackingRater
+
+
+def make_target(
+    image_value: bytes,
+    *,
+    name: str = "example",
+    target_tracking_rater: TargetTrackingRater | None = None,
+    analysis_cache_directory: Path | None = None,
+) -> Target:
+    """
+    Make an active target with no application metadata, which has finished
+    processing.
+
+    Args:
+        image_value: The target's image.
+        name: The target's name.
+        target_tracking_rater: The target's tracking rater. Defaults to one
+            which gives a rating of 1.
+        analysis_cache_directory: The target's analysis cache directory.
+    """
+    if target_tracking_rater is None:
+        target_tracking_rater = HardcodedTargetTrackingRater(rating=1)
+    return Target(
+        active_flag=True,
+        application_metadata=None,
+        image_value=image_value,
+        name=name,
+        processing_time_seconds=0,
+        width=1,
+        target_tracking_rater=target_tracking_rater,
+        analysis_cache_directory=analysis_cache_directory,
+    )
 
 
 def processing_time_seconds(